@@ -11,6 +11,7 @@ function App() {
   const [projects, setProjects] = useState([]);
   const [selected, setSelected] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [codesLoaded, setCodesLoaded] = useState(false);
 
   // ✅ Helper function to handle multiple code key formats from backend
   const getProjectCode = (p) => {
@@ -31,13 +32,14 @@ function App() {
       .catch(() => setMessage("⚠️ Backend not reachable"));
   }, []);
 
-  // 📦 Load all projects
+  // 📦 Load all projects (slim list — code is fetched when needed)
   const loadProjects = async () => {
     setLoading(true);
     try {
-      const res = await fetch("http://127.0.0.1:5000/api/projects");
+      const res = await fetch("http://127.0.0.1:5000/api/projects?view=slim");
       const json = await res.json();
       setProjects(json.projects || []);
+      setCodesLoaded(false);
     } catch {
       alert("❌ Failed to fetch projects");
     } finally {
@@ -45,12 +47,50 @@ function App() {
     }
   };
 
+  // 🔎 Open a project, fetching its code lazily
+  const openProject = async (project) => {
+    setSelected(project);
+    if (project.details_markdown !== undefined) return;
+    try {
+      const res = await fetch(`http://127.0.0.1:5000/api/projects/${project.id}/code`);
+      const json = await res.json();
+      setSelected({ ...project, details_markdown: json.details_markdown });
+    } catch {
+      console.error("Failed to fetch project code");
+    }
+  };
+
+  // 🧠 Load every project's code when the "All Project Codes" list is opened
+  const loadAllCodes = async (event) => {
+    if (!event.currentTarget.open || codesLoaded) return;
+    try {
+      const res = await fetch("http://127.0.0.1:5000/api/projects");
+      const json = await res.json();
+      setProjects(json.projects || []);
+      setCodesLoaded(true);
+    } catch {
+      console.error("Failed to fetch project codes");
+    }
+  };
+
+  // ⏳ Poll a background company job until it finishes
+  const waitForJob = async (statusUrl) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const res = await fetch(`http://127.0.0.1:5000${statusUrl}`);
+      const job = await res.json();
+      if (job.status === "completed") return job;
+      if (job.status === "failed" || res.status === 404) throw new Error(job.error || "Job failed");
+    }
+  };
+
   // 🧠 Run AI Company pipeline
   const runCompany = async () => {
     setLoading(true);
     try {
       const res = await fetch("http://127.0.0.1:5000/company/run");
       const data = await res.json();
+      await waitForJob(data.status_url);
       alert("✅ New project completed by AI Company!");
       loadProjects();
     } catch {
@@ -155,7 +195,7 @@ function App() {
                 {latestProject.status}
               </span>
               <button
-                onClick={() => setSelected(latestProject)}
+                onClick={() => openProject(latestProject)}
                 className="text-sm text-blue-600 underline hover:text-blue-800"
               >
                 View Details
@@ -168,7 +208,7 @@ function App() {
         {projects.length > 0 && (
           <div className="w-full max-w-5xl mb-10">
             <h3 className="text-2xl font-semibold text-gray-800 mb-4">🧠 All Project Codes</h3>
-            <details className="bg-white/80 rounded-lg shadow border border-blue-100">
+            <details onToggle={loadAllCodes} className="bg-white/80 rounded-lg shadow border border-blue-100">
               <summary className="cursor-pointer px-4 py-3 font-medium text-blue-700">
                 Show All Project Codes ▼
               </summary>
@@ -207,7 +247,7 @@ function App() {
                   {p.status}
                 </span>
                 <button
-                  onClick={() => setSelected(p)}
+                  onClick={() => openProject(p)}
                   className="text-sm text-blue-600 underline hover:text-blue-800"
                 >
                   View Details
@@ -7,7 +7,13 @@ export default function RunCompanyButton({ onDone }) {
     setLoading(true);
     try {
       const res = await fetch("http://127.0.0.1:5000/company/run");
-      const json = await res.json();
+      let json = await res.json();
+      // The run happens in a background job — poll until it finishes.
+      while (json.status_url && !["completed", "failed"].includes(json.status)) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        json = await (await fetch(`http://127.0.0.1:5000/company/jobs/${json.job_id}`)).json();
+      }
+      if (json.status === "failed") throw new Error(json.error);
       console.log("company run:", json);
       if (onDone) onDone(json);
       alert("Company run completed. Check Projects list for new entry.");
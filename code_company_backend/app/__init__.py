@@ -1,5 +1,9 @@
+from app.utils import startup
+startup.mark("app_import")
+
 from flask import Flask
 from flask_cors import CORS   # 👈 add this
+startup.mark("flask_imported")
 
 def create_app():
     app = Flask(__name__)
@@ -10,7 +14,14 @@ def create_app():
     # Import and register your blueprint
     from app.routes import main
     app.register_blueprint(main)
+    startup.mark("routes_imported")
+
+    # 📈 Per-route request counters and latency for /metrics
+    from app.utils import metrics
+    metrics.init_app(app)
 
+    startup.mark("ready")
+    startup.print_report("Backend")
     return app
 
 
@@ -0,0 +1,185 @@
+# app/jobs.py
+"""
+🧵 Background jobs — runs the company pipeline off the request thread.
+Routes submit a job and return its id at once; clients poll /company/jobs/<id>.
+Submissions with the same key while a job is queued or running are coalesced.
+Async jobs run as coroutines on the shared async_runner loop instead of a worker thread.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+PHASES = ("technical", "ceo", "operations", "validation", "logging", "saving")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job:
+    """One background pipeline run with per-phase progress counters."""
+
+    def __init__(self, key, kind, params=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.params = params or {}
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.total_runs = 1
+        self._phases = {name: {"running": 0, "completed": 0, "skipped": 0} for name in PHASES}
+        self._lock = threading.Lock()
+
+    def set_total_runs(self, count):
+        """Batch jobs only know how many runs they have after the search."""
+        with self._lock:
+            self.total_runs = count
+
+    def report(self, phase, status):
+        """Progress callback handed to the pipeline."""
+        with self._lock:
+            counters = self._phases.get(phase)
+            if counters is None:
+                return
+            if status == "running":
+                counters["running"] += 1
+            elif status in ("completed", "skipped"):
+                if counters["running"] > 0:
+                    counters["running"] -= 1
+                counters[status] += 1
+
+    def _phase_view(self, phase):
+        counters = self._phases[phase]
+        total = 1 if phase == "technical" else self.total_runs
+        done = counters["completed"] + counters["skipped"]
+        if counters["running"] or 0 < done < total:
+            status = "running"
+        elif done >= total:
+            status = "completed" if counters["completed"] else "skipped"
+        else:
+            status = "pending"
+        return {"status": status, "completed": done, "total": total}
+
+    def to_dict(self, include_result=True):
+        """JSON-safe view of the job for the status API."""
+        with self._lock:
+            data = {
+                "job_id": self.id,
+                "kind": self.kind,
+                "params": self.params,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "phases": {name: self._phase_view(name) for name in PHASES},
+            }
+        if self.finished_at and self.started_at:
+            data["duration_seconds"] = round(self.finished_at - self.started_at, 3)
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Bounded executor plus an in-memory job registry with duplicate coalescing."""
+
+    def __init__(self, max_workers=None, history_limit=None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.JOB_WORKERS,
+            thread_name_prefix="company-job"
+        )
+        self._history_limit = history_limit or Config.JOB_HISTORY_LIMIT
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, kind, fn, params=None, run_async=False):
+        """
+        Queues `fn(job)` unless a job with the same key is still active.
+        With `run_async`, `fn(job)` returns a coroutine that runs on the async loop.
+        Returns (job, created) — created is False when the call was coalesced.
+        """
+        with self._lock:
+            existing_id = self._inflight.get(key)
+            existing = self._jobs.get(existing_id) if existing_id else None
+            if existing is not None and existing.status in ACTIVE_STATUSES:
+                return existing, False
+
+            job = Job(key, kind, params)
+            self._jobs[job.id] = job
+            self._inflight[key] = job.id
+            self._trim()
+
+        if run_async:
+            from app.utils import async_runner
+            async_runner.submit(self._arun(job, fn))
+        else:
+            self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def _run(self, job, fn):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = "completed"
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            self._release(job)
+
+    async def _arun(self, job, fn):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = await fn(job)
+            job.status = "completed"
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            self._release(job)
+
+    def _fail(self, job, e):
+        print(f"⚠️ Job {job.id} failed: {e}")
+        job.error = str(e)
+        job.status = "failed"
+
+    def _release(self, job):
+        job.finished_at = time.time()
+        with self._lock:
+            if self._inflight.get(job.key) == job.id:
+                del self._inflight[job.key]
+
+    def _trim(self):
+        """Drops the oldest finished jobs once the registry exceeds its limit."""
+        while len(self._jobs) > self._history_limit:
+            oldest_id = next(
+                (jid for jid, j in self._jobs.items() if j.status not in ACTIVE_STATUSES),
+                None
+            )
+            if oldest_id is None:
+                break
+            del self._jobs[oldest_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, status=None, limit=50):
+        """Most recent jobs first, optionally filtered by status."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs.reverse()
+        if status:
+            jobs = [j for j in jobs if j.status == status]
+        return jobs[:limit]
+
+
+job_manager = JobManager()
@@ -1,120 +1,359 @@
-import requests
 import json
-import re
+import random
 from config import Config
+from app.utils.approval_model import approval_model, ensure_bootstrapped
 from app.utils.json_handler import read_memory, write_memory
+from app.utils.json_parser import parse_json_reply
+from app.utils.metrics import timed_phase
+from app.utils.model_router import model_router
+from app.utils.rate_limit import is_temporary_failure
 
+SYSTEM_PROMPT = (
+    "You are a logical, concise CEO AI. "
+    "Respond ONLY in valid JSON format. No text outside JSON."
+)
 
-def ceo_decision(user_prompt=None):
-    """
-    CEO AI (OPENAI V3.1):
-    Reviews the current project and decides whether to approve or reject it.
-    Auto-approves if: no project is found OR project involves Python.
-    Otherwise, consults OPENAI V3.1 through OpenRouter.
-    """
 
-    data = read_memory()
-    project = data.get("current_project")
+BATCH_PROMPT = """
+You are the CEO of Code Company.
+Evaluate each project proposal below and decide whether to approve or reject it.
+
+Candidates (JSON, one object per project, each with a unique "id"):
+{candidates}
+
+Rules:
+- Approve only if the project involves Python code, coding implementation, or automation.
+- Reject if it is theoretical or unrelated to coding.
+- Return exactly one decision per candidate, using the candidate's "id" unchanged.
+- Respond STRICTLY in JSON format, nothing else:
+  {{
+    "decisions": [
+      {{"id": "<candidate id>", "decision": "approve" or "reject", "reason": "short explanation"}}
+    ]
+  }}
+"""
 
+
+def _rule_decision(project):
+    """Keyword rules applied before any model call; returns None when the model must decide."""
     # 1️⃣ No active project → auto-approve
     if not project:
         print("⚙️ No project found. CEO auto-approving idle workload.")
-        result = {
+        return {
             "decision": "approve",
-            "reason": "No active project found. Approving to start new work."
+            "reason": "No active project found. Approving to start new work.",
+            "decided_by": "rules"
         }
 
-    else:
-        title = project.get("project_title", "").lower()
-        summary = project.get("problem_summary", "").lower()
-
-        # 2️⃣ Auto-approve if Python-related
-        if "python" in title or "python" in summary:
-            print("🐍 Python-based project detected — auto-approved.")
-            result = {
-                "decision": "approve",
-                "reason": "The project involves Python coding — approved."
-            }
-
-        # 3️⃣ Otherwise — ask OPENAI V3.1 via OpenRouter
-        else:
-            print("🧠 Non-Python project detected — consulting openai/gpt-oss-20b CEO AI.")
-            prompt = f"""
-            You are the CEO of Code Company.
-            Evaluate this project proposal and decide whether to approve or reject it.
-
-            Project Title: {project.get('project_title')}
-            Summary: {project.get('problem_summary')}
-            Source: {project.get('source_link')}
-
-            Rules:
-            - Approve only if the project involves Python code, coding implementation, or automation.
-            - Reject if it is theoretical or unrelated to coding.
-            - Respond STRICTLY in JSON format, nothing else:
-              {{
-                "decision": "approve" or "reject",
-                "reason": "short explanation"
-              }}
-            """
-
-            try:
-                headers = {
-                    "Authorization": f"Bearer {Config.OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json"
-                }
+    title = project.get("project_title", "").lower()
+    summary = project.get("problem_summary", "").lower()
 
-                payload = {
-                    "model": "openai/gpt-oss-20b:free",  # ✅ OPEANI V3.1 on OpenRouter
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are a logical, concise CEO AI using openai/gpt-oss-20b "
-                                "Respond ONLY in valid JSON format. No text outside JSON."
-                            )
-                        },
-                        {"role": "user", "content": prompt}
-                    ]
-                }
+    # 2️⃣ Auto-approve if Python-related
+    if "python" in title or "python" in summary:
+        print("🐍 Python-based project detected — auto-approved.")
+        return {
+            "decision": "approve",
+            "reason": "The project involves Python coding — approved.",
+            "decided_by": "rules"
+        }
+    return None
+
+
+def _classifier_decision(project):
+    """
+    Local classifier fast path. Returns (result, probability): `result` is set when
+    the classifier is confident enough to decide alone, `probability` is its
+    approval estimate (None while untrained) for the agreement stats.
+    """
+    if not Config.APPROVAL_MODEL_ENABLED:
+        return None, None
+    try:
+        ensure_bootstrapped()
+        probability = approval_model.predict(project)
+    except Exception as e:
+        print(f"⚠️ Approval classifier failed: {e}")
+        return None, None
+    if probability is None:
+        return None, None
+
+    confidence = max(probability, 1 - probability)
+    if (confidence < Config.APPROVAL_MODEL_THRESHOLD or not approval_model.trusted()
+            or random.random() < Config.APPROVAL_MODEL_AUDIT_RATE):
+        return None, probability
 
-                response = requests.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=60
-                )
-                response.raise_for_status()
-                ai_reply = response.json()["choices"][0]["message"]["content"]
-
-                # 🧩 Extract JSON even if extra text is present
-                match = re.search(r"\{.*\}", ai_reply, re.DOTALL)
-                if match:
-                    result = json.loads(match.group(0))
-                else:
-                    result = {
-                        "decision": "reject",
-                        "reason": "No valid JSON detected from OPENAI output."
-                    }
-
-            except Exception as e:
-                print(f"⚠️ openai/gpt-oss-20b API error: {e}")
-                result = {"decision": "reject", "reason": str(e)}
-
-    # 4️⃣ Save CEO decision back to memory.json
-    project = project or {}
+    approval_model.record_local_decision()
+    decision = "approve" if probability >= 0.5 else "reject"
+    print(f"🤖 Local classifier decided: {decision} ({confidence:.0%} confident).")
+    return {
+        "decision": decision,
+        "reason": f"Decided by the local approval classifier ({confidence:.0%} confident).",
+        "decided_by": "classifier"
+    }, probability
+
+
+def _learn_from_llm(project, result, probability):
+    """Feeds an LLM decision back into the classifier and its agreement stats."""
+    if not Config.APPROVAL_MODEL_ENABLED or result.get("decision") not in ("approve", "reject"):
+        return
+    try:
+        approval_model.learn(project, result["decision"], probability=probability)
+    except Exception as e:
+        print(f"⚠️ Approval classifier update failed: {e}")
+
+
+def _has_decision(ai_reply):
+    """Router check: does the reply carry a usable decision?"""
+    parsed, _ = parse_json_reply(ai_reply, required_keys=("decision",))
+    return isinstance(parsed, dict) and bool(parsed.get("decision"))
+
+
+def deferred_result(project, reason):
+    """CEO result for a review that could not happen now (rate limited / provider down)."""
+    return {
+        "status": "deferred",
+        "decision": None,
+        "reason": reason,
+        "project_title": (project or {}).get("project_title", "No project")
+    }
+
+
+def apply_ceo_decision(result, state=None):
+    """
+    Saves a decision ({"decision", "reason"}) onto the current project in
+    `state` (or memory.json) and returns the CEO phase result.
+    """
+    data = state if state is not None else read_memory()
+    project = data.get("current_project") or {}
     project["ceo_decision"] = result.get("decision", "reject")
     project["ceo_reason"] = result.get("reason", "No valid reason provided.")
+    project["ceo_decided_by"] = result.get("decided_by")
     project["status"] = (
         "Approved" if project["ceo_decision"] == "approve" else "Rejected"
     )
 
     data["current_project"] = project
-    write_memory(data)
+    if state is None:
+        write_memory(data)
 
     print(f"✅ CEO Decision: {project['status']} — {project['ceo_reason']}")
     return {
         "status": "success",
         "decision": project["ceo_decision"],
         "reason": project["ceo_reason"],
+        "decided_by": project["ceo_decided_by"],
         "project_title": project.get("project_title", "No project")
     }
+
+
+@timed_phase("ceo")
+def ceo_decision(user_prompt=None, state=None, use_cache=True):
+    """
+    CEO AI (OPENAI V3.1):
+    Reviews the current project and decides whether to approve or reject it.
+    Auto-approves if: no project is found OR project involves Python.
+    Otherwise, consults the LLM through OpenRouter (model chosen by model_router,
+    with failover to the next CEO_MODELS entry on errors or malformed replies).
+    Works on `state` when given (isolated run), otherwise on memory.json.
+    `use_cache=False` bypasses the LLM response cache.
+    """
+
+    data = state if state is not None else read_memory()
+    project = data.get("current_project")
+    result, probability = _local_decision(project)
+
+    # 3️⃣ Otherwise — ask the routed CEO model via OpenRouter
+    if result is None:
+        print("🧠 Non-Python project detected — consulting the CEO AI.")
+        prompt = _single_prompt(project)
+        try:
+            ai_reply, _ = model_router.complete(
+                "ceo", SYSTEM_PROMPT, prompt, timeout=Config.CEO_TIMEOUT,
+                use_cache=use_cache, validate=_has_decision
+            )
+            result = _interpret_reply(project, prompt, ai_reply, probability)
+        except Exception as e:
+            result = _llm_failure(project, e)
+            if result.get("status") == "deferred":
+                return result
+
+    # 4️⃣ Save CEO decision back to the run state (or memory.json)
+    return apply_ceo_decision(result, state)
+
+
+@timed_phase("ceo")
+async def aceo_decision(user_prompt=None, state=None, use_cache=True):
+    """`ceo_decision` for the async pipeline: the model call awaits on the shared loop."""
+    data = state if state is not None else read_memory()
+    project = data.get("current_project")
+    result, probability = _local_decision(project)
+
+    if result is None:
+        print("🧠 Non-Python project detected — consulting the CEO AI.")
+        prompt = _single_prompt(project)
+        try:
+            ai_reply, _ = await model_router.acomplete(
+                "ceo", SYSTEM_PROMPT, prompt, timeout=Config.CEO_TIMEOUT,
+                use_cache=use_cache, validate=_has_decision
+            )
+            result = _interpret_reply(project, prompt, ai_reply, probability)
+        except Exception as e:
+            result = _llm_failure(project, e)
+            if result.get("status") == "deferred":
+                return result
+
+    return apply_ceo_decision(result, state)
+
+
+def _local_decision(project):
+    """Keyword rules, then the local classifier. Returns (result or None, probability)."""
+    result = _rule_decision(project)
+    if result is not None:
+        return result, None
+    return _classifier_decision(project)
+
+
+def _single_prompt(project):
+    return f"""
+        You are the CEO of Code Company.
+        Evaluate this project proposal and decide whether to approve or reject it.
+
+        Project Title: {project.get('project_title')}
+        Summary: {project.get('problem_summary')}
+        Source: {project.get('source_link')}
+
+        Rules:
+        - Approve only if the project involves Python code, coding implementation, or automation.
+        - Reject if it is theoretical or unrelated to coding.
+        - Respond STRICTLY in JSON format, nothing else:
+          {{
+            "decision": "approve" or "reject",
+            "reason": "short explanation"
+          }}
+        """
+
+
+def _interpret_reply(project, prompt, ai_reply, probability):
+    """Turns the CEO model's reply into a decision, rejecting unreadable replies."""
+    # 🧩 Extract (and repair) JSON even if extra text is present
+    parsed, _ = parse_json_reply(ai_reply, required_keys=("decision",))
+    if isinstance(parsed, dict) and parsed.get("decision"):
+        parsed["decided_by"] = "llm"
+        _learn_from_llm(project, parsed, probability)
+        return parsed
+    model_router.forget("ceo", SYSTEM_PROMPT, prompt)
+    return {
+        "decision": "reject",
+        "reason": "No valid JSON detected from OPENAI output.",
+        "decided_by": "fallback"
+    }
+
+
+def _llm_failure(project, e):
+    """Decision for a failed CEO model call: deferred when temporary, otherwise a reject."""
+    # Busy or down is not a "no" — leave the project undecided for a later run
+    if is_temporary_failure(e):
+        print(f"🚦 CEO AI unavailable, decision deferred: {e}")
+        return deferred_result(project, f"CEO AI unavailable: {e}")
+    print(f"⚠️ CEO AI API error: {e}")
+    return {"decision": "reject", "reason": f"CEO AI error: {e}", "decided_by": "fallback"}
+
+
+def _parse_batch_reply(ai_reply, candidate_ids):
+    """
+    Maps the model's decisions back to candidate ids. Accepts
+    {"decisions": [{"id": ...}, ...]}, a bare list, or {"<id>": {...}}.
+    Ids are compared as stripped strings; unknown ids are ignored.
+    """
+    parsed, _ = parse_json_reply(ai_reply, required_keys=("decisions",), containers="{[")
+
+    if isinstance(parsed, dict) and isinstance(parsed.get("decisions"), list):
+        items = parsed["decisions"]
+    elif isinstance(parsed, list):
+        items = parsed
+    elif isinstance(parsed, dict):
+        items = [dict(v, id=k) for k, v in parsed.items() if isinstance(v, dict)]
+    else:
+        items = []
+
+    wanted = {str(cid).strip(): cid for cid in candidate_ids}
+    decisions = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        cid = wanted.get(str(item.get("id", "")).strip())
+        decision = str(item.get("decision", "")).strip().lower()
+        if cid is None or cid in decisions or decision not in ("approve", "reject"):
+            continue
+        decisions[cid] = {
+            "decision": decision,
+            "reason": item.get("reason") or "No valid reason provided.",
+            "decided_by": "llm"
+        }
+    return decisions
+
+
+@timed_phase("ceo_batch")
+def ceo_decisions(candidates, use_cache=True):
+    """
+    CEO AI (batch): reviews many candidate projects with at most one model call.
+    `candidates` maps candidate id → project summary. Keyword rules decide what
+    they can; the rest go to the model together, and its decisions are matched
+    back by id. Candidates the model skipped fall back to a single-project review.
+    Returns {candidate_id: {"decision": ..., "reason": ...}}; candidates that could
+    not be reviewed because the provider is busy or down get {"deferred": True, ...}.
+    """
+    decisions, pending, probabilities = {}, {}, {}
+    for cid, project in candidates.items():
+        result = _rule_decision(project)
+        if result is None:
+            result, probabilities[cid] = _classifier_decision(project)
+        if result is None:
+            pending[cid] = project
+        else:
+            decisions[cid] = result
+
+    if not pending:
+        return decisions
+
+    print(f"🧠 CEO AI: reviewing {len(pending)} candidate(s) in one request.")
+    listing = json.dumps([
+        {
+            "id": str(cid),
+            "title": project.get("project_title"),
+            "summary": project.get("problem_summary"),
+            "source": project.get("source_link"),
+        }
+        for cid, project in pending.items()
+    ], ensure_ascii=False, indent=2)
+    prompt = BATCH_PROMPT.format(candidates=listing)
+
+    try:
+        ai_reply, _ = model_router.complete(
+            "ceo", SYSTEM_PROMPT, prompt, timeout=Config.CEO_TIMEOUT,
+            use_cache=use_cache, validate=lambda reply: bool(_parse_batch_reply(reply, pending.keys()))
+        )
+        matched = _parse_batch_reply(ai_reply, pending.keys())
+        if len(matched) < len(pending):
+            model_router.forget("ceo", SYSTEM_PROMPT, prompt)
+        for cid, result in matched.items():
+            _learn_from_llm(pending[cid], result, probabilities.get(cid))
+        decisions.update(matched)
+    except Exception as e:
+        if is_temporary_failure(e):
+            print(f"🚦 CEO AI unavailable, {len(pending)} decision(s) deferred: {e}")
+            for cid in pending:
+                decisions[cid] = {"deferred": True, "reason": f"CEO AI unavailable: {e}"}
+            return decisions
+        print(f"⚠️ CEO AI batch review failed: {e}")
+
+    for cid, project in pending.items():
+        if cid not in decisions:
+            print(f"🔁 No batch decision for candidate {cid} — reviewing it on its own.")
+            single = ceo_decision(state={"current_project": dict(project)}, use_cache=use_cache)
+            if single["status"] == "deferred":
+                decisions[cid] = {"deferred": True, "reason": single["reason"]}
+            else:
+                decisions[cid] = {
+                    "decision": single["decision"], "reason": single["reason"], "decided_by": single["decided_by"]
+                }
+    return decisions
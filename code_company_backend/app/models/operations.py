@@ -1,38 +1,59 @@
-import requests
-import json
-import re
+import time
+
 from config import Config
 from app.utils.json_handler import read_memory, write_memory
+from app.utils.metrics import observe_phase, timed_phase
+from app.utils.model_router import model_router
+from app.utils.openrouter import stream_chat_completion
+from app.utils.rate_limit import is_temporary_failure
+from app.utils.json_parser import (
+    JSONStreamScanner, extract_fields, parse_json_reply, parse_scanned, strip_code_fences
+)
 
+SYSTEM_PROMPT = (
+    "You are a senior Python engineer and operations AI. "
+    "Respond ONLY in strict JSON format — no Markdown, no explanations outside JSON."
+)
+RESULT_FIELDS = ("solution_summary", "detailed_steps", "final_code", "conclusion")
 
-def execute_project():
-    """
-    ⚙️ Operations Manager — Executes the approved project.
-    Generates working Python code, explanation, and summary using OpenRouter (free model).
-    Handles malformed JSON gracefully and avoids parsing errors.
-    """
 
-    data = read_memory()
+def _load_approved_project(state):
+    """Returns (data, project, error) for the project the Operations Manager should run."""
+    data = state if state is not None else read_memory()
     project = data.get("current_project")
 
     # 1️⃣ Check if a project exists
     if not project:
-        return {"status": "error", "message": "No project found. Run Technical Manager first."}
+        return data, None, {"status": "error", "message": "No project found. Run Technical Manager first."}
 
     # 2️⃣ Ensure CEO approved it
     if project.get("status") != "Approved":
-        return {"status": "error", "message": "Project not approved by CEO yet."}
+        return data, None, {"status": "error", "message": "Project not approved by CEO yet."}
+
+    return data, project, None
+
 
+def _build_prompt(project, feedback=None):
+    """Builds the Operations prompt for an approved project (plus validation feedback on retries)."""
     title = project.get("project_title", "Unnamed Project")
     summary = project.get("problem_summary", "No summary available.")
 
     # 3️⃣ Create the AI prompt
-    prompt = f"""
+    retry_note = ""
+    if feedback:
+        retry_note = f"""
+    ⚠️ Your previous code for this project failed validation with:
+    {feedback}
+    Fix that problem in the new code.
+    """
+
+    return f"""
     You are the Operations Manager of Code Company (Beta).
     The CEO has approved the following project.
 
     🧩 Project Title: {title}
     🧠 Description: {summary}
+    {retry_note}
 
     Your tasks:
     1. Write clean, efficient, working Python code that implements this project.
@@ -48,72 +69,71 @@ def execute_project():
     }}
     """
 
-    try:
-        headers = {
-            "Authorization": f"Bearer {Config.OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://127.0.0.1:5000",
-            "X-Title": "Code Company (Beta)"
-        }
 
-        payload = {
-            "model": "openai/gpt-oss-20b:free",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a senior Python engineer and operations AI. "
-                        "Respond ONLY in strict JSON format — no Markdown, no explanations outside JSON."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ]
+def _parse_reply(ai_reply, prompt=None, scanner=None):
+    """
+    Turns the raw AI reply into the result dict, falling back to raw text.
+    Malformed JSON is repaired where possible and single fields are salvaged
+    before giving up. Replies that needed salvaging are evicted from the LLM
+    cache for `prompt`, so the next run asks again.
+    `scanner` is a JSONStreamScanner that already consumed the streamed reply.
+    """
+    # 🧩 Extract (and repair) the JSON object even if AI adds extra text
+    if scanner is not None:
+        result, status = parse_scanned(scanner, required_keys=("final_code",))
+    else:
+        result, status = parse_json_reply(ai_reply, required_keys=("final_code",))
+    if isinstance(result, dict):
+        if status == "repaired":
+            print("🩹 Operations reply had malformed JSON — repaired.")
+        elif status == "truncated":
+            print("⚠️ Operations reply was cut off — kept the partial result.")
+            if prompt is not None:
+                model_router.forget("operations", SYSTEM_PROMPT, prompt)
+        return result
+
+    if prompt is not None:
+        model_router.forget("operations", SYSTEM_PROMPT, prompt)
+
+    # Salvage whichever fields can still be read
+    if scanner is not None:
+        fields = scanner.complete_fields(RESULT_FIELDS)
+    else:
+        fields = extract_fields(ai_reply, RESULT_FIELDS)
+    if fields.get("final_code"):
+        print("⚠️ Operations reply was not valid JSON — salvaged individual fields.")
+        return {
+            "solution_summary": fields.get("solution_summary", "Partial AI response (invalid JSON)."),
+            "detailed_steps": fields.get("detailed_steps", ""),
+            "final_code": fields["final_code"],
+            "conclusion": fields.get("conclusion", "Some fields were recovered from malformed JSON.")
         }
 
-        # 🛰️ Send request to OpenRouter
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=90
-        )
-        response.raise_for_status()
-
-        ai_reply = response.json()["choices"][0]["message"]["content"].strip()
-
-        # 🧩 Try extracting JSON portion even if AI adds extra text
-        match = re.search(r"\{.*\}", ai_reply, re.DOTALL)
-
-        if match:
-            try:
-                result = json.loads(match.group(0))
-            except json.JSONDecodeError as e:
-                print(f"⚠️ JSON Decode Error: {e}")
-                # Fallback to raw text mode if JSON invalid
-                result = {
-                    "solution_summary": "Partial AI response (invalid JSON).",
-                    "detailed_steps": "",
-                    "final_code": ai_reply,
-                    "conclusion": "JSON parsing failed, raw AI text used instead."
-                }
-        else:
-            # No JSON detected at all — store plain text safely
-            result = {
-                "solution_summary": "No valid JSON detected from AI output.",
-                "detailed_steps": "",
-                "final_code": ai_reply,
-                "conclusion": "Raw text stored instead of structured output."
-            }
+    # No JSON detected at all — store plain text safely
+    return {
+        "solution_summary": "No valid JSON detected from AI output.",
+        "detailed_steps": "",
+        "final_code": strip_code_fences(ai_reply),
+        "conclusion": "Raw text stored instead of structured output."
+    }
 
-    except Exception as e:
-        print(f"⚠️ Operations Manager Error: {e}")
-        return {"status": "error", "message": str(e)}
 
-    # 4️⃣ Save the operation result to memory.json
+def _reply_parses(ai_reply):
+    """Router check: complete JSON (possibly repaired) with a final_code field."""
+    result, status = parse_json_reply(ai_reply, required_keys=("final_code",))
+    return isinstance(result, dict) and status in ("ok", "repaired")
+
+
+def _save_result(data, project, result, state):
+    """Saves the operation result and returns the clean API response."""
+    title = project.get("project_title", "Unnamed Project")
+
+    # 4️⃣ Save the operation result to the run state (or memory.json)
     project["operations_result"] = result
     project["status"] = "Completed"
     data["current_project"] = project
-    write_memory(data)
+    if state is None:
+        write_memory(data)
 
     print(f"✅ Operations Manager: Successfully executed project '{title}'")
 
@@ -126,3 +146,132 @@ def execute_project():
         "conclusion": result.get("conclusion", "No conclusion provided."),
         "final_code": result.get("final_code", "# No code provided.")
     }
+
+
+@timed_phase("operations")
+def execute_project(state=None, use_cache=True, feedback=None):
+    """
+    ⚙️ Operations Manager — Executes the approved project.
+    Generates working Python code, explanation, and summary using OpenRouter (free model).
+    Handles malformed JSON gracefully and avoids parsing errors.
+    Works on `state` when given (isolated run), otherwise on memory.json.
+    `use_cache=False` bypasses the LLM response cache.
+    `feedback` (a validation error) asks the model to fix its previous code.
+    """
+
+    data, project, error = _load_approved_project(state)
+    if error:
+        return error
+
+    try:
+        # 🛰️ Send request to OpenRouter
+        prompt = _build_prompt(project, feedback)
+        ai_reply, _ = model_router.complete(
+            "operations", SYSTEM_PROMPT, prompt, timeout=Config.OPERATIONS_TIMEOUT,
+            use_cache=use_cache, validate=_reply_parses
+        )
+        ai_reply = ai_reply.strip()
+        result = _parse_reply(ai_reply, prompt)
+
+    except Exception as e:
+        if is_temporary_failure(e):
+            print(f"🚦 Operations AI unavailable, run deferred: {e}")
+            return {"status": "deferred", "message": f"Operations AI unavailable: {e}"}
+        print(f"⚠️ Operations Manager Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+    return _save_result(data, project, result, state)
+
+
+@timed_phase("operations")
+async def aexecute_project(state=None, use_cache=True, feedback=None):
+    """`execute_project` for the async pipeline: the model call awaits on the shared loop."""
+    data, project, error = _load_approved_project(state)
+    if error:
+        return error
+
+    try:
+        prompt = _build_prompt(project, feedback)
+        ai_reply, _ = await model_router.acomplete(
+            "operations", SYSTEM_PROMPT, prompt, timeout=Config.OPERATIONS_TIMEOUT,
+            use_cache=use_cache, validate=_reply_parses
+        )
+        result = _parse_reply(ai_reply.strip(), prompt)
+
+    except Exception as e:
+        if is_temporary_failure(e):
+            print(f"🚦 Operations AI unavailable, run deferred: {e}")
+            return {"status": "deferred", "message": f"Operations AI unavailable: {e}"}
+        print(f"⚠️ Operations Manager Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+    return _save_result(data, project, result, state)
+
+
+def _reset_for_retry(state, previous_feedback):
+    project = state.get("current_project") or {}
+    model_router.forget("operations", SYSTEM_PROMPT, _build_prompt(project, previous_feedback))
+    project["status"] = "Approved"
+    state["current_project"] = project
+
+
+def retry_project(state, feedback, use_cache=True, previous_feedback=None):
+    """
+    Regenerates the code of a project whose output failed validation.
+    The rejected reply is evicted from the LLM cache and the model is told what went wrong.
+    """
+    _reset_for_retry(state, previous_feedback)
+    return execute_project(state=state, use_cache=use_cache, feedback=feedback)
+
+
+async def aretry_project(state, feedback, use_cache=True, previous_feedback=None):
+    """`retry_project` for the async pipeline."""
+    _reset_for_retry(state, previous_feedback)
+    return await aexecute_project(state=state, use_cache=use_cache, feedback=feedback)
+
+
+def stream_project(state=None, use_cache=True):
+    """
+    ⚙️ Operations Manager (streaming) — same job as `execute_project`, but uses
+    OpenRouter streaming and yields events while the completion is generated:
+      {"event": "field", "field": name, "delta": text}   as field text arrives
+      {"event": "result", "data": {...}}                 once the reply is parsed and saved
+      {"event": "error", "message": text}                on failure
+    """
+
+    data, project, error = _load_approved_project(state)
+    if error:
+        yield {"event": "error", "message": error["message"]}
+        return
+
+    parts = []
+    streamer = JSONStreamScanner()
+    # Deltas are already on their way to the client, so a stream cannot fail over —
+    # it goes to the best model and only feeds that model's stats
+    model = model_router.best("operations")
+    started = time.perf_counter()
+    try:
+        # 🛰️ Open a streaming request to OpenRouter
+        prompt = _build_prompt(project)
+        for delta in stream_chat_completion(
+            SYSTEM_PROMPT, prompt, timeout=Config.OPERATIONS_TIMEOUT, model=model, use_cache=use_cache
+        ):
+            parts.append(delta)
+            for field, text in streamer.feed(delta):
+                if field in RESULT_FIELDS:
+                    yield {"event": "field", "field": field, "delta": text}
+
+        _, status = parse_scanned(streamer, required_keys=("final_code",))
+        model_router.record(model, time.perf_counter() - started, ok=True,
+                            parsed=status in ("ok", "repaired"))
+        result = _parse_reply("".join(parts).strip(), prompt, scanner=streamer)
+        observe_phase("operations", time.perf_counter() - started)
+
+    except Exception as e:
+        model_router.record(model, time.perf_counter() - started, ok=False)
+        observe_phase("operations", time.perf_counter() - started, failed=True)
+        print(f"⚠️ Operations Manager Error: {e}")
+        yield {"event": "error", "message": str(e), "deferred": is_temporary_failure(e)}
+        return
+
+    yield {"event": "result", "data": _save_result(data, project, result, state)}
@@ -1,55 +1,201 @@
-import requests
 from config import Config
+from app.utils import dedupe
 from app.utils.json_handler import write_memory, read_memory
-from app.utils.search_api import search_project
+from app.utils.metrics import timed_phase
+from app.utils.search_api import asearch_project, search_project
 
 
-def find_coding_problem():
-    """Technical Manager: Finds an unsolved or tricky coding project idea."""
-    print("🔍 Technical Manager: Searching for coding projects...")
-
-    # Step 1: Define what to search for
-    query = "interesting Python automation project ideas OR open source Python projects to build"
-
-    # Step 2: Perform web search using Serper.dev
-    try:
-        results = search_project(query)
-    except Exception as e:
-        print(f"⚠️ Error while searching: {e}")
-        return {"status": "error", "message": str(e)}
+PROJECT_QUERY = "interesting Python automation project ideas OR open source Python projects to build"
+SEARCH_ERROR_TITLE = "Error fetching results"
 
-    if not results:
-        print("⚠️ No search results returned.")
-        return {"status": "error", "message": "No results found from Serper.dev."}
+# Keyword weights for ranking search results (title + snippet, case-insensitive)
+RANK_KEYWORDS = {
+    "python": 3,
+    "automation": 2,
+    "automate": 2,
+    "script": 1,
+    "project": 1,
+    "build": 1,
+    "tool": 1,
+    "open source": 1,
+    "github": 1,
+}
 
-    # Step 3: Safely handle the first valid result
-    project = results[0]
 
+def _to_project_summary(result):
+    """Turns one raw search result into the project summary the CEO reviews."""
     # ✅ Handle missing fields gracefully
-    title = project.get("title", "Untitled Project")
-    snippet = project.get("snippet", "No description available.")
-    link = project.get("link") or project.get("url") or "#"
+    title = result.get("title", "Untitled Project")
+    snippet = result.get("snippet", "No description available.")
+    link = result.get("link") or result.get("url") or "#"
 
-    # Step 4: Prepare project summary for CEO
-    project_summary = {
+    return {
         "project_title": title.strip(),
         "problem_summary": snippet.strip(),
         "source_link": link.strip(),
         "status": "Pending CEO Review"
     }
 
-    # Step 5: Save to memory.json
+
+def _score(project_summary):
+    """Relevance score: keyword hits plus a small bonus for descriptive snippets."""
+    text = f"{project_summary['project_title']} {project_summary['problem_summary']}".lower()
+    score = sum(weight for word, weight in RANK_KEYWORDS.items() if word in text)
+    return score + min(len(project_summary["problem_summary"]), 300) / 100
+
+
+def _dedupe_active():
+    # Mock search always returns the same placeholder, so it is never deduplicated
+    return Config.DEDUPE_ENABLED and Config.SEARCH_MODE != "mock"
+
+
+def _is_duplicate(project_summary, picked_signatures):
+    """True if the candidate was already executed or repeats one picked in this search."""
+    title = project_summary["project_title"]
+    if dedupe.is_executed_source(project_summary["source_link"]):
+        print(f"⏭️ Skipping already executed source: {project_summary['source_link']}")
+        return True
+    near = dedupe.find_near_duplicate(title, project_summary["problem_summary"])
+    if near:
+        print(f"⏭️ Skipping '{title}': {near[1]:.0%} similar to project {near[0]}")
+        return True
+    sig = dedupe.signature(dedupe.project_text(title, project_summary["problem_summary"]))
+    if sig and any(dedupe.similarity(sig, other) >= Config.DEDUPE_SIMILARITY for other in picked_signatures):
+        return True
+    if sig:
+        picked_signatures.append(sig)
+    return False
+
+
+def rank_candidates(results, seen=None, picked_signatures=None):
+    """
+    Scores every search result and returns fresh project summaries, best first.
+    Drops error placeholders, repeats within the search (`seen` links/titles),
+    executed sources and near-duplicates of executed projects.
+    """
+    seen = set() if seen is None else seen
+    picked_signatures = [] if picked_signatures is None else picked_signatures
+    summaries = [
+        _to_project_summary(r) for r in results
+        if r.get("title") != SEARCH_ERROR_TITLE
+    ]
+    summaries.sort(key=_score, reverse=True)
+
+    fresh = []
+    for project_summary in summaries:
+        key = project_summary["source_link"] if project_summary["source_link"] != "#" \
+            else project_summary["project_title"]
+        if key in seen:
+            continue
+        seen.add(key)
+        if _dedupe_active() and _is_duplicate(project_summary, picked_signatures):
+            continue
+        fresh.append(project_summary)
+    return fresh
+
+
+def _search_fresh(limit):
+    """
+    Searches page by page (up to TECHNICAL_MAX_PAGES) until `limit` fresh
+    candidates are found. Returns (candidates, error_message).
+    """
+    candidates, seen, picked_signatures = [], set(), []
+    for page in range(1, max(Config.TECHNICAL_MAX_PAGES, 1) + 1):
+        try:
+            results = search_project(PROJECT_QUERY, page=page)
+        except Exception as e:
+            print(f"⚠️ Error while searching: {e}")
+            return candidates, str(e)
+
+        done, error = _take_page(results, candidates, seen, picked_signatures, limit)
+        if error:
+            return candidates, error
+        if done:
+            break
+    return _fresh_outcome(candidates, seen, limit)
+
+
+async def _asearch_fresh(limit):
+    """`_search_fresh` for the async pipeline."""
+    candidates, seen, picked_signatures = [], set(), []
+    for page in range(1, max(Config.TECHNICAL_MAX_PAGES, 1) + 1):
+        try:
+            results = await asearch_project(PROJECT_QUERY, page=page)
+        except Exception as e:
+            print(f"⚠️ Error while searching: {e}")
+            return candidates, str(e)
+
+        done, error = _take_page(results, candidates, seen, picked_signatures, limit)
+        if error:
+            return candidates, error
+        if done:
+            break
+    return _fresh_outcome(candidates, seen, limit)
+
+
+def _take_page(results, candidates, seen, picked_signatures, limit):
+    """Ranks one page of results into `candidates`. Returns (done, error_message)."""
+    if not results:
+        return True, None
+    if all(r.get("title") == SEARCH_ERROR_TITLE for r in results):
+        return True, results[0].get("snippet") or "Search failed."
+
+    candidates += rank_candidates(results, seen, picked_signatures)
+    return len(candidates) >= limit or Config.SEARCH_MODE == "mock", None
+
+
+def _fresh_outcome(candidates, seen, limit):
+    if not candidates and not seen:
+        return [], "No results found from Serper.dev."
+    if not candidates:
+        return [], "No fresh candidates: every result was already executed or a near-duplicate."
+    return candidates[:limit], None
+
+
+@timed_phase("technical")
+def find_coding_problem(state=None):
+    """
+    Technical Manager: Finds an unsolved or tricky coding project idea.
+    Picks the best-ranked result that hasn't been executed before.
+    Stores it under 'current_project' in `state` when given, otherwise in memory.json.
+    """
+    print("🔍 Technical Manager: Searching for coding projects...")
+
+    # Step 1 + 2: Search, rank and drop already executed candidates
+    candidates, error = _search_fresh(1)
+    if not candidates:
+        print(f"⚠️ {error}")
+        return {"status": "error", "message": error}
+
+    # Step 3 + 4: Best fresh candidate becomes the project summary for the CEO
+    return _store_project(candidates[0], state)
+
+
+@timed_phase("technical")
+async def afind_coding_problem(state=None):
+    """`find_coding_problem` for the async pipeline (search over httpx)."""
+    print("🔍 Technical Manager: Searching for coding projects...")
+    candidates, error = await _asearch_fresh(1)
+    if not candidates:
+        print(f"⚠️ {error}")
+        return {"status": "error", "message": error}
+    return _store_project(candidates[0], state)
+
+
+def _store_project(project_summary, state):
+    """Step 5: Save the picked project to the run state (or memory.json)."""
     try:
-        data = read_memory()
+        data = state if state is not None else read_memory()
 
         # ✅ Always overwrite under 'current_project' (standard key)
-        data["current_project"] = project_summary
+        data["current_project"] = dict(project_summary)
 
         # Optional tracking info
         data["last_action"] = "technical_search"
-        write_memory(data)
+        if state is None:
+            write_memory(data)
 
-        print("✅ Technical Manager: Project identified and saved to memory.json under 'current_project'.")
+        print("✅ Technical Manager: Project identified and saved under 'current_project'.")
     except Exception as e:
         print(f"⚠️ Error writing to memory: {e}")
         return {"status": "error", "message": f"Failed to save project: {e}"}
@@ -59,3 +205,27 @@ def find_coding_problem():
         "message": "Technical Manager found a project",
         "project": project_summary
     }
+
+
+@timed_phase("technical")
+def find_coding_problems(limit):
+    """
+    Technical Manager (batch): Finds up to `limit` distinct, fresh project ideas.
+    Returns one Technical result per candidate so each can run with its own state.
+    """
+    print(f"🔍 Technical Manager: Searching for up to {limit} coding projects...")
+
+    candidates, error = _search_fresh(limit)
+    if not candidates:
+        print(f"⚠️ {error}")
+        return [{"status": "error", "message": error}]
+
+    print(f"✅ Technical Manager: {len(candidates)} candidate project(s) identified.")
+    return [
+        {
+            "status": "success",
+            "message": "Technical Manager found a project",
+            "project": project_summary
+        }
+        for project_summary in candidates
+    ]
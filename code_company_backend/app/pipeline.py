@@ -0,0 +1,461 @@
+# app/pipeline.py
+"""
+🏢 Company pipeline — Technical → CEO → Operations → logging, for one or many runs.
+Every run works on its own state dict, so overlapping runs never share 'current_project'.
+`arun_company` is the same single run as a coroutine for the shared async loop.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import Config
+from app.models.technical import afind_coding_problem, find_coding_problem, find_coding_problems
+from app.models.ceo import aceo_decision, apply_ceo_decision, ceo_decision, ceo_decisions, deferred_result
+from app.models.operations import (
+    aexecute_project, aretry_project, execute_project, retry_project, stream_project
+)
+from app.utils import code_validator, tracing
+from app.utils.json_handler import update_memory
+from app.utils.supabase_logger import log_project_run
+from app.utils.save_project import append_project
+
+CEO_PROMPT = "Approve only Python or automation-based projects"
+
+_id_lock = threading.Lock()
+_last_project_id = 0
+
+
+def _next_project_id():
+    """Second-based project id that stays unique when runs finish in the same second."""
+    global _last_project_id
+    with _id_lock:
+        _last_project_id = max(_last_project_id + 1, int(time.time()))
+        return _last_project_id
+
+
+def _remember_last_run(state):
+    """Mirrors a finished run into the pipeline state so the step routes see it."""
+    update_memory({
+        "current_project": state.get("current_project"),
+        "last_action": "company_run"
+    })
+
+
+def _report(progress, phase, status):
+    """Forwards a phase transition to the optional progress callback."""
+    if progress is not None:
+        try:
+            progress(phase, status)
+        except Exception as e:
+            print(f"⚠️ Progress callback failed: {e}")
+
+
+def _technical_phase(technical_result, state, progress):
+    """1️⃣ Technical phase — searches unless a candidate was handed in (batch mode)."""
+    if technical_result is None:
+        print("\n🚀 Starting Technical Manager phase...")
+        _report(progress, "technical", "running")
+        technical_result = find_coding_problem(state=state)
+        _report(progress, "technical", "completed")
+    elif technical_result.get("status") == "success":
+        state["current_project"] = dict(technical_result["project"])
+    return technical_result
+
+
+def _ceo_phase(state, progress, use_cache=True, decision=None):
+    """2️⃣ CEO phase — reviews the project held in `state`, or applies a batch `decision`."""
+    print("\n👑 Starting CEO decision phase...")
+    _report(progress, "ceo", "running")
+    if decision is not None and decision.get("deferred"):
+        ceo_result = deferred_result(state.get("current_project"), decision["reason"])
+    elif decision is not None:
+        ceo_result = apply_ceo_decision(decision, state=state)
+    else:
+        ceo_result = ceo_decision(user_prompt=CEO_PROMPT, state=state, use_cache=use_cache)
+    _report(progress, "ceo", "completed")
+    return ceo_result
+
+
+def _validation_phase(operations_result, state, progress, use_cache=True):
+    """
+    🧪 Validation phase — checks the generated code on the validator pool and
+    regenerates it (up to CODE_VALIDATION_RETRIES times) when it is broken.
+    Returns the final Operations result with a 'validation' report attached.
+    """
+    if not Config.CODE_VALIDATION_ENABLED or operations_result.get("status") != "success":
+        _report(progress, "validation", "skipped")
+        return operations_result
+
+    _report(progress, "validation", "running")
+    feedback = None
+    for attempt in range(Config.CODE_VALIDATION_RETRIES + 1):
+        report = code_validator.submit(operations_result.get("final_code", "")).result()
+        report["attempts"] = attempt + 1
+        if report["valid"] or attempt == Config.CODE_VALIDATION_RETRIES:
+            break
+        print(f"🧪 Generated code failed validation ({report['error']}) — regenerating...")
+        retried = retry_project(state, report["error"], use_cache=use_cache, previous_feedback=feedback)
+        if retried.get("status") != "success":
+            break
+        operations_result, feedback = retried, report["error"]
+
+    print(f"🧪 Validation: {'passed' if report['valid'] else 'failed'} after {report['attempts']} attempt(s)")
+    operations_result["validation"] = report
+    _report(progress, "validation", "completed")
+    return operations_result
+
+
+async def _avalidation_phase(operations_result, state, progress, use_cache=True):
+    """`_validation_phase` for the async pipeline: waits on the validator pool without blocking the loop."""
+    if not Config.CODE_VALIDATION_ENABLED or operations_result.get("status") != "success":
+        _report(progress, "validation", "skipped")
+        return operations_result
+
+    _report(progress, "validation", "running")
+    feedback = None
+    for attempt in range(Config.CODE_VALIDATION_RETRIES + 1):
+        report = await asyncio.wrap_future(code_validator.submit(operations_result.get("final_code", "")))
+        report["attempts"] = attempt + 1
+        if report["valid"] or attempt == Config.CODE_VALIDATION_RETRIES:
+            break
+        print(f"🧪 Generated code failed validation ({report['error']}) — regenerating...")
+        retried = await aretry_project(state, report["error"], use_cache=use_cache, previous_feedback=feedback)
+        if retried.get("status") != "success":
+            break
+        operations_result, feedback = retried, report["error"]
+
+    print(f"🧪 Validation: {'passed' if report['valid'] else 'failed'} after {report['attempts']} attempt(s)")
+    operations_result["validation"] = report
+    _report(progress, "validation", "completed")
+    return operations_result
+
+
+def _record_phase(workflow_log, state, progress):
+    """Supabase logging + project file phases. Adds 'project' to the workflow log."""
+    technical_project = workflow_log["technical"].get("project", {})
+    ceo_result = workflow_log["ceo"]
+    operations_result = workflow_log["operations"]
+
+    # 4️⃣ Log to Supabase (queued for the background writer)
+    print("\n🗄️ Logging company run to Supabase...")
+    _report(progress, "logging", "running")
+    try:
+        log_project_run(
+            project_title=technical_project.get("project_title", "N/A"),
+            ceo_decision=ceo_result.get("decision", "N/A"),
+            ceo_reason=ceo_result.get("reason", "N/A"),
+            operations_status=operations_result.get("status", "N/A")
+        )
+        print("✅ Supabase log entry queued.")
+    except Exception as log_err:
+        print(f"⚠️ Supabase logging failed: {log_err}")
+    _report(progress, "logging", "completed")
+
+    # 5️⃣ Append to Local File for Frontend
+    project_record = {
+        "id": _next_project_id(),
+        "title": operations_result.get("project_title") or technical_project.get("project_title", "Untitled Project"),
+        "summary": operations_result.get("solution_summary") or "",
+        # The proposal text the candidate was picked on (what dedupe compares new candidates with)
+        "problem_summary": technical_project.get("problem_summary", ""),
+        # Who made the CEO call ("llm", "rules", "classifier", "fallback"); the classifier trains on "llm" only
+        "ceo_decision": ceo_result.get("decision"),
+        "ceo_decided_by": ceo_result.get("decided_by"),
+        "details_markdown": operations_result.get("final_code") or "",
+        "status": operations_result.get("status", "unknown"),
+        "executed_at": datetime.utcnow().isoformat() + "Z",
+        "source": technical_project.get("source_link", "")
+    }
+    if operations_result.get("validation"):
+        project_record["validation"] = operations_result["validation"]
+
+    _report(progress, "saving", "running")
+    try:
+        append_project(project_record)
+        print(f"✅ Project {project_record['id']} saved to the project store")
+    except Exception as e:
+        print(f"⚠️ Failed to append project to file: {e}")
+
+    try:
+        _remember_last_run(state)
+    except Exception as e:
+        print(f"⚠️ Failed to update pipeline state: {e}")
+    _report(progress, "saving", "completed")
+
+    workflow_log["project"] = project_record
+    return workflow_log
+
+
+def _defer_run(workflow_log, progress, phases):
+    """
+    Ends a run whose CEO or Operations provider was busy or down. Nothing is
+    logged or saved, so the candidate stays fresh for a later run.
+    """
+    for phase in phases:
+        _report(progress, phase, "skipped")
+    print("🚦 Run deferred — provider busy or down; nothing was saved.")
+    workflow_log["project"] = None
+    return workflow_log
+
+
+def _finish_trace(trace, workflow_log):
+    """Copies the run outcome onto its trace and the trace id into the workflow log."""
+    if trace is None:
+        return
+    summary = summarize_run(workflow_log)
+    technical_project = workflow_log.get("technical", {}).get("project") or {}
+    trace.attrs.update(
+        project_title=summary["technical"]["project_title"],
+        problem_summary=(technical_project.get("problem_summary") or "")[:500],
+        source_link=technical_project.get("source_link"),
+        ceo_decision=workflow_log.get("ceo", {}).get("decision") or workflow_log.get("ceo", {}).get("status"),
+        operations_status=summary["operations"]["status"],
+        code_valid=summary["operations"]["code_valid"],
+    )
+    workflow_log["trace_id"] = trace.id
+
+
+def run_company(technical_result=None, state=None, progress=None, use_cache=True,
+                ceo_result=None, batch_id=None):
+    """
+    Runs the full workflow for one project on an isolated state dict.
+    `technical_result` skips the search phase and `ceo_result` the CEO model
+    call (both used by batch mode; `batch_id` links the run's trace to its batch).
+    `progress(phase, status)` is called as each phase starts and finishes.
+    `use_cache=False` bypasses the LLM response cache for CEO and Operations.
+    Returns the workflow log with 'technical', 'ceo', 'operations' and 'project'
+    keys, plus 'trace_id' when tracing is on.
+    """
+    with tracing.start_trace("company_run", batch_id=batch_id) as trace:
+        workflow_log = _run_company(technical_result, state, progress, use_cache, ceo_result)
+        _finish_trace(trace, workflow_log)
+    return workflow_log
+
+
+def _run_company(technical_result, state, progress, use_cache, ceo_result):
+    state = state if state is not None else {}
+    workflow_log = {}
+    workflow_log["technical"] = _technical_phase(technical_result, state, progress)
+    workflow_log["ceo"] = _ceo_phase(state, progress, use_cache, decision=ceo_result)
+    if workflow_log["ceo"].get("status") == "deferred":
+        workflow_log["operations"] = {"status": "deferred", "message": "CEO review deferred."}
+        return _defer_run(workflow_log, progress, ("operations", "validation", "logging", "saving"))
+
+    # 3️⃣ Operations Phase
+    print("\n⚙️ Starting Operations Manager phase...")
+    if workflow_log["ceo"].get("decision") == "approve":
+        _report(progress, "operations", "running")
+        operations_result = execute_project(state=state, use_cache=use_cache)
+        _report(progress, "operations", "completed")
+        operations_result = _validation_phase(operations_result, state, progress, use_cache)
+    else:
+        operations_result = {
+            "status": "skipped",
+            "message": "Project not approved by CEO."
+        }
+        _report(progress, "operations", "skipped")
+        _report(progress, "validation", "skipped")
+    workflow_log["operations"] = operations_result
+    if operations_result.get("status") == "deferred":
+        return _defer_run(workflow_log, progress, ("logging", "saving"))
+
+    return _record_phase(workflow_log, state, progress)
+
+
+async def arun_company(state=None, progress=None, use_cache=True):
+    """
+    `run_company` as a coroutine (no batch hand-ins). Search, CEO and Operations
+    calls await httpx on the shared loop; validation waits on the validator pool
+    and the logging / saving phase runs in a worker thread.
+    """
+    with tracing.start_trace("company_run", async_run=True) as trace:
+        workflow_log = await _arun_company(state, progress, use_cache)
+        _finish_trace(trace, workflow_log)
+    return workflow_log
+
+
+async def _arun_company(state, progress, use_cache):
+    state = state if state is not None else {}
+    workflow_log = {}
+
+    print("\n🚀 Starting Technical Manager phase...")
+    _report(progress, "technical", "running")
+    workflow_log["technical"] = await afind_coding_problem(state=state)
+    _report(progress, "technical", "completed")
+
+    print("\n👑 Starting CEO decision phase...")
+    _report(progress, "ceo", "running")
+    workflow_log["ceo"] = await aceo_decision(user_prompt=CEO_PROMPT, state=state, use_cache=use_cache)
+    _report(progress, "ceo", "completed")
+    if workflow_log["ceo"].get("status") == "deferred":
+        workflow_log["operations"] = {"status": "deferred", "message": "CEO review deferred."}
+        return _defer_run(workflow_log, progress, ("operations", "validation", "logging", "saving"))
+
+    print("\n⚙️ Starting Operations Manager phase...")
+    if workflow_log["ceo"].get("decision") == "approve":
+        _report(progress, "operations", "running")
+        operations_result = await aexecute_project(state=state, use_cache=use_cache)
+        _report(progress, "operations", "completed")
+        operations_result = await _avalidation_phase(operations_result, state, progress, use_cache)
+    else:
+        operations_result = {
+            "status": "skipped",
+            "message": "Project not approved by CEO."
+        }
+        _report(progress, "operations", "skipped")
+        _report(progress, "validation", "skipped")
+    workflow_log["operations"] = operations_result
+    if operations_result.get("status") == "deferred":
+        return _defer_run(workflow_log, progress, ("logging", "saving"))
+
+    # Project store / memory.json writes are blocking file I/O
+    return await asyncio.to_thread(_record_phase, workflow_log, state, progress)
+
+
+def run_company_stream(use_cache=True):
+    """
+    Streaming variant of `run_company` for Server-Sent Events.
+    Yields {"event": ..., ...} dicts: a 'phase' event per phase transition,
+    'field' events with Operations output as it is generated, and a final 'done'.
+    """
+    with tracing.start_trace("company_run", stream=True) as trace:
+        yield from _run_company_stream(use_cache, trace)
+
+
+def _run_company_stream(use_cache, trace):
+    state = {}
+    workflow_log = {}
+
+    yield {"event": "phase", "phase": "technical", "status": "running"}
+    workflow_log["technical"] = _technical_phase(None, state, None)
+    yield {"event": "technical", "data": workflow_log["technical"]}
+
+    yield {"event": "phase", "phase": "ceo", "status": "running"}
+    workflow_log["ceo"] = _ceo_phase(state, None, use_cache)
+    yield {"event": "ceo", "data": workflow_log["ceo"]}
+
+    if workflow_log["ceo"].get("status") == "deferred":
+        operations_result = {"status": "deferred", "message": "CEO review deferred."}
+        yield {"event": "phase", "phase": "operations", "status": "skipped"}
+    elif workflow_log["ceo"].get("decision") == "approve":
+        print("\n⚙️ Starting Operations Manager phase (streaming)...")
+        yield {"event": "phase", "phase": "operations", "status": "running"}
+        operations_result = {"status": "error", "message": "Operations stream ended early."}
+        for event in stream_project(state=state, use_cache=use_cache):
+            if event["event"] == "result":
+                operations_result = event["data"]
+            elif event["event"] == "error":
+                status = "deferred" if event.pop("deferred", False) else "error"
+                operations_result = {"status": status, "message": event["message"]}
+                yield event
+            else:
+                yield event
+        yield {"event": "phase", "phase": "operations", "status": "completed"}
+
+        yield {"event": "phase", "phase": "validation", "status": "running"}
+        operations_result = _validation_phase(operations_result, state, None, use_cache)
+        yield {"event": "validation", "data": operations_result.get("validation")}
+    else:
+        operations_result = {
+            "status": "skipped",
+            "message": "Project not approved by CEO."
+        }
+        yield {"event": "phase", "phase": "operations", "status": "skipped"}
+    workflow_log["operations"] = operations_result
+
+    if operations_result.get("status") == "deferred":
+        _defer_run(workflow_log, None, ())
+    else:
+        _record_phase(workflow_log, state, None)
+    _finish_trace(trace, workflow_log)
+    yield {
+        "event": "done",
+        "data": {
+            "status": "completed",
+            "company": "Code Company (Beta)",
+            "summary": summarize_run(workflow_log),
+            "details": workflow_log
+        }
+    }
+
+
+def run_company_batch(batch_size, progress=None, on_candidates=None, use_cache=True):
+    """
+    Pushes up to `batch_size` candidates through the workflow concurrently.
+    Uses one shared search and one batched CEO review, then a bounded worker
+    pool (Config.BATCH_MAX_WORKERS) for Operations.
+    `on_candidates(count)` is called once the number of runs is known.
+    The shared search and CEO review are traced as a 'company_batch' trace;
+    each run gets its own trace carrying the batch id.
+    """
+    with tracing.start_trace("company_batch", batch_size=batch_size) as trace:
+        return _run_company_batch(batch_size, progress, on_candidates, use_cache,
+                                  trace.id if trace else None)
+
+
+def _run_company_batch(batch_size, progress, on_candidates, use_cache, batch_id):
+    _report(progress, "technical", "running")
+    candidates = [
+        c for c in find_coding_problems(batch_size) if c.get("status") == "success"
+    ]
+    _report(progress, "technical", "completed")
+    tracing.annotate_trace(candidates=len(candidates))
+    if on_candidates is not None:
+        on_candidates(len(candidates))
+    if not candidates:
+        return []
+
+    try:
+        decisions = ceo_decisions(
+            {str(i): c["project"] for i, c in enumerate(candidates)}, use_cache=use_cache
+        )
+    except Exception as e:
+        print(f"⚠️ Batched CEO review failed, reviewing one by one: {e}")
+        decisions = {}
+
+    workers = max(1, min(Config.BATCH_MAX_WORKERS, len(candidates)))
+    print(f"\n🏭 Running {len(candidates)} project(s) on {workers} worker(s)...")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="company-run") as pool:
+        futures = [
+            pool.submit(
+                run_company, technical_result=c, progress=progress, use_cache=use_cache,
+                ceo_result=decisions.get(str(i)), batch_id=batch_id
+            )
+            for i, c in enumerate(candidates)
+        ]
+        runs = []
+        for candidate, future in zip(candidates, futures):
+            try:
+                runs.append(future.result())
+            except Exception as e:
+                print(f"⚠️ Batch run failed: {e}")
+                runs.append({
+                    "technical": candidate,
+                    "ceo": {},
+                    "operations": {"status": "error", "message": str(e)},
+                })
+    return runs
+
+
+def summarize_run(workflow_log):
+    """Short per-phase summary used in API responses."""
+    technical_project = workflow_log.get("technical", {}).get("project", {})
+    ceo_result = workflow_log.get("ceo", {})
+    operations_result = workflow_log.get("operations", {})
+    return {
+        "technical": {
+            "project_title": technical_project.get("project_title", "N/A"),
+            "status": technical_project.get("status", "N/A")
+        },
+        "ceo": {
+            "decision": ceo_result.get("decision", "N/A"),
+            "reason": ceo_result.get("reason", "N/A")
+        },
+        "operations": {
+            "status": operations_result.get("status", "N/A"),
+            "message": operations_result.get("message", "N/A"),
+            "code_valid": (operations_result.get("validation") or {}).get("valid")
+        }
+    }
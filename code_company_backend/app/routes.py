@@ -1,16 +1,32 @@
-from flask import Blueprint, request, jsonify, current_app
+import json
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from app.utils.json_handler import save_to_json, read_json
-from app.utils.search_api import search
-from app.models.technical import find_coding_problem
-from app.models.ceo import ceo_decision
-from app.models.operations import execute_project
-from app.utils.supabase_logger import log_project_run, fetch_project_history
-from app.utils.save_project import append_project
-import time
-from datetime import datetime
+from app.jobs import job_manager
+from app.scheduler import read_scheduler_state
+from app.utils import project_search, project_store
+from app.utils import metrics, tracing
+from app.utils.http_cache import cached_json, make_etag
+from config import Config
 
 main = Blueprint("main", __name__)
 
+# The models, pipeline, search and Supabase modules (and the HTTP / SDK stacks behind
+# them) are imported inside the routes that use them, so the process boots and serves
+# /api/projects, /metrics, ... without paying for them; the first call imports them once.
+
+
+def _use_llm_cache():
+    """?nocache=1 bypasses the LLM response cache for this request."""
+    return request.args.get("nocache", "").lower() not in ("1", "true", "yes")
+
+
+def _use_async():
+    """?async=1|0 picks the asyncio pipeline for this request; defaults to Config.ASYNC_RUNS."""
+    value = request.args.get("async", "").lower()
+    if not value:
+        return Config.ASYNC_RUNS
+    return value in ("1", "true", "yes")
+
 # 🏠 HOME ROUTE
 @main.route("/", methods=["GET"])
 def home():
@@ -20,14 +36,25 @@ def home():
         "available_routes": [
             "/api/test",
             "/api/projects",
+            "/api/projects/<id>/code",
+            "/api/projects/search",
             "/search",
             "/save",
             "/read",
             "/technical/search",
             "/ceo/decision",
+            "/ceo/classifier",
             "/operations/execute",
             "/company/run",
-            "/company/history"
+            "/company/run/stream",
+            "/company/jobs",
+            "/company/jobs/<job_id>",
+            "/company/scheduler",
+            "/company/models",
+            "/company/traces",
+            "/company/traces/<trace_id>",
+            "/company/history",
+            "/metrics"
         ]
     }), 200
 
@@ -35,7 +62,7 @@ def home():
 # 💾 SAVE DATA
 @main.route("/save", methods=["POST"])
 def save_data():
-    """Saves custom JSON data to local memory.json file."""
+    """Saves custom JSON data to the 'saved' namespace of the state store."""
     data = request.get_json()
     if not data:
         return jsonify({"status": "error", "message": "No JSON data provided"}), 400
@@ -55,7 +82,7 @@ def save_data():
 # 📂 READ SAVED DATA
 @main.route("/read", methods=["GET"])
 def read_data():
-    """Fetches all stored JSON data from memory.json."""
+    """Fetches the JSON data stored by /save."""
     try:
         data = read_json()
         return jsonify({
@@ -81,12 +108,13 @@ def search_route():
         return jsonify({"status": "error", "message": "Missing query parameter"}), 400
 
     try:
+        from app.utils.search_api import search
         results = search(query)
         save_to_json({
             "type": "search",
             "query": query,
             "count": len(results)
-        })
+        }, namespace="last_search")
         return jsonify({
             "status": "success",
             "query": query,
@@ -102,6 +130,7 @@ def search_route():
 def technical_search():
     """Triggers the Technical Manager AI to find one unsolved or tricky coding problem."""
     try:
+        from app.models.technical import find_coding_problem
         result = find_coding_problem()
         if isinstance(result, dict) and "status" in result:
             return jsonify(result), 200
@@ -123,19 +152,29 @@ def ceo_route():
     try:
         data = request.get_json(silent=True) or {}
         user_prompt = data.get("prompt")
-        result = ceo_decision(user_prompt=user_prompt)
+        from app.models.ceo import ceo_decision
+        result = ceo_decision(user_prompt=user_prompt, use_cache=_use_llm_cache())
         return jsonify(result), 200
     except Exception as e:
         current_app.logger.exception("CEO decision error")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+# 🤖 CEO — LOCAL APPROVAL CLASSIFIER STATS
+@main.route("/ceo/classifier", methods=["GET"])
+def ceo_classifier():
+    """Training size, local decision count and agreement with the LLM."""
+    from app.utils.approval_model import approval_model
+    return jsonify({"status": "success", "classifier": approval_model.summary()}), 200
+
+
 # ⚙️ OPERATIONS MANAGER — PROJECT EXECUTION
 @main.route("/operations/execute", methods=["POST"])
 def operations_execute():
     """Runs the Operations Manager AI to execute the approved project."""
     try:
-        result = execute_project()
+        from app.models.operations import execute_project
+        result = execute_project(use_cache=_use_llm_cache())
         return jsonify(result), 200
     except Exception as e:
         current_app.logger.exception("Operations execution error")
@@ -143,7 +182,48 @@ def operations_execute():
 
 
 # 🏢 FULL COMPANY WORKFLOW — AUTO EXECUTION + SUPABASE LOGGING
-@main.route("/company/run", methods=["GET"])
+def _single_run_payload(workflow_log):
+    from app.pipeline import summarize_run
+    return {
+        "status": "completed",
+        "company": "Code Company (Beta)",
+        "summary": summarize_run(workflow_log),
+        "details": workflow_log
+    }
+
+
+def _batch_run_payload(batch, runs):
+    from app.pipeline import summarize_run
+    return {
+        "status": "completed",
+        "company": "Code Company (Beta)",
+        "batch": batch,
+        "count": len(runs),
+        "runs": [
+            {"summary": summarize_run(run), "details": run} for run in runs
+        ]
+    }
+
+
+def _company_job(batch, use_cache, run_async=False):
+    """Builds the background job body for a single or batch company run."""
+    async def awork(job):
+        from app.pipeline import arun_company
+        return _single_run_payload(await arun_company(progress=job.report, use_cache=use_cache))
+
+    def work(job):
+        from app.pipeline import run_company, run_company_batch
+        if batch:
+            runs = run_company_batch(
+                batch, progress=job.report, on_candidates=job.set_total_runs,
+                use_cache=use_cache
+            )
+            return _batch_run_payload(batch, runs)
+        return _single_run_payload(run_company(progress=job.report, use_cache=use_cache))
+    return awork if run_async else work
+
+
+@main.route("/company/run", methods=["GET", "POST"])
 def company_run():
     """
     Runs the full AI company workflow automatically:
@@ -151,87 +231,53 @@ def company_run():
     2️⃣ CEO (OPENAI) reviews and approves/rejects.
     3️⃣ Operations Manager executes if approved.
     4️⃣ Logs results to Supabase and local file.
+    The run is queued as a background job and its id returned at once (202).
+    Pass ?batch=N to push N candidates through the workflow concurrently,
+    ?wait=1 to block until the run finishes (legacy behaviour),
+    ?nocache=1 to skip the LLM response cache, and ?async=1|0 to run a single
+    (non-batch) run on the shared asyncio loop (default: ASYNC_RUNS).
     """
     try:
-        workflow_log = {}
-
-        # 1️⃣ Technical Phase
-        print("\n🚀 Starting Technical Manager phase...")
-        technical_result = find_coding_problem()
-        workflow_log["technical"] = technical_result
-
-        # 2️⃣ CEO Phase
-        print("\n👑 Starting CEO decision phase...")
-        ceo_result = ceo_decision(
-            user_prompt="Approve only Python or automation-based projects"
+        batch = request.args.get("batch", type=int)
+        if batch:
+            batch = max(1, min(batch, Config.BATCH_MAX_SIZE))
+        use_cache = _use_llm_cache()
+        run_async = _use_async() and not batch
+
+        if request.args.get("wait", "").lower() in ("1", "true", "yes"):
+            from app.pipeline import arun_company, run_company, run_company_batch
+            if batch:
+                runs = run_company_batch(batch, use_cache=use_cache)
+                return jsonify(_batch_run_payload(batch, runs)), 200
+            if run_async:
+                from app.utils import async_runner
+                workflow_log = async_runner.submit(arun_company(use_cache=use_cache)).result()
+                return jsonify(_single_run_payload(workflow_log)), 200
+            return jsonify(_single_run_payload(run_company(use_cache=use_cache))), 200
+
+        params = {"batch": batch} if batch else {}
+        if not use_cache:
+            params["nocache"] = True
+        if run_async:
+            params["async"] = True
+        job, created = job_manager.submit(
+            key=f"company_run:batch={batch or 0}:cache={use_cache}:async={run_async}",
+            kind="company_run",
+            fn=_company_job(batch, use_cache, run_async),
+            params=params,
+            run_async=run_async
         )
-        workflow_log["ceo"] = ceo_result
-
-        # 3️⃣ Operations Phase
-        print("\n⚙️ Starting Operations Manager phase...")
-        if ceo_result.get("decision") == "approve":
-            operations_result = execute_project()
+        if created:
+            print(f"🧵 Company run queued as job {job.id}")
         else:
-            operations_result = {
-                "status": "skipped",
-                "message": "Project not approved by CEO."
-            }
-        workflow_log["operations"] = operations_result
+            print(f"🧵 Company run coalesced into in-flight job {job.id}")
 
-        # 4️⃣ Log to Supabase
-        print("\n🗄️ Logging company run to Supabase...")
-        try:
-            log_project_run(
-                project_title=technical_result.get("project", {}).get("project_title", "N/A"),
-                ceo_decision=ceo_result.get("decision", "N/A"),
-                ceo_reason=ceo_result.get("reason", "N/A"),
-                operations_status=operations_result.get("status", "N/A")
-            )
-            print("✅ Supabase log entry created successfully.")
-        except Exception as log_err:
-            print(f"⚠️ Supabase logging failed: {log_err}")
-
-        # 5️⃣ Append to Local File for Frontend
-        from app.utils.save_project import append_project
-        import time
-        from datetime import datetime
-
-        project_record = {
-            "id": int(time.time()),
-            "title": operations_result.get("project_title") or technical_result.get("project", {}).get("project_title", "Untitled Project"),
-            "summary": operations_result.get("solution_summary") or "",
-            "details_markdown": operations_result.get("final_code") or "",
-            "status": operations_result.get("status", "unknown"),
-            "executed_at": datetime.utcnow().isoformat() + "Z",
-            "source": technical_result.get("project", {}).get("source_link", "")
-        }
-
-        try:
-            append_project(project_record)
-            print("✅ Project appended to app/data/projects.json")
-        except Exception as e:
-            print(f"⚠️ Failed to append project to file: {e}")
-
-        # 6️⃣ Final Response
         return jsonify({
-            "status": "completed",
-            "company": "Code Company (Beta)",
-            "summary": {
-                "technical": {
-                    "project_title": technical_result.get("project", {}).get("project_title", "N/A"),
-                    "status": technical_result.get("project", {}).get("status", "N/A")
-                },
-                "ceo": {
-                    "decision": ceo_result.get("decision", "N/A"),
-                    "reason": ceo_result.get("reason", "N/A")
-                },
-                "operations": {
-                    "status": operations_result.get("status", "N/A"),
-                    "message": operations_result.get("message", "N/A")
-                }
-            },
-            "details": workflow_log
-        }), 200
+            "status": job.status,
+            "job_id": job.id,
+            "coalesced": not created,
+            "status_url": f"/company/jobs/{job.id}"
+        }), 202
 
     except Exception as e:
         current_app.logger.exception("Company workflow error")
@@ -240,20 +286,166 @@ def company_run():
             "message": str(e)
         }), 500
 
-# 🗂️ COMPANY PROJECT HISTORY — FETCH FROM SUPABASE
+
+# 📡 STREAMED COMPANY RUN — SERVER-SENT EVENTS
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@main.route("/company/run/stream", methods=["GET"])
+def company_run_stream():
+    """
+    Runs one company workflow and streams it as Server-Sent Events:
+    'phase' transitions, Operations 'field' deltas (final_code, solution_summary, ...)
+    as tokens arrive, and a final 'done' event with the same body as /company/run?wait=1.
+    The parsed result is still saved to the project store at the end.
+    """
+    from app.pipeline import run_company_stream
+
+    def generate():
+        try:
+            for event in run_company_stream(use_cache=_use_llm_cache()):
+                name = event.pop("event")
+                yield _sse(name, event)
+        except Exception as e:
+            current_app.logger.exception("Company stream error")
+            yield _sse("error", {"message": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# 🧵 COMPANY JOBS — STATUS OF BACKGROUND RUNS
+@main.route("/company/jobs/<job_id>", methods=["GET"])
+def company_job_status(job_id):
+    """Status, per-phase progress and (once finished) the result of one job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@main.route("/company/jobs", methods=["GET"])
+def company_jobs():
+    """Lists recent jobs (newest first). Optional ?status= and ?limit= filters."""
+    status = request.args.get("status")
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+    jobs = job_manager.list_jobs(status=status, limit=limit)
+    from app.utils import async_runner
+    return jsonify({
+        "status": "success",
+        "async_runner": async_runner.snapshot(),
+        "count": len(jobs),
+        "jobs": [job.to_dict(include_result=False) for job in jobs]
+    }), 200
+
+
+# ⏰ SCHEDULER WORKER STATUS
+@main.route("/company/scheduler", methods=["GET"])
+def company_scheduler():
+    """Cadence, counters and next due time written by the scheduler worker (python worker.py)."""
+    state = read_scheduler_state()
+    if not state:
+        return jsonify({"status": "success", "running": False, "scheduler": {}}), 200
+    return jsonify({"status": "success", "running": bool(state.get("worker_pid")), "scheduler": state}), 200
+
+
+# 🧭 MODEL ROUTING STATS
+@main.route("/company/models", methods=["GET"])
+def company_models():
+    """Per-role model ranking, rolling latency / error / parse stats and provider state."""
+    from app.utils import rate_limit
+    from app.utils.model_router import model_router
+    return jsonify({
+        "status": "success",
+        "roles": model_router.snapshot(),
+        "providers": rate_limit.snapshot()
+    }), 200
+
+
+# 🧵 RUN TRACES
+@main.route("/company/traces", methods=["GET"])
+def company_traces():
+    """Stored run traces, newest first (?slowest=1 sorts by duration; ?kind=, ?limit=)."""
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be an integer"}), 400
+    slowest = request.args.get("slowest", "").lower() in ("1", "true", "yes")
+    traces = tracing.list_traces(limit=limit, slowest=slowest, kind=request.args.get("kind"))
+    return jsonify({"status": "success", "traces": traces}), 200
+
+
+@main.route("/company/traces/<trace_id>", methods=["GET"])
+def company_trace(trace_id):
+    """One stored trace with all of its spans."""
+    if "/" in trace_id or trace_id.startswith("."):
+        return jsonify({"status": "error", "message": "Invalid trace id."}), 400
+    trace = tracing.load(tracing.trace_path(trace_id))
+    if trace is None:
+        return jsonify({"status": "error", "message": "Trace not found."}), 404
+    return jsonify({"status": "success", "trace": trace}), 200
+
+
+# 📈 PROMETHEUS METRICS
+@main.route("/metrics", methods=["GET"])
+def metrics_route():
+    """Phase latency histograms, route counters, cache hit ratios and LLM token usage."""
+    if not Config.METRICS_ENABLED:
+        return jsonify({"status": "error", "message": "Metrics are disabled."}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+# 🗂️ COMPANY PROJECT HISTORY — FETCH FROM SUPABASE (OR THE LOCAL MIRROR)
 @main.route("/company/history", methods=["GET"])
 def company_history():
-    """Fetch all project run logs stored in Supabase (latest first)."""
+    """
+    Fetch project run logs (latest first), one page at a time.
+    Optional query params:
+      limit=N       page size (default HISTORY_PAGE_SIZE, capped at HISTORY_PAGE_MAX)
+      cursor=...    the next_cursor of the previous page
+      since=ISO     only rows newer than this timestamp
+      columns=a,b   only these columns
+    Served from the local mirror when HISTORY_MIRROR_ENABLED is set.
+    """
     try:
-        print("\n📜 Fetching project history from Supabase...")
-        result = fetch_project_history()
+        limit = request.args.get("limit", Config.HISTORY_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, Config.HISTORY_PAGE_MAX))
+        cursor = request.args.get("cursor")
+        since = request.args.get("since")
+        columns = [c for c in request.args.get("columns", "").split(",") if c] or None
+
+        from app.utils.supabase_logger import check_columns, decode_cursor, parse_timestamp
+        try:
+            check_columns(columns)
+            if cursor:
+                decode_cursor(cursor)
+            if since:
+                parse_timestamp(since)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        if Config.HISTORY_MIRROR_ENABLED:
+            from app.utils import history_mirror
+            sync_result = history_mirror.sync_if_stale()
+            if sync_result["status"] != "success":
+                print(f"⚠️ History mirror sync failed: {sync_result['message']}")
+            result = history_mirror.query(limit=limit, cursor=cursor, since=since, columns=columns)
+        else:
+            from app.utils.supabase_logger import fetch_project_history
+            print("\n📜 Fetching project history from Supabase...")
+            result = fetch_project_history(limit=limit, cursor=cursor, since=since, columns=columns)
 
         if result["status"] == "success":
-            print(f"✅ Retrieved {len(result['data'])} project entries from Supabase.")
+            print(f"✅ Retrieved {len(result['data'])} project history entries.")
             return jsonify({
                 "status": "success",
                 "count": len(result["data"]),
-                "projects": result["data"]
+                "projects": result["data"],
+                "next_cursor": result.get("next_cursor")
             }), 200
         else:
             print(f"⚠️ Error fetching project history: {result['message']}")
@@ -278,14 +470,104 @@ def test():
 
 
 # 📁 PROJECTS API (For Frontend)
+SLIM_FIELDS = ("id", "title", "summary", "status", "executed_at", "source", "validation")
+
+
 @main.route("/api/projects", methods=["GET"])
 def api_projects():
-    """Return projects list from app/data/projects.json (newest first)."""
+    """
+    Return projects from the project store (newest first).
+    Optional query params:
+      limit=N      page size (cursor pagination, capped at PROJECTS_PAGE_MAX)
+      cursor=ID    continue after the last id of the previous page
+      view=slim    leave out the code blob (fetch it from /api/projects/<id>/code)
+      fields=a,b   return only these fields
+    Responses carry an ETag; clients sending If-None-Match get 304 when nothing changed.
+    """
     try:
-        from app.utils.save_project import get_all_projects
-        projects = get_all_projects()
-        return jsonify({"status": "success", "projects": projects}), 200
+        limit = request.args.get("limit", type=int)
+        if limit is not None:
+            limit = max(1, min(limit, Config.PROJECTS_PAGE_MAX))
+        cursor = request.args.get("cursor", type=int)
+        fields = [f for f in request.args.get("fields", "").split(",") if f]
+        if request.args.get("view") == "slim" and not fields:
+            fields = list(SLIM_FIELDS)
+        with_code = not fields or "details_markdown" in fields
+
+        def build():
+            projects = project_store.list_recent(limit=limit, before_id=cursor, with_code=with_code)
+            next_cursor = projects[-1]["id"] if limit and len(projects) == limit else None
+            if fields:
+                projects = [{k: p[k] for k in fields if k in p} for p in projects]
+            return {"status": "success", "projects": projects, "next_cursor": next_cursor}
+
+        etag = make_etag("projects", project_store.revision(), request.query_string.decode())
+        return cached_json(build, etag)
     except Exception as e:
-        current_app.logger.exception("Error reading projects file")
+        current_app.logger.exception("Error reading projects store")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+
+@main.route("/api/projects/search", methods=["GET"])
+def api_projects_search():
+    """
+    Full-text search over the project store, best match first (no code blobs).
+    Query params:
+      q=TEXT              words to find in title, summary, source and code identifiers
+                          (every word must match, as a whole word or a prefix)
+      status=a,b          keep only these statuses
+      since=, until=      bound executed_at (ISO date or timestamp, inclusive)
+      limit=N, offset=N   page size (capped at PROJECTS_PAGE_MAX) and offset; a query is
+                          ranked within its newest PROJECT_SEARCH_RANK_WINDOW matches, so
+                          paging ends there (next_offset is null)
+    """
+    query = request.args.get("q", "")
+    if project_search.build_match(query) is None:
+        return jsonify({"status": "error", "message": "Missing query parameter"}), 400
+
+    try:
+        limit = max(1, min(request.args.get("limit", 20, type=int), Config.PROJECTS_PAGE_MAX))
+        offset = max(0, request.args.get("offset", 0, type=int))
+        statuses = [s for s in request.args.get("status", "").split(",") if s]
+
+        def build():
+            results = project_search.search(
+                query, statuses=statuses, since=request.args.get("since"),
+                until=request.args.get("until"), limit=limit, offset=offset
+            )
+            return {
+                "status": "success",
+                "query": query,
+                "results": results,
+                "next_offset": offset + limit if len(results) == limit and (
+                    window <= 0 or offset + limit < window) else None
+            }
+
+        window = Config.PROJECT_SEARCH_RANK_WINDOW
+        etag = make_etag("project_search", project_store.revision(), project_search.revision(),
+                         request.query_string.decode())
+        return cached_json(build, etag)
+    except Exception as e:
+        current_app.logger.exception("Error searching projects")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@main.route("/api/projects/<int:project_id>/code", methods=["GET"])
+def api_project_code(project_id):
+    """Return the generated code of one project (lazy fetch for slim listings)."""
+    try:
+        if not project_store.exists(project_id):
+            return jsonify({"status": "error", "message": "Project not found"}), 404
+        etag = make_etag("code", project_id, project_store.revision())
+        # The blob is only read when the client's copy is stale (no 304)
+        return cached_json(
+            lambda: {
+                "status": "success",
+                "id": project_id,
+                "details_markdown": project_store.get_code(project_id) or ""
+            },
+            etag
+        )
+    except Exception as e:
+        current_app.logger.exception("Error reading project code")
+        return jsonify({"status": "error", "message": str(e)}), 500
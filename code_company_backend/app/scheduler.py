@@ -0,0 +1,173 @@
+# app/scheduler.py
+"""
+⏰ Company scheduler — starts pipeline runs on a fixed cadence.
+Every SCHEDULER_INTERVAL seconds (± SCHEDULER_JITTER) it starts a run of
+SCHEDULER_BATCH_SIZE project(s), with at most SCHEDULER_MAX_CONCURRENT runs in
+flight. A tick that would exceed that is skipped, not queued. Counters and the
+next due time are kept in their own state file, so a restarted worker keeps
+its cadence. An exclusive lock file keeps a second worker from starting.
+
+Runs in its own process: `python worker.py` (see worker.py).
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from config import Config
+from app.utils.state_store import StateStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-worker is up to the operator
+    fcntl = None
+
+STATE_NAMESPACE = "scheduler"
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else None
+
+
+def read_scheduler_state():
+    """Latest state written by the worker (read straight from disk, for the web process)."""
+    try:
+        with open(Config.SCHEDULER_STATE_FILE, encoding="utf-8") as f:
+            raw = json.load(f)
+        return raw.get("namespaces", {}).get(STATE_NAMESPACE, {})
+    except (OSError, ValueError):
+        return {}
+
+
+class CompanyScheduler:
+    """Cadence + concurrency control around run_company / run_company_batch."""
+
+    def __init__(self, interval=None, max_concurrent=None, jitter=None, batch_size=None,
+                 state_file=None, run_fn=None):
+        self.interval = Config.SCHEDULER_INTERVAL if interval is None else interval
+        self.max_concurrent = max(1, Config.SCHEDULER_MAX_CONCURRENT if max_concurrent is None else max_concurrent)
+        self.jitter = Config.SCHEDULER_JITTER if jitter is None else jitter
+        self.batch_size = Config.SCHEDULER_BATCH_SIZE if batch_size is None else batch_size
+        self.store = StateStore(state_file or Config.SCHEDULER_STATE_FILE, flush_delay=0)
+        self.run_fn = run_fn or self._run_pipeline
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="scheduled-run")
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._lock_file = None
+
+    # 🔹 Single-instance lock
+    def acquire_lock(self):
+        """Returns False when another worker already holds the scheduler lock."""
+        if fcntl is None:
+            return True
+        path = Config.SCHEDULER_STATE_FILE + ".lock"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # "a+" so a worker that loses the race doesn't wipe the holder's PID
+        self._lock_file = open(path, "a+")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        self._lock_file.seek(0)
+        self._lock_file.truncate()
+        self._lock_file.write(str(os.getpid()))
+        self._lock_file.flush()
+        return True
+
+    # 🔹 State
+    def _state(self):
+        return self.store.get(STATE_NAMESPACE)
+
+    def _update(self, **changes):
+        self.store.update(STATE_NAMESPACE, changes)
+        self.store.flush()
+
+    def _increment(self, counter):
+        with self._active_lock:
+            state = self._state()
+            self._update(**{counter: state.get(counter, 0) + 1})
+
+    def _next_due(self, started_at):
+        delay = self.interval + random.uniform(-self.jitter, self.jitter)
+        return started_at + max(0.0, delay)
+
+    # 🔹 Runs
+    def _run_pipeline(self):
+        from app.pipeline import run_company, run_company_batch
+
+        if self.batch_size > 1:
+            return run_company_batch(self.batch_size)
+        return [run_company()]
+
+    def _execute(self):
+        try:
+            runs = self.run_fn()
+            self._increment("runs_completed")
+            self._update(last_finished_at=_iso(time.time()), last_error=None,
+                         last_projects=len(runs or []))
+        except Exception as e:
+            print(f"⚠️ Scheduled run failed: {e}")
+            self._increment("runs_failed")
+            self._update(last_finished_at=_iso(time.time()), last_error=str(e))
+        finally:
+            with self._active_lock:
+                self._active -= 1
+            self._update(active_runs=self._active)
+
+    def tick(self):
+        """Starts a run unless max_concurrent runs are active. Returns True if started."""
+        now = time.time()
+        with self._active_lock:
+            overlapping = self._active >= self.max_concurrent
+            if not overlapping:
+                self._active += 1
+        due = self._next_due(now)
+        self._update(next_run_at=due, next_run=_iso(due))
+
+        if overlapping:
+            print(f"⏭️ Scheduler: {self._active} run(s) still active — skipping this tick")
+            self._increment("skipped_overlaps")
+            return False
+
+        print(f"⏰ Scheduler: starting run of {self.batch_size} project(s)")
+        self._increment("runs_started")
+        self._update(last_started_at=_iso(now), active_runs=self._active)
+        self._pool.submit(self._execute)
+        return True
+
+    def run_forever(self):
+        """Main loop; a due time persisted by an earlier worker is honoured after restart."""
+        state = self._state()
+        next_run_at = state.get("next_run_at") or time.time()
+        self._update(worker_pid=os.getpid(), worker_started_at=_iso(time.time()),
+                     interval=self.interval, max_concurrent=self.max_concurrent,
+                     jitter=self.jitter, batch_size=self.batch_size, active_runs=0)
+        print(f"⏰ Scheduler: every {self.interval}s ±{self.jitter}s, "
+              f"max {self.max_concurrent} concurrent, first run at {_iso(next_run_at)}")
+
+        while not self._stop.is_set():
+            wait = next_run_at - time.time()
+            if wait > 0:
+                self._stop.wait(min(wait, 5))
+                continue
+            self.tick()
+            next_run_at = self._state()["next_run_at"]
+
+    def request_stop(self):
+        """Ends run_forever() after the current wait (safe to call from a signal handler)."""
+        self._stop.set()
+
+    def stop(self, wait=True):
+        """Stops scheduling; with `wait`, lets active runs finish first."""
+        self._stop.set()
+        self._pool.shutdown(wait=wait)
+        if self._lock_file is not None:
+            self._update(worker_pid=None)
+            self._lock_file.close()
+            self._lock_file = None
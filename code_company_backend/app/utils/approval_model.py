@@ -0,0 +1,490 @@
+# app/utils/approval_model.py
+"""
+🤖 Local approval classifier — a fast path in front of the CEO LLM.
+Hashed word/bigram features with online TF-IDF weighting, scored by a sparse
+logistic regression trained with SGD, all in plain Python.
+
+The model is bootstrapped from past LLM decisions (the project store, plus
+Supabase project_history rows for runs the store no longer has) and then
+learns from every LLM decision. Keyword-rule and classifier decisions are
+never training data. Classes are weighted to balance approves and rejects.
+
+The classifier may only skip the LLM once it has APPROVAL_MODEL_MIN_PER_CLASS
+examples of each class and its confident predictions proved right on a
+held-out split (or, for a model grown online, in live agreement with the LLM).
+Run `python -m app.utils.approval_model train` to rebuild it from history.
+"""
+import atexit
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+from config import Config
+from app.utils.file_lock import locked
+
+NUM_FEATURES = 1 << 18
+LEARNING_RATE = 1.0
+L2 = 1e-4
+BOOTSTRAP_EPOCHS = 10
+MAX_CLASS_WEIGHT = 10.0
+FORMAT_VERSION = 2  # v1 models learned from rule approvals and are discarded
+CLASSES = ("approve", "reject")
+# Reasons logged for decisions the LLM did not make (project_history has no decided_by column)
+NON_LLM_REASONS = (
+    "No active project found", "The project involves Python coding",
+    "Decided by the local approval classifier", "No valid JSON detected",
+    "CEO AI error", "CEO AI unavailable",
+)
+
+
+def _tokens(text):
+    words = re.findall(r"[a-z0-9+#]+", (text or "").lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def project_text(project):
+    return f"{project.get('project_title') or ''} {project.get('problem_summary') or ''}"
+
+
+class ApprovalModel:
+    """Sparse hashed TF-IDF + logistic regression, persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._file_stat = False  # (mtime_ns, size) last read or written; False = never loaded
+        self._pending = []  # updates applied in memory but not yet written
+        self._dirty = threading.Event()
+        self._writer = None
+        self._reset()
+
+    def _reset(self):
+        self.weights = {}
+        self.bias = 0.0
+        self.doc_freq = {}
+        self.docs = 0
+        self.samples = 0
+        self.class_counts = dict.fromkeys(CLASSES, 0)
+        self.holdout = None  # {"examples", "confident", "correct", "passed"} from the last train()
+        self.stats = {"local_decisions": 0, "llm_checked": 0, "agreed": 0}
+
+    # 🔹 Persistence
+    def _stat(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        """
+        Reads the file on first use and again after another process (web / worker)
+        saved it; our updates not yet on disk are replayed on top.
+        """
+        stat = self._stat()
+        if stat == self._file_stat:
+            return
+        self._file_stat = stat
+        self._reset()
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            raw = {}
+        if raw.get("version") == FORMAT_VERSION:
+            self.weights = {int(k): v for k, v in raw.get("weights", {}).items()}
+            self.doc_freq = {int(k): v for k, v in raw.get("doc_freq", {}).items()}
+            self.bias = raw.get("bias", 0.0)
+            self.docs = raw.get("docs", 0)
+            self.samples = raw.get("samples", 0)
+            self.class_counts.update(raw.get("class_counts", {}))
+            self.holdout = raw.get("holdout")
+            self.stats.update(raw.get("stats", {}))
+        for op in self._pending:
+            self._apply(op)
+
+    def _body(self):
+        """Snapshot of the model to serialize (taken under the lock, dumped outside it)."""
+        return {
+            "version": FORMAT_VERSION,
+            "bias": self.bias,
+            "docs": self.docs,
+            "samples": self.samples,
+            "class_counts": dict(self.class_counts),
+            "holdout": self.holdout,
+            "stats": dict(self.stats),
+            "weights": dict(self.weights),
+            "doc_freq": dict(self.doc_freq),
+        }
+
+    def _dump(self, body):
+        """Serializes `body` to a temp file next to the model; returns its path (None on error)."""
+        body["weights"] = {str(k): round(v, 6) for k, v in body["weights"].items() if v}
+        body["doc_freq"] = {str(k): v for k, v in body["doc_freq"].items()}
+        text = json.dumps(body, separators=(",", ":"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".model-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            return tmp
+        except OSError as e:
+            print(f"⚠️ Approval model write error: {e}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return None
+
+    def _commit(self, tmp, written):
+        """
+        Renames the dumped file into place and drops the `written` pending updates it
+        holds; the caller holds the file lock, the model lock makes it one step for readers.
+        """
+        with self._lock:
+            try:
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"⚠️ Approval model write error: {e}")
+                return
+            self._file_stat = self._stat()
+            del self._pending[:written]
+
+    def flush(self):
+        """
+        Writes pending updates now. Under the file lock the model is re-read if
+        another process saved it (our pending updates replayed on top), so no
+        process drops another's updates; serializing happens outside the model lock.
+        """
+        if not self._pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with locked(self.path):
+            with self._lock:
+                self._load()
+                written = len(self._pending)
+                body = self._body()
+            if not written:
+                return
+            tmp = self._dump(body)
+            if tmp:
+                self._commit(tmp, written)
+
+    def _schedule_flush(self):
+        self._dirty.set()
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="approval-model-writer", daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self):
+        """Coalesces the updates of a burst of decisions into one write per flush delay."""
+        while True:
+            self._dirty.wait()
+            threading.Event().wait(Config.APPROVAL_MODEL_FLUSH_DELAY)
+            self._dirty.clear()
+            self.flush()
+
+    def exists(self):
+        with self._lock:
+            self._load()
+            return self.samples > 0
+
+    # 🔹 Features
+    def _features(self, text, count_doc=False):
+        """L2-normalized TF-IDF vector as {feature index: value}."""
+        counts = {}
+        for token in _tokens(text):
+            index = zlib.crc32(token.encode("utf-8")) % NUM_FEATURES
+            counts[index] = counts.get(index, 0) + 1
+        if count_doc:
+            self.docs += 1
+            for index in counts:
+                self.doc_freq[index] = self.doc_freq.get(index, 0) + 1
+
+        vector = {}
+        for index, tf in counts.items():
+            idf = math.log((1 + self.docs) / (1 + self.doc_freq.get(index, 0))) + 1
+            vector[index] = (1 + math.log(tf)) * idf
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {index: v / norm for index, v in vector.items()}
+
+    def _score(self, vector):
+        z = self.bias + sum(self.weights.get(i, 0.0) * v for i, v in vector.items())
+        z = max(-30.0, min(30.0, z))
+        return 1 / (1 + math.exp(-z))
+
+    # 🔹 Training and prediction
+    def _class_weight(self, approved, counts=None):
+        """Inverse class frequency, so the majority class can't drown out the other."""
+        counts = counts or self.class_counts
+        total = sum(counts.values())
+        label = counts["approve" if approved else "reject"]
+        if not total or not label:
+            return 1.0
+        return min(total / (2 * label), MAX_CLASS_WEIGHT)
+
+    def _update(self, text, approved, count_doc=True, weight=1.0):
+        vector = self._features(text, count_doc=count_doc)
+        error = (self._score(vector) - (1.0 if approved else 0.0)) * weight
+        rate = LEARNING_RATE / math.sqrt(1 + self.samples / 1000)
+        for index, value in vector.items():
+            w = self.weights.get(index, 0.0)
+            self.weights[index] = w - rate * (error * value + L2 * w)
+        self.bias -= rate * error
+        self.samples += 1
+
+    def _apply(self, op, stats=True):
+        """Applies one recorded update: ("learn", text, decision, probability) or ("local",)."""
+        if op[0] == "local":
+            if stats:
+                self.stats["local_decisions"] += 1
+            return
+        _, text, decision, probability = op
+        if stats and probability is not None:
+            self.stats["llm_checked"] += 1
+            if (probability >= 0.5) == (decision == "approve"):
+                self.stats["agreed"] += 1
+        self.class_counts[decision] = self.class_counts.get(decision, 0) + 1
+        approved = decision == "approve"
+        self._update(text, approved, weight=self._class_weight(approved))
+
+    def _record(self, op):
+        with self._lock:
+            self._load()
+            self._apply(op)
+            self._pending.append(op)
+        self._schedule_flush()
+
+    def learn(self, project, decision, probability=None):
+        """
+        Incremental update from one LLM decision ("approve" / "reject"); `probability`
+        is what the classifier predicted for it (counted in the agreement stats).
+        Written behind, every APPROVAL_MODEL_FLUSH_DELAY seconds.
+        """
+        self._record(("learn", project_text(project), decision, probability))
+
+    def predict(self, project):
+        """Probability that `project` is approved, or None while untrained."""
+        with self._lock:
+            self._load()
+            if not self._trained():
+                return None
+            return self._score(self._features(project_text(project)))
+
+    def _trained(self):
+        return (
+            self.samples >= Config.APPROVAL_MODEL_MIN_SAMPLES
+            and min(self.class_counts.values()) >= Config.APPROVAL_MODEL_MIN_PER_CLASS
+        )
+
+    def trusted(self):
+        """
+        May a confident prediction replace the LLM? Needs a passed holdout check,
+        or, for a model grown online, MIN_SAMPLES live checks agreeing at THRESHOLD.
+        """
+        with self._lock:
+            self._load()
+            if not self._trained():
+                return False
+            if self.holdout is not None:
+                return self.holdout["passed"]
+            checked = self.stats["llm_checked"]
+            return (
+                checked >= Config.APPROVAL_MODEL_MIN_SAMPLES
+                and self.stats["agreed"] / checked >= Config.APPROVAL_MODEL_THRESHOLD
+            )
+
+    def record_local_decision(self):
+        self._record(("local",))
+
+    def summary(self):
+        with self._lock:
+            self._load()
+            checked = self.stats["llm_checked"]
+            return {
+                "samples": self.samples,
+                "trained": self._trained(),
+                "trusted": self.trusted(),
+                "class_counts": dict(self.class_counts),
+                "holdout": self.holdout,
+                "threshold": Config.APPROVAL_MODEL_THRESHOLD,
+                "local_decisions": self.stats["local_decisions"],
+                "llm_checked": checked,
+                "agreed": self.stats["agreed"],
+                "agreement_rate": round(self.stats["agreed"] / checked, 4) if checked else None,
+            }
+
+    def _fit(self, examples):
+        """Class-weighted SGD from scratch over (project, decision) pairs."""
+        counts = {c: sum(1 for _, d in examples if d == c) for c in CLASSES}
+        self.weights, self.bias, self.doc_freq, self.docs, self.samples = {}, 0.0, {}, 0, 0
+        for project, _ in examples:
+            self._features(project_text(project), count_doc=True)
+        order = list(examples)
+        for _ in range(BOOTSTRAP_EPOCHS):
+            random.shuffle(order)
+            for project, decision in order:
+                approved = decision == "approve"
+                self._update(project_text(project), approved, count_doc=False,
+                             weight=self._class_weight(approved, counts))
+        self.samples = len(examples)
+        self.class_counts = counts
+
+    def _validate(self, examples):
+        """
+        Fits on a stratified split and checks the held-out part: of the predictions
+        confident enough to skip the LLM, at least THRESHOLD must be right.
+        """
+        rng = random.Random(0)
+        train, held = [], []
+        for c in CLASSES:
+            group = [e for e in examples if e[1] == c]
+            rng.shuffle(group)
+            cut = max(1, round(len(group) * Config.APPROVAL_MODEL_HOLDOUT))
+            held += group[:cut]
+            train += group[cut:]
+        self._fit(train)
+        confident = correct = 0
+        for project, decision in held:
+            p = self._score(self._features(project_text(project)))
+            if max(p, 1 - p) >= Config.APPROVAL_MODEL_THRESHOLD:
+                confident += 1
+                correct += (p >= 0.5) == (decision == "approve")
+        passed = confident == 0 or correct / confident >= Config.APPROVAL_MODEL_THRESHOLD
+        return {"examples": len(held), "confident": confident, "correct": correct, "passed": passed}
+
+    def train(self, examples):
+        """
+        Rebuilds the model from LLM-decided (project, decision) pairs; keeps agreement
+        stats. Fitting happens on a scratch model, so predictions go on meanwhile.
+        """
+        examples = [e for e in examples if e[1] in CLASSES]
+        fresh = ApprovalModel(self.path)
+        fresh._fit(examples)
+        if fresh._trained():
+            fresh.holdout = fresh._validate(examples)
+            fresh._fit(examples)
+        counts = ", ".join(f"{n} {c}" for c, n in fresh.class_counts.items())
+        print(f"🤖 Approval model trained on {len(examples)} past LLM decision(s) ({counts}); "
+              f"holdout: {fresh.holdout or 'too few examples per class'}")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with locked(self.path):
+            with self._lock:
+                self._load()
+                for name in ("weights", "bias", "doc_freq", "docs", "samples", "class_counts", "holdout"):
+                    setattr(self, name, getattr(fresh, name))
+                for op in self._pending:  # decisions made while training weren't in the examples
+                    if op[0] == "learn":
+                        self._apply(op, stats=False)
+                written = len(self._pending)
+                body = self._body()
+            tmp = self._dump(body)
+            if tmp:
+                self._commit(tmp, written)
+        return len(examples)
+
+
+# 🔹 Training data
+def _run_key(title):
+    return " ".join((title or "").lower().split())
+
+
+def _history_examples(skip_titles):
+    """
+    Past LLM decisions from Supabase project_history (title only) for runs the
+    store doesn't have; rows whose reason shows a rule / classifier / fallback decision are skipped.
+    """
+    from app.utils.supabase_logger import fetch_project_history
+
+    cursor = None
+    while True:
+        result = fetch_project_history(
+            limit=1000, cursor=cursor, columns=("project_title", "ceo_decision", "ceo_reason")
+        )
+        if result["status"] != "success":
+            print(f"⚠️ Approval model: project_history unavailable: {result.get('message')}")
+            return
+        for row in result["data"]:
+            key = _run_key(row.get("project_title"))
+            reason = row.get("ceo_reason") or ""
+            if (row.get("ceo_decision") not in CLASSES or not key or key in skip_titles
+                    or reason.startswith(NON_LLM_REASONS)):
+                continue
+            skip_titles.add(key)  # one example per run, even if it was logged twice
+            yield {"project_title": row["project_title"]}, row["ceo_decision"]
+        cursor = result.get("next_cursor")
+        if not cursor:
+            return
+
+
+def _store_examples():
+    """
+    LLM-decided runs from the project store, featurized on the proposal the CEO
+    saw (title + problem_summary). Records from before decisions were
+    attributed carry no ceo_decided_by and are left out.
+    """
+    from app.utils import project_store
+
+    for project in project_store.list_recent(with_code=False):
+        if project.get("ceo_decided_by") != "llm" or project.get("ceo_decision") not in CLASSES:
+            continue
+        yield {
+            "project_title": project.get("title"),
+            "problem_summary": project.get("problem_summary"),
+        }, project["ceo_decision"]
+
+
+def train_from_history():
+    examples = list(_store_examples())
+    seen = {_run_key(p["project_title"]) for p, _ in examples}
+    examples += list(_history_examples(seen))
+    return approval_model.train(examples)
+
+
+def _bootstrap():
+    try:
+        train_from_history()
+    except Exception as e:
+        print(f"⚠️ Approval model bootstrap failed: {e}")
+
+
+def ensure_bootstrapped():
+    """
+    Starts training from history (once per process, in the background) when no
+    saved model exists yet; the LLM decides until it is ready.
+    """
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        _bootstrapped = True
+        if approval_model.exists():
+            return
+        threading.Thread(target=_bootstrap, name="approval-model-bootstrap", daemon=True).start()
+
+
+_bootstrap_lock = threading.Lock()
+_bootstrapped = False
+approval_model = ApprovalModel(Config.APPROVAL_MODEL_FILE)
+atexit.register(approval_model.flush)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "train":
+        train_from_history()
+        print(json.dumps(approval_model.summary(), indent=2))
+    else:
+        print("usage: python -m app.utils.approval_model train")
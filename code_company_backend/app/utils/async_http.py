@@ -0,0 +1,99 @@
+# app/utils/async_http.py
+"""
+🌐 Async outbound HTTP — the asyncio twin of http_client for the async pipeline.
+One pooled httpx.AsyncClient per event loop; same retries, jittered backoff,
+rate limiting, circuit breaking, metrics and trace spans as post_json, but a
+call waiting on OpenRouter holds a coroutine instead of an OS thread.
+httpx is imported on first use, so the sync-only path never loads it.
+"""
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from config import Config
+from app.utils import tracing
+from app.utils.http_client import RETRY_STATUSES, _backoff_delay, _retry_after_seconds
+from app.utils.metrics import record_outbound
+from app.utils.rate_limit import get_provider
+
+_clients = {}  # event loop → httpx.AsyncClient
+
+
+def get_client():
+    """The pooled client of the running event loop, created on first use."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.HTTP_POOL_MAXSIZE
+            ),
+            timeout=httpx.Timeout(Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT)
+        )
+    return client
+
+
+async def aclose():
+    """Closes the running loop's client (call before the loop stops)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def apost_json(url, payload, headers=None, timeout=None, retries=None, circuit=None,
+                     retry_failures=True):
+    """
+    `post_json` for coroutines. Retries transport errors and 429/5xx responses,
+    waits for the provider's token bucket on the loop, and returns the final
+    httpx.Response (callers still call raise_for_status()).
+    Raises ProviderUnavailable when the circuit is open or the rate-limit wait is too long.
+    `circuit` names the breaker to use within the provider (e.g. the model);
+    `retry_failures=False` retries only 429s (see post_json).
+    """
+    import httpx
+
+    client = get_client()
+    provider = get_provider(url)
+    retries = Config.HTTP_MAX_RETRIES if retries is None else retries
+    request_timeout = httpx.Timeout(timeout or Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT)
+
+    traced = tracing.current_trace() is not None
+    request_bytes = len(json.dumps(payload, default=str)) if traced else None
+
+    attempt = 0
+    while True:
+        await provider.abefore_request(circuit)
+        started = time.perf_counter()
+        try:
+            with tracing.span("http", provider=provider.name, path=urlsplit(url).path,
+                              attempt=attempt, request_bytes=request_bytes) as record:
+                response = await client.post(url, json=payload, headers=headers, timeout=request_timeout)
+                if record is not None:
+                    record["attrs"]["status"] = response.status_code
+                    record["attrs"]["response_bytes"] = len(response.content)
+        except httpx.TransportError as e:
+            record_outbound(provider.name, e.__class__.__name__, time.perf_counter() - started)
+            provider.after_error(circuit)
+            if attempt >= retries or not retry_failures:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"⚠️ {urlsplit(url).netloc} request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+        else:
+            record_outbound(provider.name, str(response.status_code), time.perf_counter() - started)
+            provider.after_response(response, circuit)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            if response.status_code != 429 and not retry_failures:
+                return response
+            if response.status_code == 429:
+                attempt += 1
+                continue
+            delay = _backoff_delay(attempt, _retry_after_seconds(response))
+            print(f"⚠️ {urlsplit(url).netloc} returned {response.status_code}, retrying in {delay:.1f}s")
+
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,86 @@
+# app/utils/async_runner.py
+"""
+🔁 Shared asyncio event loop for the async pipeline path.
+The loop runs on one daemon thread, started on first use. Flask handlers (and
+the job manager) hand it coroutines with `submit` and get a concurrent Future
+back: a request that waits blocks only its own thread, while the runs
+themselves share the loop. At most ASYNC_MAX_RUNS coroutines run at once;
+the rest wait on a semaphore in submission order.
+"""
+import asyncio
+import atexit
+import threading
+
+from config import Config
+
+_loop = None
+_semaphore = None
+_lock = threading.Lock()
+_counts = {"running": 0, "waiting": 0}
+
+
+def _serve(loop, ready):
+    global _semaphore
+    asyncio.set_event_loop(loop)
+    _semaphore = asyncio.Semaphore(Config.ASYNC_MAX_RUNS)
+    loop.call_soon(ready.set)
+    loop.run_forever()
+
+
+def get_loop():
+    """The runner's event loop, started on a daemon thread on first use."""
+    global _loop
+    if _loop is not None:
+        return _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            threading.Thread(target=_serve, args=(loop, ready), name="async-runner", daemon=True).start()
+            ready.wait()
+            _loop = loop
+            print(f"🔁 Async runner started (up to {Config.ASYNC_MAX_RUNS} concurrent runs)")
+    return _loop
+
+
+async def _bounded(coro):
+    # Counters are only touched on the loop thread, so they need no lock
+    _counts["waiting"] += 1
+    started = False
+    try:
+        async with _semaphore:
+            _counts["waiting"] -= 1
+            _counts["running"] += 1
+            started = True
+            try:
+                return await coro
+            finally:
+                _counts["running"] -= 1
+    finally:
+        if not started:  # cancelled while waiting for a slot
+            _counts["waiting"] -= 1
+            coro.close()
+
+
+def submit(coro):
+    """Schedules `coro` on the shared loop (behind the concurrency limit). Returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(_bounded(coro), get_loop())
+
+
+def snapshot():
+    return {"started": _loop is not None, "limit": Config.ASYNC_MAX_RUNS, **_counts}
+
+
+def _shutdown():
+    """Closes the loop's HTTP client and stops the loop at interpreter exit."""
+    if _loop is None or not _loop.is_running():
+        return
+    from app.utils.async_http import aclose
+    try:
+        asyncio.run_coroutine_threadsafe(aclose(), _loop).result(timeout=5)
+    except Exception as e:
+        print(f"⚠️ Async runner shutdown: {e}")
+    _loop.call_soon_threadsafe(_loop.stop)
+
+
+atexit.register(_shutdown)
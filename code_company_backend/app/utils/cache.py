@@ -0,0 +1,108 @@
+# app/utils/cache.py
+"""
+♻️ In-process caching helpers — a bounded LRU cache with per-entry TTL,
+and single-flight deduplication so concurrent identical calls share one result.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers wait for its result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns (result, shared) — shared is True when another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+
+        try:
+            call["result"] = fn()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+        return call["result"], False
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: one lookup per key and event loop; callers await the same task."""
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, fn):
+        """`fn()` returns the coroutine to run. Returns (result, shared)."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(loop_key)
+        shared = task is not None
+        if not shared:
+            task = self._tasks[loop_key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._tasks.pop(loop_key, None))
+        # A cancelled caller must not cancel the lookup the others are waiting on
+        return await asyncio.shield(task), shared
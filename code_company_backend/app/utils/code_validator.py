@@ -0,0 +1,257 @@
+# app/utils/code_validator.py
+"""
+🧪 Validation stage for generated code.
+Every `final_code` goes through:
+  1. ast.parse                 — syntax
+  2. compile()                 — byte-compile checks ast alone misses
+  3. import smoke test         — optional (CODE_VALIDATION_SMOKE_TEST): the code is
+     imported (not run as __main__) in a fresh `python -I` subprocess with CPU,
+     memory, file, process and wall-clock limits. The subprocess runs in its own
+     user, network and mount namespaces (`unshare`): no network interface,
+     private tmpfs over /tmp, /var/tmp, /dev/shm, the app's directory and HOME,
+     and — when the app runs as root — a throwaway uid (CODE_VALIDATION_USER),
+     so the rest of the filesystem is read-only to it. Where namespaces are not
+     available the smoke test is skipped unless CODE_VALIDATION_SANDBOX=none
+     opts into running with the limits and an in-process socket guard only.
+Results are cached by SHA-256 of the code. Validations run on a bounded pool
+(CODE_VALIDATION_WORKERS), so a batch validates concurrently while the web
+workers never run them.
+"""
+import ast
+import contextvars
+import hashlib
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from app.utils.cache import TTLCache
+from app.utils.metrics import record_cache, timed_phase
+
+# Exit codes of the sandbox runner that still count as importable code
+EXIT_MISSING_MODULE = 3
+EXIT_NEEDS_INPUT = 4
+EXIT_CALLED_EXIT = 5
+
+_RUNNER = r"""
+import os, sys
+cpu, memory_mb = int(sys.argv[1]), int(sys.argv[2])
+code = sys.stdin.read()
+sys.stdin = open(os.devnull)
+try:
+    import resource
+    for limit, value in ((resource.RLIMIT_CPU, cpu), (resource.RLIMIT_AS, memory_mb << 20),
+                         (resource.RLIMIT_FSIZE, 1 << 20), (resource.RLIMIT_NOFILE, 64),
+                         (resource.RLIMIT_NPROC, 32)):
+        resource.setrlimit(limit, (value, value))
+except (ImportError, ValueError, OSError):
+    pass
+
+# Belt and braces on top of the network namespace: the socket class stays intact
+# (ssl, http.client etc. subclass it), only outgoing traffic is refused
+import socket
+def _no_network(*args, **kwargs):
+    raise OSError("network access is disabled during validation")
+for name in ("connect", "connect_ex", "sendto", "sendmsg"):
+    setattr(socket.socket, name, _no_network)
+socket.create_connection = socket.getaddrinfo = _no_network
+
+import types
+module = types.ModuleType("generated_module")
+module.__file__ = "generated_module.py"
+sys.modules["generated_module"] = module
+try:
+    exec(compile(code, "generated_module.py", "exec"), module.__dict__)
+except ModuleNotFoundError as e:
+    print(f"missing module: {e.name}", file=sys.stderr)
+    sys.exit(3)
+except EOFError:
+    sys.exit(4)
+except SystemExit:
+    sys.exit(5)
+"""
+
+_sandbox_ready = None  # result of the one-time namespace probe
+_cache = TTLCache(maxsize=Config.CODE_VALIDATION_CACHE_SIZE, ttl=24 * 3600)
+_pool = ThreadPoolExecutor(
+    max_workers=Config.CODE_VALIDATION_WORKERS, thread_name_prefix="code-validator"
+)
+
+
+# 🔹 Checks
+def code_hash(code):
+    return hashlib.sha256((code or "").encode("utf-8")).hexdigest()
+
+
+def _report(digest, valid, stage, error=None, notes=None, started=None):
+    return {
+        "valid": valid,
+        "stage": stage,
+        "error": error,
+        "notes": notes or [],
+        "code_hash": digest,
+        "smoke_tested": stage == "import",
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1) if started else 0,
+    }
+
+
+def _static_checks(code):
+    """Returns an error string, or None when the code parses and compiles."""
+    try:
+        tree = ast.parse(code, filename="<generated>")
+    except SyntaxError as e:
+        return f"SyntaxError: {e.msg} (line {e.lineno})"
+    try:
+        compile(tree, "<generated>", "exec")
+    except (SyntaxError, ValueError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+# 🔹 Sandbox
+def _python():
+    return Config.CODE_VALIDATION_PYTHON or sys.executable
+
+
+def _user_args():
+    """Drops to the throwaway user when we are root (root in a namespace could still write host files)."""
+    if os.geteuid() != 0 or not Config.CODE_VALIDATION_USER:
+        return {}
+    return {"user": Config.CODE_VALIDATION_USER, "group": Config.CODE_VALIDATION_GROUP, "extra_groups": []}
+
+
+def _hidden_dirs():
+    """Writable places the code gets a private, empty tmpfs over (never the Python install itself)."""
+    python_dirs = {os.path.realpath(p) for p in (sys.prefix, sys.base_prefix, os.path.dirname(_python()))}
+    hidden = []
+    for path in ("/tmp", "/var/tmp", "/dev/shm", os.getcwd(), os.path.expanduser("~")):
+        path = os.path.realpath(path)
+        if (os.path.isdir(path) and path != "/" and path not in hidden
+                and not any(p == path or p.startswith(path + os.sep) for p in python_dirs)):
+            hidden.append(path)
+    return hidden
+
+
+def _sandboxed(command):
+    """`command` wrapped in fresh user / network / mount namespaces with private tmpfs mounts."""
+    # Only directories the sandbox user could write to need hiding (others may not even be reachable)
+    mounts = " && ".join(
+        f"{{ [ ! -w {path} ] || mount -t tmpfs -o size=16m,mode=1777 tmpfs {path}; }}"
+        for path in map(shlex.quote, _hidden_dirs())
+    )
+    return [
+        "unshare", "--user", "--map-root-user", "--net", "--mount", "--fork", "--kill-child",
+        "sh", "-c", f"{mounts} && cd /tmp && exec {shlex.join(command)}",
+    ]
+
+
+def _sandbox_available():
+    """Probes once whether this host lets us create the namespaces and run Python in them."""
+    global _sandbox_ready
+    if _sandbox_ready is None:
+        ok = False
+        if shutil.which("unshare"):
+            try:
+                ok = subprocess.run(
+                    _sandboxed([_python(), "-I", "-c", "pass"]), capture_output=True, timeout=10, **_user_args()
+                ).returncode == 0
+            except (OSError, ValueError, subprocess.SubprocessError):
+                pass
+        if not ok:
+            print(f"⚠️ Code validation: can't run {_python()} in namespaces (unshare) — import smoke tests are "
+                  + ("unsandboxed" if Config.CODE_VALIDATION_SANDBOX == "none" else "skipped"))
+        _sandbox_ready = ok
+    return _sandbox_ready
+
+
+def _may_smoke_test():
+    return Config.CODE_VALIDATION_SANDBOX == "none" or _sandbox_available()
+
+
+def _smoke_test(code):
+    """Imports the code in an isolated, resource-limited subprocess. Returns (error, notes)."""
+    command = [_python(), "-I", "-c", _RUNNER,
+               str(Config.CODE_VALIDATION_TIMEOUT), str(Config.CODE_VALIDATION_MEMORY_MB)]
+    env = {
+        "PATH": os.environ.get("PATH", ""),
+        "HOME": "/tmp",
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "PYTHONIOENCODING": "utf-8",
+    }
+    with tempfile.TemporaryDirectory(prefix="validate-") as workdir:
+        if _sandbox_available():
+            command, cwd = _sandboxed(command), "/"
+        else:
+            env["HOME"] = cwd = workdir
+            if _user_args():
+                shutil.chown(workdir, Config.CODE_VALIDATION_USER, Config.CODE_VALIDATION_GROUP)
+        try:
+            proc = subprocess.run(
+                command, cwd=cwd, env=env, input=code,
+                capture_output=True, text=True, timeout=Config.CODE_VALIDATION_TIMEOUT,
+                start_new_session=True, **_user_args(),
+            )
+        except subprocess.TimeoutExpired:
+            # Long-running scripts (servers, loops) are not broken — just not importable quickly
+            return None, [f"import did not finish within {Config.CODE_VALIDATION_TIMEOUT}s"]
+        except OSError as e:
+            # e.g. the throwaway user can't execute our interpreter — not the code's fault
+            return None, [f"import smoke test could not start: {e}"]
+
+    if proc.returncode == 0:
+        return None, []
+    lines = [line for line in proc.stderr.strip().splitlines() if line.strip()]
+    # Status 3 without the runner's message is the code itself exiting (e.g. os._exit(3))
+    if proc.returncode == EXIT_MISSING_MODULE and lines and lines[-1].startswith("missing module:"):
+        return None, [lines[-1]]
+    if proc.returncode == EXIT_NEEDS_INPUT:
+        return None, ["reads interactive input at import time"]
+    if proc.returncode == EXIT_CALLED_EXIT:
+        return None, ["calls sys.exit() at import time"]
+
+    return (lines[-1] if lines else f"exited with status {proc.returncode}"), []
+
+
+@timed_phase("validation")
+def validate(code):
+    """Validates one code string (cached by hash). Returns the report dict."""
+    started = time.perf_counter()
+    digest = code_hash(code)
+    cached = _cache.get(digest)
+    record_cache("code_validation", cached is not None)
+    if cached is not None:
+        return dict(cached, cached=True)
+
+    if not (code or "").strip():
+        report = _report(digest, False, "empty", "No code was generated.", started=started)
+    else:
+        error = _static_checks(code)
+        if error:
+            report = _report(digest, False, "syntax", error, started=started)
+        elif Config.CODE_VALIDATION_SMOKE_TEST and not _may_smoke_test():
+            report = _report(digest, True, "compile", notes=["import smoke test skipped: no sandbox"],
+                             started=started)
+        elif Config.CODE_VALIDATION_SMOKE_TEST:
+            error, notes = _smoke_test(code)
+            report = _report(digest, error is None, "import", error, notes, started=started)
+        else:
+            report = _report(digest, True, "compile", started=started)
+
+    _cache.set(digest, report)
+    return dict(report, cached=False)
+
+
+def submit(code):
+    """Queues a validation on the shared pool; returns a Future."""
+    # Carry the caller's context so the validation shows up in its run trace
+    return _pool.submit(contextvars.copy_context().run, validate, code)
+
+
+def validate_many(codes):
+    """Validates several code strings concurrently; reports come back in order."""
+    return [future.result() for future in [submit(code) for code in codes]]
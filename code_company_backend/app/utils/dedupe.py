@@ -0,0 +1,244 @@
+# app/utils/dedupe.py
+"""
+🧬 Duplicate detection for Technical Manager candidates.
+Two indexes live next to the projects in the project store database:
+  • executed_sources — normalized source URLs of every executed project (exact match)
+  • MinHash signatures + LSH band buckets over title + problem_summary (near-duplicates)
+Both are indexed tables, so lookups stay fast as history grows; new projects
+are added when they are appended and older ones are backfilled on first use.
+Only settled outcomes are indexed — completed or rejected runs. A run that
+failed (e.g. a transient provider error) leaves its source free for a retry.
+Candidates are hashed from the same fields: search title + snippet, which is
+what the project record keeps as problem_summary.
+"""
+import hashlib
+import re
+import struct
+import threading
+from array import array
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from config import Config
+from app.utils import project_store
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+INDEXED_STATUSES = ("success", "skipped")  # completed / rejected by the CEO
+INDEX_VERSION = "2"  # bump when the indexed text changes; the index is then rebuilt
+TRACKING_PARAMS = {"utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "ref", "fbclid", "gclid"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executed_sources (
+    url_key TEXT PRIMARY KEY,
+    project_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS project_minhash (
+    project_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    project_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands ON minhash_bands (band, bucket);
+"""
+
+
+def _permutations():
+    """Deterministic (a, b) pairs for the universal hash family."""
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"perm-{i}".encode(), digest_size=16).digest()
+        a, b = struct.unpack("<QQ", digest)
+        perms.append(((a % (_MERSENNE_PRIME - 1)) + 1, b % _MERSENNE_PRIME))
+    return perms
+
+
+_PERMS = _permutations()
+_ready = False
+_ready_lock = threading.Lock()
+
+
+# 🔹 Normalization
+def normalize_url(url):
+    """Canonical form of a source URL: no scheme, www, fragment, tracking params or trailing slash."""
+    if not url or url == "#":
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if k.lower() not in TRACKING_PARAMS
+    ))
+    path = parts.path.rstrip("/")
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+
+def _shingles(text, size=3):
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+# 🔹 MinHash
+def signature(text):
+    """64-value MinHash signature of the text's word 3-gram shingles."""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    hashes = [
+        struct.unpack("<Q", hashlib.blake2b(s.encode(), digest_size=8).digest())[0]
+        for s in shingles
+    ]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMS
+    ]
+
+
+def _band_buckets(sig):
+    for band in range(BANDS):
+        chunk = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        yield band, ".".join(str(v) for v in chunk)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def project_text(title, summary):
+    return f"{title or ''} {summary or ''}"
+
+
+# 🔹 Index maintenance
+def _ensure_ready():
+    """Creates the index tables and backfills projects stored before indexing existed."""
+    global _ready
+    if _ready:
+        return
+    with _ready_lock:
+        if _ready:
+            return
+        conn = project_store.connection()
+        conn.executescript(_SCHEMA)
+        _check_version(conn)
+        missing = conn.execute(
+            f"SELECT id FROM projects WHERE status IN ({', '.join('?' for _ in INDEXED_STATUSES)}) "
+            "AND id NOT IN (SELECT project_id FROM project_minhash)",
+            INDEXED_STATUSES
+        ).fetchall()
+        for (project_id,) in missing:
+            project = project_store.get(project_id, with_code=False)
+            if project:
+                _index(conn, project)
+        if missing:
+            print(f"🧬 Dedupe index: backfilled {len(missing)} project(s)")
+        _ready = True
+
+
+def _check_version(conn):
+    """Clears an index built from older text (e.g. the solution summary) so it is backfilled again."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'dedupe_index_version'").fetchone()
+    if row and row[0] == INDEX_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in ("executed_sources", "project_minhash", "minhash_bands"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('dedupe_index_version', ?)", (INDEX_VERSION,)
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if row:
+        print("🧬 Dedupe index: indexed text changed — rebuilding")
+
+
+def _index(conn, project):
+    project_id = project.get("id")
+    url_key = normalize_url(project.get("source"))
+    sig = signature(project_text(project.get("title"), project.get("problem_summary")))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM minhash_bands WHERE project_id = ?", (project_id,))
+        if url_key:
+            conn.execute(
+                "INSERT OR IGNORE INTO executed_sources (url_key, project_id) VALUES (?, ?)",
+                (url_key, project_id)
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO project_minhash (project_id, signature) VALUES (?, ?)",
+            (project_id, array("I", sig).tobytes() if sig else b"")
+        )
+        if sig:
+            conn.executemany(
+                "INSERT INTO minhash_bands (band, bucket, project_id) VALUES (?, ?, ?)",
+                [(band, bucket, project_id) for band, bucket in _band_buckets(sig)]
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def index_project(project):
+    """Adds a freshly stored project to both indexes (settled outcomes only)."""
+    if project.get("status") not in INDEXED_STATUSES:
+        return
+    _ensure_ready()
+    _index(project_store.connection(), project)
+
+
+# 🔹 Lookups
+def is_executed_source(url):
+    url_key = normalize_url(url)
+    if not url_key:
+        return False
+    _ensure_ready()
+    row = project_store.connection().execute(
+        "SELECT 1 FROM executed_sources WHERE url_key = ?", (url_key,)
+    ).fetchone()
+    return row is not None
+
+
+def find_near_duplicate(title, summary, threshold=None):
+    """
+    Returns (project_id, similarity) of the most similar executed project above
+    `threshold` (Config.DEDUPE_SIMILARITY), or None.
+    """
+    threshold = Config.DEDUPE_SIMILARITY if threshold is None else threshold
+    sig = signature(project_text(title, summary))
+    if not sig:
+        return None
+    _ensure_ready()
+    conn = project_store.connection()
+
+    candidate_ids = set()
+    for band, bucket in _band_buckets(sig):
+        for (project_id,) in conn.execute(
+            "SELECT project_id FROM minhash_bands WHERE band = ? AND bucket = ?", (band, bucket)
+        ):
+            candidate_ids.add(project_id)
+
+    best = None
+    for project_id in candidate_ids:
+        row = conn.execute(
+            "SELECT signature FROM project_minhash WHERE project_id = ?", (project_id,)
+        ).fetchone()
+        if not row or not row[0]:
+            continue
+        stored = array("I")
+        stored.frombytes(row[0])
+        score = similarity(sig, stored)
+        if score >= threshold and (best is None or score > best[1]):
+            best = (project_id, score)
+    return best
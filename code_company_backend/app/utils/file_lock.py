@@ -0,0 +1,30 @@
+# app/utils/file_lock.py
+"""
+🔐 Cross-process lock for read-modify-write of shared JSON files.
+The web workers and the scheduler worker write the same files (memory.json,
+approval_model.json); holding `<file>.write-lock` while re-reading and
+rewriting keeps one process from overwriting another's changes.
+"""
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process is up to the operator
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Holds an exclusive advisory lock tied to `path` for the duration of the block."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = f"{path}.write-lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
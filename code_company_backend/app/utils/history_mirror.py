@@ -0,0 +1,112 @@
+# app/utils/history_mirror.py
+"""
+🪞 Local mirror of the Supabase project_history table.
+A small SQLite table that syncs only rows with an id above the highest mirrored
+one, so /company/history can be served locally with the same keyset pagination.
+Syncing goes by id rather than timestamp: spool replays insert rows late with
+their original (older) timestamps.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import Config
+from app.utils.supabase_logger import (
+    HISTORY_COLUMNS, decode_cursor, encode_cursor, fetch_project_history_after
+)
+
+SYNC_PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS project_history (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_ts_id ON project_history (timestamp, id);
+"""
+
+_local = threading.local()
+_sync_lock = threading.Lock()
+_last_sync = 0.0
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        path = Path(Config.HISTORY_MIRROR_DB)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _max_id(conn):
+    return conn.execute("SELECT MAX(id) FROM project_history").fetchone()[0]
+
+
+def sync():
+    """Pulls rows with an id above the highest mirrored one from Supabase, page by page."""
+    global _last_sync
+    with _sync_lock:
+        conn = _connect()
+        after_id = _max_id(conn)
+        pulled = 0
+        while True:
+            result = fetch_project_history_after(
+                after_id=after_id, limit=SYNC_PAGE_SIZE, columns=HISTORY_COLUMNS
+            )
+            if result["status"] != "success":
+                return {"status": "error", "message": result["message"], "synced": pulled}
+            rows = [r for r in result["data"] if r.get("id") is not None]
+            if rows:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO project_history (id, timestamp, data) VALUES (?, ?, ?)",
+                    [(r["id"], r["timestamp"], json.dumps(r, ensure_ascii=False)) for r in rows]
+                )
+                conn.execute("COMMIT")
+                pulled += len(rows)
+                after_id = max(r["id"] for r in rows)
+            if len(result["data"]) < SYNC_PAGE_SIZE:
+                break
+        _last_sync = time.monotonic()
+        if pulled:
+            print(f"🪞 History mirror: synced {pulled} new row(s)")
+        return {"status": "success", "synced": pulled}
+
+
+def sync_if_stale():
+    """Syncs when the last sync is older than HISTORY_MIRROR_SYNC_INTERVAL."""
+    if time.monotonic() - _last_sync >= Config.HISTORY_MIRROR_SYNC_INTERVAL:
+        return sync()
+    return {"status": "success", "synced": 0}
+
+
+def query(limit=None, cursor=None, since=None, columns=None):
+    """Same contract as fetch_project_history, served from the local mirror."""
+    sql = "SELECT data FROM project_history"
+    clauses, params = [], []
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+        params += [ts, ts, row_id]
+    if since:
+        clauses.append("timestamp > ?")
+        params.append(since)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY timestamp DESC, id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    rows = [json.loads(r[0]) for r in _connect().execute(sql, params).fetchall()]
+    next_cursor = encode_cursor(rows[-1]) if limit and len(rows) == limit else None
+    if columns:
+        rows = [{k: r.get(k) for k in columns} for r in rows]
+    return {"status": "success", "data": rows, "next_cursor": next_cursor}
@@ -0,0 +1,55 @@
+# app/utils/http_cache.py
+"""
+📨 Conditional + compressed JSON responses for read endpoints.
+Handles ETag / If-None-Match (304) and gzip when the client accepts it.
+"""
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+from app.utils.metrics import record_cache
+
+GZIP_MIN_BYTES = 1024
+
+
+def make_etag(*parts):
+    """Weak ETag derived from whatever identifies the response content."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _etag_matches(etag):
+    header = request.headers.get("If-None-Match", "")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return etag in candidates or bare in candidates or f"W/{bare}" in candidates
+
+
+def cached_json(build_payload, etag, max_age=0):
+    """
+    Returns 304 when the client already has `etag`; otherwise calls
+    `build_payload()` and sends it as JSON, gzipped if the client accepts it.
+    Building is deferred so 304 responses skip the query and encoding work.
+    """
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={max_age}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    matched = _etag_matches(etag)
+    record_cache("http_etag", matched)
+    if matched:
+        return Response(status=304, headers=headers)
+
+    body = json.dumps(build_payload(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("Accept-Encoding", ""):
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(body, status=200, mimetype="application/json", headers=headers)
@@ -0,0 +1,126 @@
+# app/utils/http_client.py
+"""
+🌐 Shared outbound HTTP client — one pooled keep-alive session per host,
+with retries and jittered exponential backoff on transient failures.
+Every request passes the provider's rate limiter and circuit breaker (rate_limit).
+"""
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from app.utils import tracing
+from app.utils.metrics import record_outbound
+from app.utils.rate_limit import get_provider
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """Returns the pooled session for the host of `url`, creating it on first use."""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=Config.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+                max_retries=0  # retries are handled in post_json
+            )
+            session.mount(host, adapter)
+            _sessions[host] = session
+    return session
+
+
+def _backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring a server Retry-After (seconds)."""
+    if retry_after is not None:
+        return min(retry_after, Config.HTTP_BACKOFF_MAX)
+    ceiling = min(Config.HTTP_BACKOFF_MAX, Config.HTTP_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def post_json(url, payload, headers=None, timeout=None, stream=False, retries=None, circuit=None,
+              retry_failures=True):
+    """
+    POSTs `payload` as JSON through the pooled session for the URL's host.
+    Retries connection errors, timeouts and 429/5xx responses with jittered backoff.
+    429s pause the provider's shared token bucket, so concurrent callers wait together.
+    `timeout` is the read timeout in seconds; the connect timeout comes from Config.
+    Returns the final `requests.Response` (callers still call raise_for_status()).
+    Raises ProviderUnavailable when the circuit is open or the rate-limit wait is too long.
+    `circuit` names the breaker to use within the provider (LLM calls pass the
+    model, so one failing model doesn't open the circuit for the others).
+    With `retry_failures=False` only 429s are retried; errors, timeouts and 5xx
+    go straight back to a caller that has somewhere else to go (the model router).
+    """
+    session = get_session(url)
+    provider = get_provider(url)
+    retries = Config.HTTP_MAX_RETRIES if retries is None else retries
+    request_timeout = (Config.HTTP_CONNECT_TIMEOUT, timeout or Config.HTTP_READ_TIMEOUT)
+
+    traced = tracing.current_trace() is not None
+    request_bytes = len(json.dumps(payload, default=str)) if traced else None
+
+    attempt = 0
+    while True:
+        provider.before_request(circuit)
+        started = time.perf_counter()
+        try:
+            with tracing.span("http", provider=provider.name, path=urlsplit(url).path,
+                              attempt=attempt, request_bytes=request_bytes) as record:
+                response = session.post(
+                    url, json=payload, headers=headers, timeout=request_timeout, stream=stream
+                )
+                if record is not None:  # a failed attempt gets the exception name as "error"
+                    record["attrs"]["status"] = response.status_code
+                    if not stream:
+                        record["attrs"]["response_bytes"] = len(response.content)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record_outbound(provider.name, e.__class__.__name__, time.perf_counter() - started)
+            provider.after_error(circuit)
+            if attempt >= retries or not retry_failures:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"⚠️ {urlsplit(url).netloc} request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+        else:
+            record_outbound(provider.name, str(response.status_code), time.perf_counter() - started)
+            provider.after_response(response, circuit)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            if response.status_code != 429 and not retry_failures:
+                return response
+            response.close()
+            if response.status_code == 429:
+                # The provider's bucket is already paused; the next acquire waits for it
+                attempt += 1
+                continue
+            delay = _backoff_delay(attempt, _retry_after_seconds(response))
+            print(f"⚠️ {urlsplit(url).netloc} returned {response.status_code}, retrying in {delay:.1f}s")
+
+        time.sleep(delay)
+        attempt += 1
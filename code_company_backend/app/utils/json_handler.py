@@ -1,30 +1,33 @@
-import json
-import os
-from config import Config
+from app.utils.state_store import state_store
 
-# 🔹 Read data from memory.json
+# State lives in the in-memory state store and is written behind to memory.json.
+PIPELINE_NAMESPACE = "pipeline"
+SAVED_NAMESPACE = "saved"
+
+
+# 🔹 Read pipeline state (current_project, last_action, ...)
 def read_memory():
-    """Reads data from the JSON memory file."""
-    try:
-        if not os.path.exists(Config.MEMORY_FILE):
-            return {}
-        with open(Config.MEMORY_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+    """Returns a copy of the pipeline state."""
+    return state_store.get(PIPELINE_NAMESPACE)
 
-# 🔹 Write or update data to memory.json
+# 🔹 Replace pipeline state
 def write_memory(data):
-    """Writes or updates data to the JSON memory file."""
-    with open(Config.MEMORY_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    """Writes or updates the pipeline state."""
+    state_store.set(PIPELINE_NAMESPACE, data)
     return {"status": "success", "message": "Data written successfully."}
 
-# 🔹 (Optional) For /save and /read routes compatibility
-def save_to_json(data):
-    """Alias for write_memory, used in routes.py"""
-    return write_memory(data)
+# 🔹 Merge keys into pipeline state without a read-modify-write race
+def update_memory(changes):
+    """Merges `changes` into the pipeline state atomically."""
+    state_store.update(PIPELINE_NAMESPACE, changes)
+    return {"status": "success", "message": "Data updated successfully."}
+
+# 🔹 For /save, /read and /search — kept apart from the pipeline state
+def save_to_json(data, namespace=SAVED_NAMESPACE):
+    """Stores a payload in its own namespace (never touches pipeline state)."""
+    state_store.set(namespace, data)
+    return {"status": "success", "message": "Data written successfully."}
 
-def read_json():
-    """Alias for read_memory, used in routes.py"""
-    return read_memory()
+def read_json(namespace=SAVED_NAMESPACE):
+    """Returns the payload stored in `namespace`."""
+    return state_store.get(namespace)
@@ -0,0 +1,349 @@
+# app/utils/json_parser.py
+"""
+🧩 Lenient JSON extraction for LLM replies.
+A character-level scanner finds balanced JSON objects in a reply (or in a
+stream of chunks) while ignoring prose and code fences around them. On the way
+it repairs the defects models commonly produce:
+  • raw newlines / tabs inside strings          → escaped
+  • unescaped quotes inside strings (code!)     → escaped, judged by what follows:
+    a quote ends the string only before `,` + the next `"key":` (in an object,
+    with the brackets opened inside the string balanced), the matching closer,
+    or `:` after a key — so `open("f.txt", "w")`, `["a", "b"]` and
+    `{"k": "v", "n": 1}` inside code stay part of the string
+  • invalid backslash escapes (regexes, paths)  → literal backslash
+  • trailing commas before } or ]               → dropped
+  • a reply cut off mid-object                  → closed on finish()
+It also yields top-level string fields as they stream in, and keeps their
+decoded values so single fields can be salvaged when the whole object can't;
+only fields whose string closed cleanly are salvaged.
+"""
+import json
+import re
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", '"': '"', "\\": "\\", "/": "/"}
+_RAW_CONTROL = {"\n": "\\n", "\t": "\\t", "\r": "\\r"}
+_CLOSERS = {"{": "}", "[": "]"}
+_WHITESPACE = " \t\r\n"
+# After `",` a real string end is followed by the next item: a value in an array,
+# the next `"key":` in an object (code like `open("f.txt", "w")` is neither)
+_VALUE_STARTS = '"{[}]-0123456789'
+_NEXT_KEY = re.compile(r'[ \t\r\n]*"[A-Za-z_][A-Za-z0-9_]*"[ \t\r\n]*:')
+_NEXT_KEY_PREFIX = re.compile(r'[ \t\r\n]*(?:"(?:[A-Za-z_][A-Za-z0-9_]*(?:"[ \t\r\n]*)?)?)?')
+
+
+class JSONStreamScanner:
+    """
+    Incremental scanner: `feed(chunk)` returns [(field, decoded_delta), ...] for
+    top-level string fields; completed objects collect in `objects` as
+    (repaired_text, was_repaired) pairs. Call `finish()` at the end of the stream.
+    """
+
+    def __init__(self, containers="{"):
+        self.containers = containers
+        self.objects = []
+        self.fields = {}
+        self.closed_fields = set()  # top-level string fields whose closing quote was found
+        self.partial = None
+        self._reset_object()
+        self._deltas = []
+
+    def _reset_object(self):
+        self.stack = []
+        self.buffer = []
+        self.repaired = False
+        self.in_string = False
+        self.escape = ""
+        self.pending = None
+        self.string_is_value = False
+        self.string_depth = 0  # brackets opened minus closed inside the current string
+        self.expect_value = False
+        self.token = []
+        self.last_key = None
+        self.comma_at = None
+        self.end_candidate = None  # where a `"}` we judged to be code could have ended the object
+
+    # 🔹 Feeding
+    def feed(self, text):
+        """Consumes a chunk; returns the string-field deltas it completed."""
+        self._deltas = []
+        for ch in text:
+            self._char(ch)
+        merged = []
+        for field, delta in self._deltas:
+            if merged and merged[-1][0] == field:
+                merged[-1] = (field, merged[-1][1] + delta)
+            else:
+                merged.append((field, delta))
+        return merged
+
+    def finish(self):
+        """Ends the stream; a still-open object is closed into `partial`."""
+        if self.pending is not None:
+            self._resolve_pending(force_close=True)
+        if not self.stack:
+            return self
+        if self.end_candidate is not None:
+            # The object never closed after all: the last `"}` we kept as code was its
+            # end and the rest was prose after the JSON
+            length, key, value_length = self.end_candidate
+            self.objects.append(("".join(self.buffer[:length]) + '"}', True))
+            self.fields[key] = self.fields[key][:value_length]
+            self.closed_fields.add(key)
+            self._reset_object()
+            return self
+        if self.in_string:
+            if self.escape:
+                self.buffer.append("\\")
+                self.escape = ""
+            self._end_string(clean=False)
+        elif self.expect_value:
+            self.buffer.append("null")
+        self._drop_trailing_comma()
+        while self.stack:
+            self.buffer.append(_CLOSERS[self.stack.pop()])
+        self.partial = "".join(self.buffer)
+        self._reset_object()
+        return self
+
+    def _char(self, ch):
+        if self.pending is not None:
+            self.pending += ch
+            self._resolve_pending()
+        elif self.in_string:
+            self._string_char(ch)
+        elif not self.stack:
+            if ch in self.containers:
+                self.stack.append(ch)
+                self.buffer = [ch]
+        else:
+            self._structural_char(ch)
+
+    def _structural_char(self, ch):
+        if ch in _WHITESPACE:
+            self.buffer.append(ch)
+            return
+        if ch in "}]":
+            self._drop_trailing_comma()
+            self.buffer.append(ch)
+            self.stack.pop()
+            self.expect_value = False
+            if not self.stack:
+                self.objects.append(("".join(self.buffer), self.repaired))
+                self._reset_object()
+            return
+
+        self.comma_at = len(self.buffer) if ch == "," else None
+        self.buffer.append(ch)
+        if ch == '"':
+            self.in_string = True
+            self.string_is_value = self.expect_value or self.stack[-1] == "["
+            self.string_depth = 0
+            self.expect_value = False
+            self.token = []
+        elif ch in "{[":
+            self.stack.append(ch)
+            self.expect_value = False
+        elif ch == ":":
+            self.expect_value = True
+        elif ch == ",":
+            self.expect_value = False
+
+    def _drop_trailing_comma(self):
+        if self.comma_at is not None:
+            del self.buffer[self.comma_at]
+            self.comma_at = None
+            self.repaired = True
+
+    # 🔹 Strings
+    def _string_char(self, ch):
+        if self.escape:
+            self.escape += ch
+            if self.escape[1] == "u":
+                if len(self.escape) < 6:
+                    return
+                try:
+                    decoded = chr(int(self.escape[2:], 16))
+                except ValueError:
+                    # Not a \uXXXX escape — keep the backslash literally
+                    self.repaired = True
+                    raw, self.escape = self.escape, ""
+                    self._emit("\\\\", "\\")
+                    for c in raw[1:]:
+                        self._string_char(c)
+                    return
+                self._emit(self.escape, decoded)
+            elif ch in _ESCAPES:
+                self._emit(self.escape, _ESCAPES[ch])
+            else:
+                self.repaired = True
+                self.escape = ""
+                self._emit("\\\\", "\\")
+                self._string_char(ch)
+                return
+            self.escape = ""
+        elif ch == "\\":
+            self.escape = ch
+        elif ch == '"':
+            self.pending = ch
+        elif ch in _RAW_CONTROL:
+            self.repaired = True
+            self._emit(_RAW_CONTROL[ch], ch)
+        else:
+            self._emit(ch, ch)
+
+    def _emit(self, raw, decoded):
+        self.buffer.append(raw)
+        if decoded in ("{", "[", "("):
+            self.string_depth += 1
+        elif decoded in ("}", "]", ")"):
+            self.string_depth -= 1
+        if self.string_is_value:
+            if len(self.stack) == 1 and self.last_key is not None:
+                self._deltas.append((self.last_key, decoded))
+                self.fields[self.last_key] = self.fields.get(self.last_key, "") + decoded
+        else:
+            self.token.append(decoded)
+
+    def _resolve_pending(self, force_close=False):
+        """Decides whether a quote inside a string ends it, from the characters after it."""
+        rest = self.pending[1:].lstrip(_WHITESPACE)
+        if force_close:
+            # End of input: the quote closes the string, cleanly only if JSON follows it
+            close = True
+        elif not rest:
+            return
+        elif rest[0] in "}]":
+            close = self._closes_container(rest)
+        elif rest[0] == ":":
+            # Only keys are followed by a colon; in a value it's code like {"a": 1}
+            close = not self.string_is_value
+        elif rest[0] == ",":
+            close = self._starts_next_item(rest[1:])
+        else:
+            close = False
+        if close is None:
+            return  # can't tell yet — wait for more characters
+
+        text, self.pending = self.pending, None
+        if close:
+            self._end_string(clean=bool(rest))
+        else:
+            if rest[:1] == "}" and len(self.stack) == 1 and self.string_is_value and self.last_key:
+                self.end_candidate = (len(self.buffer), self.last_key, len(self.fields[self.last_key]))
+            self.repaired = True
+            self._emit('\\"', '"')
+        for c in text[1:]:
+            self._char(c)
+
+    def _closes_container(self, rest):
+        """`"` + `}` / `]`: a string end only if it closes our container and the JSON goes on sensibly."""
+        if rest[0] != _CLOSERS[self.stack[-1]]:
+            return False  # e.g. d["key"] inside an object's string
+        after = rest[1:].lstrip(_WHITESPACE)
+        if not after:
+            return None
+        if len(self.stack) > 1:
+            return after[0] in ",}]"
+        # Closing the whole object: only the end of the reply or a fence may follow,
+        # otherwise it is code like {"k": "v"} followed by more code
+        return after[0] == "`"
+
+    def _starts_next_item(self, after):
+        """`"` + `,`: a string end only if the next array value / object key follows."""
+        stripped = after.lstrip(_WHITESPACE)
+        if stripped[:1] in ("}", "]"):
+            return self._closes_container(stripped)  # a trailing comma
+        if self.stack[-1] == "[":
+            return (stripped[0] in _VALUE_STARTS) if stripped else None
+        if _NEXT_KEY.match(after):
+            # Inside code like {"a": "x", "b": 1} the string's own brackets are still open
+            return self.string_depth <= 0
+        if _NEXT_KEY_PREFIX.fullmatch(after):
+            return None
+        return False
+
+    def _end_string(self, clean=True):
+        self.in_string = False
+        self.end_candidate = None  # the string did close later, so that `"}` was code
+        self.buffer.append('"')
+        if not self.string_is_value and len(self.stack) == 1:
+            self.last_key = "".join(self.token)
+            self.fields.setdefault(self.last_key, "")
+        elif clean and len(self.stack) == 1 and self.last_key is not None:
+            self.closed_fields.add(self.last_key)
+
+    def complete_fields(self, names):
+        """Decoded top-level string fields among `names` whose string closed cleanly."""
+        return {name: self.fields[name] for name in names if name in self.closed_fields}
+
+
+def strip_code_fences(text):
+    """Removes a ```json ... ``` wrapper around the whole reply."""
+    stripped = (text or "").strip()
+    if not stripped.startswith("```"):
+        return stripped
+    first_newline = stripped.find("\n")
+    if first_newline == -1:
+        return ""
+    body = stripped[first_newline + 1:]
+    if body.rstrip().endswith("```"):
+        body = body.rstrip()[:-3]
+    return body.strip()
+
+
+def parse_json_reply(text, required_keys=(), containers="{"):
+    """
+    Best-effort parse of an LLM reply. Returns (value, status) where status is
+    "ok" (valid as-is), "repaired", "truncated" (object was cut off and closed)
+    or None when no JSON could be recovered (value is then None too).
+    Objects containing `required_keys` are preferred, then the largest one.
+    """
+    body = strip_code_fences(text)
+    try:
+        value = json.loads(body)
+        if isinstance(value, dict) or (isinstance(value, list) and "[" in containers):
+            return value, "ok"
+    except ValueError:
+        pass
+
+    scanner = JSONStreamScanner(containers)
+    scanner.feed(body)
+    scanner.finish()
+    return _pick(scanner, required_keys)
+
+
+def _pick(scanner, required_keys):
+    parsed = []
+    for raw, repaired in scanner.objects:
+        try:
+            parsed.append((json.loads(raw), "repaired" if repaired else "ok"))
+        except ValueError:
+            continue
+
+    def rank(item):
+        value = item[0]
+        has_keys = isinstance(value, dict) and all(k in value for k in required_keys)
+        return (has_keys, len(json.dumps(value)))
+
+    if parsed:
+        return max(parsed, key=rank)
+    if scanner.partial:
+        try:
+            return json.loads(scanner.partial), "truncated"
+        except ValueError:
+            pass
+    return None, None
+
+
+def parse_scanned(scanner, required_keys=()):
+    """Same as parse_json_reply for a scanner that was fed a stream (calls finish())."""
+    scanner.finish()
+    return _pick(scanner, required_keys)
+
+
+def extract_fields(text, names):
+    """Salvages individual top-level string fields, even from an unparseable object."""
+    scanner = JSONStreamScanner()
+    scanner.feed(strip_code_fences(text))
+    scanner.finish()
+    return scanner.complete_fields(names)
@@ -0,0 +1,135 @@
+# app/utils/llm_cache.py
+"""
+🗃️ Persistent LLM response cache — raw completions stored on disk, keyed by a
+SHA-256 of (model, system prompt, user prompt). Entries expire after a TTL and
+the oldest files are evicted once the cache grows past its size budget.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from config import Config
+
+_lock = threading.Lock()
+_total_bytes = None  # computed lazily on first write
+
+
+def cache_key(model, system_prompt, user_prompt):
+    """Content address of one chat request."""
+    raw = json.dumps([model, system_prompt, user_prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path_for(key):
+    return Path(Config.LLM_CACHE_DIR) / key[:2] / f"{key}.json"
+
+
+def get(key):
+    """Returns the cached raw completion for `key`, or None when missing or expired."""
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    path = _path_for(key)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created_at", 0) > Config.LLM_CACHE_TTL:
+        forget(key)
+        return None
+    return entry.get("completion")
+
+
+def put(key, model, completion):
+    """Stores a raw completion atomically, then evicts old entries if over budget."""
+    if not Config.LLM_CACHE_ENABLED:
+        return
+    global _total_bytes
+    path = _path_for(key)
+    body = json.dumps({
+        "model": model,
+        "created_at": time.time(),
+        "completion": completion
+    }, ensure_ascii=False).encode("utf-8")
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ LLM cache write error: {e}")
+        return
+
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = _scan_size()
+        else:
+            _total_bytes += len(body) - old_size
+        if _total_bytes > Config.LLM_CACHE_MAX_BYTES:
+            _evict()
+
+
+def forget(key):
+    """Drops one entry, e.g. when its completion could not be parsed."""
+    global _total_bytes
+    path = _path_for(key)
+    try:
+        size = path.stat().st_size
+        path.unlink()
+    except OSError:
+        return
+    with _lock:
+        if _total_bytes is not None:
+            _total_bytes -= size
+
+
+def _entries():
+    root = Path(Config.LLM_CACHE_DIR)
+    if not root.exists():
+        return []
+    return list(root.glob("*/*.json"))
+
+
+def _scan_size():
+    total = 0
+    for path in _entries():
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def _evict():
+    """Deletes the oldest entries until the cache is back under 90% of its budget."""
+    global _total_bytes
+    files = []
+    for path in _entries():
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    target = Config.LLM_CACHE_MAX_BYTES * 0.9
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in files:
+        if total <= target:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    _total_bytes = total
+    if removed:
+        print(f"🧹 LLM cache: evicted {removed} old entr{'y' if removed == 1 else 'ies'}")
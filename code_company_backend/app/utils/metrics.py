@@ -0,0 +1,261 @@
+# app/utils/metrics.py
+"""
+📈 In-process metrics, rendered in Prometheus text format at /metrics.
+  • phase latency histograms (technical, supabase cache lookup, ceo, operations,
+    validation, supabase logging, project file write) via @timed_phase
+  • request counts, errors and latency per Flask route (init_app)
+  • outbound request latency per provider (http_client)
+  • cache hit / miss counters (+ a hit ratio per cache)
+  • LLM token usage from the OpenRouter `usage` field
+  • startup stages and first-use init costs (app/utils/startup.py)
+Recording is a dict update under a lock — cheap enough to leave on.
+Values are per process: the scheduler worker (worker.py) keeps its own.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+
+from config import Config
+from app.utils import startup, tracing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", " ").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labels), 0)
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in self.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in snapshot:
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                le = [("le", _format_value(float(bound)))]
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {running}")
+            inf = [("le", "+Inf")]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+_registry = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+# 🔹 Metrics
+phase_seconds = _register(Histogram(
+    "company_phase_duration_seconds", "Time spent in each pipeline phase.", ("phase",)))
+phase_errors = _register(Counter(
+    "company_phase_errors_total", "Pipeline phases that raised.", ("phase",)))
+http_requests = _register(Counter(
+    "http_requests_total", "Requests handled, by route, method and status.", ("route", "method", "status")))
+http_errors = _register(Counter(
+    "http_request_errors_total", "Requests answered with a 5xx (including unhandled errors), by route.", ("route",)))
+http_seconds = _register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("route",)))
+outbound_seconds = _register(Histogram(
+    "outbound_request_duration_seconds", "Outbound API call latency by provider and status.", ("provider", "status")))
+cache_requests = _register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit / miss).", ("cache", "result")))
+llm_tokens = _register(Counter(
+    "llm_tokens_total", "Tokens reported by OpenRouter, by model and kind.", ("model", "kind")))
+llm_requests = _register(Counter(
+    "llm_requests_total", "OpenRouter completions that returned, by model.", ("model",)))
+
+
+# 🔹 Recording helpers
+def observe_phase(phase, seconds, failed=False):
+    if not Config.METRICS_ENABLED:
+        return
+    phase_seconds.observe(seconds, phase=phase)
+    if failed:
+        phase_errors.inc(phase=phase)
+
+
+def timed_phase(phase):
+    """Decorator: records the wrapped call's duration under `phase` (and as a trace span)."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                failed = True
+                try:
+                    with tracing.span(phase):
+                        result = await fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    observe_phase(phase, time.perf_counter() - started, failed)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                with tracing.span(phase):
+                    result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                observe_phase(phase, time.perf_counter() - started, failed)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache, hit):
+    if Config.METRICS_ENABLED:
+        cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_usage(model, usage):
+    """Counts one completion and the tokens in its OpenRouter `usage` object."""
+    if not Config.METRICS_ENABLED:
+        return
+    llm_requests.inc(model=model)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = (usage or {}).get(kind)
+        if isinstance(value, (int, float)):
+            llm_tokens.inc(value, model=model, kind=kind.replace("_tokens", ""))
+
+
+def record_outbound(provider, status, seconds):
+    if Config.METRICS_ENABLED:
+        outbound_seconds.observe(seconds, provider=provider, status=status)
+
+
+# 🔹 Flask instrumentation
+def init_app(app):
+    """Counts and times every request by its route pattern (not the raw path)."""
+    from flask import g, request
+
+    if not Config.METRICS_ENABLED:
+        return
+
+    def _route():
+        return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        route = _route()
+        http_requests.inc(route=route, method=request.method, status=str(response.status_code))
+        if response.status_code >= 500:
+            http_errors.inc(route=route)
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            http_seconds.observe(time.perf_counter() - started, route=route)
+        return response
+
+
+# 🔹 Exposition
+def _cache_ratios():
+    totals = {}
+    for (cache, result), value in cache_requests.items():
+        hits, total = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (value if result == "hit" else 0), total + value)
+    lines = ["# HELP cache_hit_ratio Share of lookups served from the cache.",
+             "# TYPE cache_hit_ratio gauge"]
+    for cache, (hits, total) in sorted(totals.items()):
+        lines.append(f'cache_hit_ratio{{cache="{cache}"}} {round(hits / total, 4) if total else 0}')
+    return lines
+
+
+def _startup_gauges():
+    report = startup.report()
+    lines = ["# HELP process_startup_seconds Seconds from process start until each startup stage.",
+             "# TYPE process_startup_seconds gauge"]
+    for stage, ms in report["stages_ms"].items():
+        lines.append(f'process_startup_seconds{{stage="{stage}"}} {round(ms / 1000, 4)}')
+    lines += ["# HELP lazy_init_seconds One-time cost of components created on first use.",
+              "# TYPE lazy_init_seconds gauge"]
+    for component, ms in report["lazy_init_ms"].items():
+        lines.append(f'lazy_init_seconds{{component="{component}"}} {round(ms / 1000, 4)}')
+    return lines
+
+
+def render():
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    lines.extend(_cache_ratios())
+    lines.extend(_startup_gauges())
+    return "\n".join(lines) + "\n"
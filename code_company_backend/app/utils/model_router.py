@@ -0,0 +1,348 @@
+# app/utils/model_router.py
+"""
+🧭 Model router — picks the OpenRouter model for each CEO / Operations call.
+Each role has an ordered list of candidate models (Config.CEO_MODELS,
+Config.OPERATIONS_MODELS). Per model we keep a rolling window of latency,
+errors and whether the reply parsed, and route every call to the best
+healthy model:
+  • score = p50 latency ÷ success rate (errors and malformed replies count as failures)
+  • a model failing most of its recent calls is benched for MODEL_BENCH_SECONDS,
+    then gets one more call to show whether it has recovered
+  • on an error, timeout or malformed reply the next model is tried right away
+    (routed calls retry only 429s themselves)
+  • with MODEL_HEDGE_AFTER > 0, a slow call gets a duplicate request to the
+    runner-up model and the first good reply wins
+`acomplete` does the same for the async pipeline, with hedges as asyncio tasks.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import Config
+from app.utils import tracing
+from app.utils.openrouter import achat_completion, chat_completion, forget_completion
+
+MIN_SAMPLES = 3
+UNHEALTHY_FAILURE_RATE = 0.5
+
+
+def _hedge_workers():
+    """Room for a primary + backup request per LLM call that can be in flight at once."""
+    if Config.MODEL_HEDGE_WORKERS > 0:
+        return Config.MODEL_HEDGE_WORKERS
+    calls_per_run = max(Config.BATCH_MAX_SIZE, Config.BATCH_MAX_WORKERS)
+    runs = max(Config.JOB_WORKERS, Config.SCHEDULER_MAX_CONCURRENT, 1)
+    return max(8, 2 * calls_per_run * runs)
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=_hedge_workers(), thread_name_prefix="llm-hedge")
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+class ModelStats:
+    """Rolling window of one model's calls."""
+
+    def __init__(self, window):
+        self.calls = deque(maxlen=window)  # (latency, ok, parsed)
+        self.last_call = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok, parsed=None):
+        with self._lock:
+            self.calls.append((latency, ok, parsed))
+            self.last_call = time.monotonic()
+
+    def summary(self):
+        with self._lock:
+            calls = list(self.calls)
+        latencies = [c[0] for c in calls if c[1]]
+        parsed = [c[2] for c in calls if c[1] and c[2] is not None]
+        errors = sum(1 for c in calls if not c[1])
+        failures = errors + sum(1 for p in parsed if not p)
+        return {
+            "samples": len(calls),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "error_rate": round(errors / len(calls), 3) if calls else None,
+            "parse_rate": round(sum(parsed) / len(parsed), 3) if parsed else None,
+            "success_rate": round(1 - failures / len(calls), 3) if calls else None,
+            "idle_seconds": round(time.monotonic() - self.last_call, 1) if calls else None,
+        }
+
+
+class ModelRouter:
+    """Ranks a role's candidate models and runs calls with failover and hedging."""
+
+    def __init__(self, roles, window=None, hedge_after=None):
+        self.roles = roles
+        self.window = window or Config.MODEL_STATS_WINDOW
+        self.hedge_after = Config.MODEL_HEDGE_AFTER if hedge_after is None else hedge_after
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _stats_for(self, model):
+        stats = self._stats.get(model)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(model, ModelStats(self.window))
+        return stats
+
+    def models(self, role):
+        return list(self.roles.get(role) or [Config.OPENROUTER_MODEL])
+
+    def ranked(self, role):
+        """
+        Healthy models first (lowest score), benched ones last. Models without enough
+        samples keep their config position: the primary leads, fallbacks follow the
+        measured models. A benched model that has rested long enough is probed first.
+        """
+        def key(item):
+            position, model = item
+            s = self._stats_for(model).summary()
+            if s["samples"] < MIN_SAMPLES:
+                return (0, 0 if position == 0 else float("inf"), position)
+            if s["success_rate"] < 1 - UNHEALTHY_FAILURE_RATE:
+                if s["idle_seconds"] >= Config.MODEL_BENCH_SECONDS:
+                    return (0, 0, position)
+                return (1, 0, position)
+            p50 = s["p50"] if s["p50"] is not None else float("inf")
+            return (0, p50 / max(s["success_rate"], 0.05), position)
+        return [model for _, model in sorted(enumerate(self.models(role)), key=key)]
+
+    def best(self, role):
+        return self.ranked(role)[0]
+
+    def record(self, model, latency, ok, parsed=None):
+        self._stats_for(model).record(latency, ok, parsed)
+
+    def forget(self, role, system_prompt, user_prompt):
+        """Evicts the cached reply for these prompts from every model of the role."""
+        for model in self.models(role):
+            forget_completion(system_prompt, user_prompt, model=model)
+
+    # 🔹 Calls
+    def _attempt(self, model, system_prompt, user_prompt, timeout, use_cache, validate):
+        """One call to one model. Returns (reply, parsed_ok); raises on request errors."""
+        started = time.perf_counter()
+        try:
+            reply = chat_completion(
+                system_prompt, user_prompt, timeout=timeout, model=model, use_cache=use_cache, failover=True
+            )
+        except Exception:
+            self.record(model, time.perf_counter() - started, ok=False)
+            raise
+        parsed = validate(reply) if validate else True
+        self.record(model, time.perf_counter() - started, ok=True, parsed=parsed)
+        if not parsed:
+            forget_completion(system_prompt, user_prompt, model=model)
+        return reply, parsed
+
+    def _hedged(self, primary, backup, args):
+        """
+        Runs `primary`; if it is still running after hedge_after seconds, races `backup`.
+        If `primary` fails or replies malformed before that, `backup` is tried right away,
+        so an unsuccessful result always means both models were tried.
+        Returns (reply, model, parsed, error). The losing request is not cancelled —
+        it finishes in the background and still feeds the stats and the cache.
+        """
+        futures = {}
+
+        def submit(model):
+            future = _hedge_pool.submit(contextvars.copy_context().run, self._attempt, model, *args)
+            futures[future] = model
+            return future
+
+        pending = {submit(primary)}
+        deadline = time.monotonic() + self.hedge_after
+        errors, malformed = [], None
+        while pending:
+            hedging = len(futures) == 1
+            timeout = max(0.0, deadline - time.monotonic()) if hedging else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"🏁 {primary} is slow — hedging with {backup}")
+                tracing.annotate(hedged=True)
+                pending.add(submit(backup))
+                continue
+            for future in done:
+                try:
+                    reply, parsed = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if parsed:
+                    return reply, futures[future], True, None
+                malformed = (reply, futures[future])
+            if not pending and hedging:
+                print(f"⚠️ {primary} gave no usable reply — trying {backup}")
+                pending.add(submit(backup))
+        if malformed:
+            return malformed[0], malformed[1], False, None
+        return None, None, False, errors[-1]
+
+    def complete(self, role, system_prompt, user_prompt, timeout, use_cache=True, validate=None):
+        """
+        Sends the prompt to the best model for `role`, failing over down the ranking
+        on errors and on replies `validate(reply)` rejects.
+        Returns (reply, model). When every model replied but none validly, the last
+        reply is returned so the caller's own salvage logic can run; when every
+        model errored, the last error is raised.
+        """
+        with tracing.span("route", role=role) as record:
+            reply, model = self._complete(role, system_prompt, user_prompt, timeout, use_cache, validate)
+            if record is not None:
+                record["attrs"]["model"] = model
+            return reply, model
+
+    def _complete(self, role, system_prompt, user_prompt, timeout, use_cache, validate):
+        ranked = self.ranked(role)
+        args = (system_prompt, user_prompt, timeout, use_cache, validate)
+        last_error, last_reply = None, None
+
+        index = 0
+        while index < len(ranked):
+            model = ranked[index]
+            if self.hedge_after and index + 1 < len(ranked):
+                reply, used, parsed, error = self._hedged(model, ranked[index + 1], args)
+                index += 2  # unless it succeeded, both models were tried
+                if error is not None:
+                    last_error = error
+                    continue
+                if parsed:
+                    return reply, used
+                last_reply = (reply, used)
+                continue
+
+            index += 1
+            try:
+                reply, parsed = self._attempt(model, *args)
+            except Exception as e:
+                print(f"⚠️ {model} failed ({e.__class__.__name__}) — trying the next model")
+                last_error = e
+                continue
+            if parsed:
+                return reply, model
+            print(f"⚠️ {model} returned a malformed reply — trying the next model")
+            last_reply = (reply, model)
+
+        if last_reply is not None:
+            return last_reply
+        raise last_error
+
+    # 🔹 Async calls (same ranking, stats and failover as `complete`)
+    async def _aattempt(self, model, system_prompt, user_prompt, timeout, use_cache, validate):
+        started = time.perf_counter()
+        try:
+            reply = await achat_completion(
+                system_prompt, user_prompt, timeout=timeout, model=model, use_cache=use_cache, failover=True
+            )
+        except Exception:
+            self.record(model, time.perf_counter() - started, ok=False)
+            raise
+        parsed = validate(reply) if validate else True
+        self.record(model, time.perf_counter() - started, ok=True, parsed=parsed)
+        if not parsed:
+            forget_completion(system_prompt, user_prompt, model=model)
+        return reply, parsed
+
+    async def _ahedged(self, primary, backup, args):
+        """`_hedged` on the event loop; the losing task is left to finish on its own."""
+        tasks = {}
+
+        def start(model):
+            task = asyncio.ensure_future(self._aattempt(model, *args))
+            tasks[task] = model
+            return task
+
+        pending = {start(primary)}
+        deadline = time.monotonic() + self.hedge_after
+        errors, malformed = [], None
+        while pending:
+            hedging = len(tasks) == 1
+            timeout = max(0.0, deadline - time.monotonic()) if hedging else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print(f"🏁 {primary} is slow — hedging with {backup}")
+                tracing.annotate(hedged=True)
+                pending.add(start(backup))
+                continue
+            for task in done:
+                try:
+                    reply, parsed = task.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if parsed:
+                    return reply, tasks[task], True, None
+                malformed = (reply, tasks[task])
+            if not pending and hedging:
+                print(f"⚠️ {primary} gave no usable reply — trying {backup}")
+                pending.add(start(backup))
+        if malformed:
+            return malformed[0], malformed[1], False, None
+        return None, None, False, errors[-1]
+
+    async def acomplete(self, role, system_prompt, user_prompt, timeout, use_cache=True, validate=None):
+        """`complete` for coroutines. Returns (reply, model)."""
+        with tracing.span("route", role=role) as record:
+            ranked = self.ranked(role)
+            args = (system_prompt, user_prompt, timeout, use_cache, validate)
+            last_error, last_reply = None, None
+
+            index = 0
+            while index < len(ranked):
+                model = ranked[index]
+                if self.hedge_after and index + 1 < len(ranked):
+                    reply, used, parsed, error = await self._ahedged(model, ranked[index + 1], args)
+                    index += 2  # unless it succeeded, both models were tried
+                    if error is not None:
+                        last_error = error
+                        continue
+                    last_reply = (reply, used)
+                    if parsed:
+                        break
+                    continue
+
+                index += 1
+                try:
+                    reply, parsed = await self._aattempt(model, *args)
+                except Exception as e:
+                    print(f"⚠️ {model} failed ({e.__class__.__name__}) — trying the next model")
+                    last_error = e
+                    continue
+                last_reply = (reply, model)
+                if parsed:
+                    break
+                print(f"⚠️ {model} returned a malformed reply — trying the next model")
+
+            if last_reply is None:
+                raise last_error
+            if record is not None:
+                record["attrs"]["model"] = last_reply[1]
+            return last_reply
+
+    def snapshot(self):
+        """Per-role ranking and per-model stats (for status endpoints)."""
+        return {
+            role: {
+                "ranking": self.ranked(role),
+                "models": {m: self._stats_for(m).summary() for m in self.models(role)},
+            }
+            for role in self.roles
+        }
+
+
+model_router = ModelRouter({
+    "ceo": Config.CEO_MODELS,
+    "operations": Config.OPERATIONS_MODELS,
+})
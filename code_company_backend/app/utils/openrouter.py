@@ -0,0 +1,185 @@
+# app/utils/openrouter.py
+"""
+🧠 OpenRouter chat completions — shared by the CEO and Operations Manager.
+Headers are built once; requests go through the pooled client in http_client
+(or async_http for `achat_completion`), behind the on-disk response cache in llm_cache.
+"""
+import asyncio
+import json
+
+from config import Config
+from app.utils import llm_cache, tracing
+from app.utils.http_client import post_json
+from app.utils.metrics import record_cache, record_usage
+
+_headers = None
+
+
+def _get_headers():
+    global _headers
+    if _headers is None:
+        _headers = {
+            "Authorization": f"Bearer {Config.OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://127.0.0.1:5000",
+            "X-Title": "Code Company (Beta)"
+        }
+    return _headers
+
+
+def build_payload(system_prompt, user_prompt, model=None, stream=False):
+    """Chat completion payload with one system and one user message."""
+    payload = {
+        "model": model or Config.OPENROUTER_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    }
+    if stream:
+        payload["stream"] = True
+        payload["usage"] = {"include": True}  # token counts arrive in the last chunk
+    return payload
+
+
+def chat_completion(system_prompt, user_prompt, timeout, model=None, use_cache=True, failover=False):
+    """
+    Sends one chat completion and returns the reply text.
+    Identical (model, system, user) requests are answered from the LLM cache
+    unless `use_cache` is False. With `failover` (the model router has other
+    models to try) only 429s are retried — a timeout or error raises right away.
+    """
+    model = model or Config.OPENROUTER_MODEL
+    with tracing.span("llm", model=model, prompt_chars=len(system_prompt) + len(user_prompt)) as record:
+        key = llm_cache.cache_key(model, system_prompt, user_prompt)
+        if use_cache:
+            cached = llm_cache.get(key)
+            record_cache("llm", cached is not None)
+            if cached is not None:
+                print("♻️ Using cached LLM completion")
+                _trace_reply(record, cached, cache_hit=True)
+                return cached
+
+        response = post_json(
+            Config.OPENROUTER_API_URL,
+            build_payload(system_prompt, user_prompt, model=model),
+            headers=_get_headers(),
+            timeout=timeout,
+            circuit=model,
+            retry_failures=not failover
+        )
+        response.raise_for_status()
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        record_usage(model, data.get("usage"))
+        _trace_reply(record, content, usage=data.get("usage"))
+        llm_cache.put(key, model, content)
+        return content
+
+
+async def achat_completion(system_prompt, user_prompt, timeout, model=None, use_cache=True, failover=False):
+    """`chat_completion` for the async pipeline: same cache, metrics and trace span."""
+    from app.utils.async_http import apost_json
+
+    model = model or Config.OPENROUTER_MODEL
+    with tracing.span("llm", model=model, prompt_chars=len(system_prompt) + len(user_prompt)) as record:
+        key = llm_cache.cache_key(model, system_prompt, user_prompt)
+        if use_cache:
+            cached = llm_cache.get(key)
+            record_cache("llm", cached is not None)
+            if cached is not None:
+                print("♻️ Using cached LLM completion")
+                _trace_reply(record, cached, cache_hit=True)
+                return cached
+
+        response = await apost_json(
+            Config.OPENROUTER_API_URL,
+            build_payload(system_prompt, user_prompt, model=model),
+            headers=_get_headers(),
+            timeout=timeout,
+            circuit=model,
+            retry_failures=not failover
+        )
+        response.raise_for_status()
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        record_usage(model, data.get("usage"))
+        _trace_reply(record, content, usage=data.get("usage"))
+        await asyncio.to_thread(llm_cache.put, key, model, content)  # may evict old entries
+        return content
+
+
+def _trace_reply(record, content, cache_hit=False, usage=None):
+    """Adds the reply size (and, with TRACE_CAPTURE_BODIES, the reply) to an llm span."""
+    if record is None:
+        return
+    record["attrs"].update(cache_hit=cache_hit, reply_chars=len(content or ""))
+    if usage:
+        record["attrs"]["usage"] = {k: usage.get(k) for k in ("prompt_tokens", "completion_tokens")}
+    if Config.TRACE_CAPTURE_BODIES:
+        record["attrs"]["reply"] = content
+
+
+def forget_completion(system_prompt, user_prompt, model=None):
+    """Evicts a cached completion, e.g. one whose reply could not be parsed."""
+    model = model or Config.OPENROUTER_MODEL
+    llm_cache.forget(llm_cache.cache_key(model, system_prompt, user_prompt))
+
+
+def _iter_stream_deltas(response, model=None):
+    """Yields content deltas from an OpenRouter server-sent events response."""
+    usage = None
+    for raw_line in response.iter_lines(decode_unicode=True):
+        if not raw_line or not raw_line.startswith("data:"):
+            continue  # keep-alive comments like ": OPENROUTER PROCESSING"
+        chunk = raw_line[len("data:"):].strip()
+        if chunk == "[DONE]":
+            break
+        try:
+            event = json.loads(chunk)
+        except json.JSONDecodeError:
+            continue
+        usage = event.get("usage") or usage
+        if event.get("error"):
+            raise RuntimeError(event["error"].get("message", "OpenRouter stream error"))
+        choices = event.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
+    record_usage(model or Config.OPENROUTER_MODEL, usage)
+
+
+def stream_chat_completion(system_prompt, user_prompt, timeout, model=None, use_cache=True):
+    """
+    Streams one chat completion, yielding reply text deltas as they arrive.
+    A cached completion is yielded as a single delta; a fully streamed reply is cached.
+    """
+    model = model or Config.OPENROUTER_MODEL
+    with tracing.span("llm", model=model, stream=True,
+                      prompt_chars=len(system_prompt) + len(user_prompt)) as record:
+        key = llm_cache.cache_key(model, system_prompt, user_prompt)
+        if use_cache:
+            cached = llm_cache.get(key)
+            record_cache("llm", cached is not None)
+            if cached is not None:
+                print("♻️ Using cached LLM completion")
+                _trace_reply(record, cached, cache_hit=True)
+                yield cached
+                return
+
+        response = post_json(
+            Config.OPENROUTER_API_URL,
+            build_payload(system_prompt, user_prompt, model=model, stream=True),
+            headers=_get_headers(),
+            timeout=timeout,
+            stream=True,
+            circuit=model
+        )
+        parts = []
+        with response:
+            response.raise_for_status()
+            for delta in _iter_stream_deltas(response, model):
+                parts.append(delta)
+                yield delta
+        _trace_reply(record, "".join(parts))
+        llm_cache.put(key, model, "".join(parts))
@@ -0,0 +1,260 @@
+# app/utils/project_search.py
+"""
+🔎 Full-text search over the Code Vault.
+An SQLite FTS5 inverted index lives next to the projects in the project store
+database: one row per project (rowid = project id) with its title, summary,
+source and the identifiers used in its code. Queries are ranked with BM25
+(title hits weigh most), the last term also matches as a prefix (search as
+you type), and status / date filters are applied on the indexed project
+columns — nothing scans the stored projects or their code. A query matching
+more than PROJECT_SEARCH_RANK_WINDOW projects is ranked among its newest
+matches only (filters included), so broad terms don't score the whole vault.
+The choice is made once per query, so every page of it comes from the same
+ordering, and results end at the window.
+
+New projects are indexed when `append_project` stores them. Projects stored
+before the index existed (or bulk-imported with append_many) are backfilled
+on first use; `python -m app.utils.project_search reindex` does it up front.
+"""
+import json
+import keyword
+import re
+import sys
+import threading
+
+from config import Config
+from app.utils import project_store
+
+COLUMN_WEIGHTS = (10.0, 4.0, 2.0, 1.0)  # title, summary, source, identifiers
+MAX_TERMS = 8
+MAX_IDENTIFIERS = 2000
+BACKFILL_CHUNK = 5000
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS project_fts USING fts5(
+    title, summary, source, identifiers,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_TERM = re.compile(r"[^\W_]+")
+_SKIP_IDENTIFIERS = set(keyword.kwlist) | {"self", "cls", "None", "True", "False"}
+
+_ready = False
+_ready_lock = threading.Lock()
+
+
+# 🔹 Documents
+def code_identifiers(code):
+    """Distinct identifiers of a code blob in first-seen order (keywords dropped)."""
+    seen = {}
+    for name in _IDENTIFIER.findall(code or ""):
+        if name not in _SKIP_IDENTIFIERS and name not in seen:
+            seen[name] = None
+            if len(seen) >= MAX_IDENTIFIERS:
+                break
+    return " ".join(seen)
+
+
+def _document(project_id, title, summary, source, code):
+    return (project_id, title or "", summary or "", source or "", code_identifiers(code))
+
+
+def _insert(conn, documents):
+    conn.executemany(
+        "INSERT INTO project_fts (rowid, title, summary, source, identifiers) VALUES (?, ?, ?, ?, ?)",
+        documents
+    )
+
+
+def _bump_revision(conn):
+    """Search results change when the index does, so responses carry this in their ETag."""
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('search_revision', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
+
+# 🔹 Index maintenance
+def _ensure_ready():
+    """Creates the index and catches it up with the store (backfill + dropped projects)."""
+    global _ready
+    if _ready:
+        return
+    with _ready_lock:
+        if _ready:
+            return
+        conn = project_store.connection()
+        conn.executescript(_SCHEMA)
+        _catch_up(conn)
+        _ready = True
+
+
+def _catch_up(conn):
+    stored = conn.execute("SELECT COUNT(*), MAX(id) FROM projects").fetchone()
+    indexed = conn.execute("SELECT COUNT(*), MAX(rowid) FROM project_fts").fetchone()
+    if tuple(stored) == tuple(indexed):
+        return
+
+    added, last_id = 0, None
+    while True:
+        sql = "SELECT id, title, source, data, details_markdown FROM projects"
+        params = [BACKFILL_CHUNK]
+        if last_id is not None:
+            sql += " WHERE id > ?"
+            params.insert(0, last_id)
+        rows = conn.execute(sql + " ORDER BY id LIMIT ?", params).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        present = {
+            r[0] for r in conn.execute(
+                "SELECT rowid FROM project_fts WHERE rowid BETWEEN ? AND ?", (rows[0]["id"], last_id)
+            )
+        }
+        documents = [
+            _document(r["id"], r["title"], json.loads(r["data"]).get("summary"), r["source"], r["details_markdown"])
+            for r in rows if r["id"] not in present
+        ]
+        if documents:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                _insert(conn, documents)
+                _bump_revision(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            added += len(documents)
+
+    # Projects removed by compaction leave orphaned index rows behind
+    removed = conn.execute(
+        "DELETE FROM project_fts WHERE rowid NOT IN (SELECT id FROM projects)"
+    ).rowcount
+    if removed:
+        _bump_revision(conn)
+    if added or removed:
+        print(f"🔎 Search index: backfilled {added}, dropped {removed} project(s)")
+
+
+def index_project(project):
+    """Adds (or refreshes) one freshly stored project in the index."""
+    _ensure_ready()
+    conn = project_store.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM project_fts WHERE rowid = ?", (project.get("id"),))
+        _insert(conn, [_document(
+            project.get("id"), project.get("title"), project.get("summary"),
+            project.get("source"), project.get(project_store.CODE_FIELD)
+        )])
+        _bump_revision(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def reindex():
+    """Rebuilds the index from the project store."""
+    global _ready
+    with _ready_lock:
+        conn = project_store.connection()
+        conn.executescript("DROP TABLE IF EXISTS project_fts;" + _SCHEMA)
+        _catch_up(conn)
+        conn.execute("INSERT INTO project_fts (project_fts) VALUES ('optimize')")
+        _ready = True
+    return {"status": "success", "indexed": project_store.count()}
+
+
+def revision():
+    _ensure_ready()
+    row = project_store.connection().execute(
+        "SELECT value FROM meta WHERE key = 'search_revision'"
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+# 🔹 Queries
+def build_match(query):
+    """
+    FTS5 MATCH expression for a free-text query, or None when it has no terms.
+    Every term must match; the last one may be an unfinished word (prefix match).
+    Terms are quoted, so FTS5 operators in the query are searched as plain words.
+    """
+    terms = [f'"{t}"' for t in _TERM.findall((query or "").lower())[:MAX_TERMS]]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " AND ".join(terms)
+
+
+def _window_floor(conn, match):
+    """Lowest project id among the newest RANK_WINDOW matches (0 when no more than that match)."""
+    window = Config.PROJECT_SEARCH_RANK_WINDOW
+    if window <= 0:
+        return 0
+    row = conn.execute(
+        "SELECT rowid FROM project_fts WHERE project_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+        (match, window - 1)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def search(query, statuses=None, since=None, until=None, limit=20, offset=0):
+    """
+    Ranked projects (without code) matching `query`, best first. Each result
+    carries its BM25 `score` (higher is better) and a highlighted `snippet`.
+    `statuses` keeps only those statuses; `since` / `until` bound executed_at
+    (ISO dates or timestamps, inclusive).
+    Pages are stable: a query is ranked either over all its matches or, when
+    more than RANK_WINDOW match, over its newest RANK_WINDOW matches, so
+    offsets past the window return nothing.
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    _ensure_ready()
+    conn = project_store.connection()
+
+    sql = (
+        f"SELECT p.data AS data, bm25(project_fts, {', '.join(map(str, COLUMN_WEIGHTS))}) AS score, "
+        "snippet(project_fts, -1, '[', ']', '…', 12) AS snippet "
+        "FROM project_fts JOIN projects p ON p.id = project_fts.rowid "
+        "WHERE project_fts MATCH ?"
+    )
+    params = [match]
+    if statuses:
+        sql += f" AND p.status IN ({', '.join('?' for _ in statuses)})"
+        params += list(statuses)
+    if since:
+        sql += " AND p.executed_at >= ?"
+        params.append(since)
+    if until:
+        sql += " AND p.executed_at <= ?"
+        params.append(until + "T23:59:59.999999Z" if len(until) == 10 else until)
+    floor = _window_floor(conn, match)
+    if floor:
+        sql += " AND project_fts.rowid >= ?"
+        params.append(floor)
+    sql += " ORDER BY score, p.id DESC LIMIT ? OFFSET ?"
+    rows = conn.execute(sql, params + [limit, offset]).fetchall()
+
+    results = []
+    for row in rows:
+        project = json.loads(row["data"])
+        project["score"] = round(-row["score"], 4)
+        project["snippet"] = row["snippet"]
+        results.append(project)
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "reindex":
+        print(reindex())
+    elif len(sys.argv) >= 3 and sys.argv[1] == "search":
+        for project in search(" ".join(sys.argv[2:]), limit=Config.PROJECTS_PAGE_MAX):
+            print(f"{project['score']:>8}  {project.get('id')}  {project.get('title')}  — {project['snippet']}")
+    else:
+        print("usage: python -m app.utils.project_search reindex | search <query>")
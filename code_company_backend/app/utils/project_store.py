@@ -0,0 +1,256 @@
+# app/utils/project_store.py
+"""
+🗄️ Project store — SQLite (WAL mode) storage for generated projects.
+Appends are a single indexed INSERT, lookups go by id and listings are
+newest-first range scans on the primary key. The code blob lives in its own
+column so listings that don't need it never read it.
+
+On first use the legacy projects.json list (PROJECTS_JSON_FILE) is imported once.
+Run `python -m app.utils.project_store compact [keep]` to apply retention and reclaim space.
+"""
+import json
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+from config import Config
+
+CODE_FIELD = "details_markdown"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    status TEXT,
+    executed_at TEXT,
+    source TEXT,
+    data TEXT NOT NULL,
+    details_markdown TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    """Per-thread connection; the schema and migration run once per process."""
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    path = Path(Config.PROJECTS_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _local.conn = conn
+
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.executescript(_SCHEMA)
+                _migrate_legacy_json(conn)
+                _initialized = True
+    return conn
+
+
+def connection():
+    """This thread's connection to the store (for indexes kept in the same database)."""
+    return _connect()
+
+
+def _split(project):
+    """Splits a project dict into indexed columns, metadata JSON and the code blob."""
+    data = {k: v for k, v in project.items() if k != CODE_FIELD}
+    return (
+        project.get("id"),
+        project.get("title"),
+        project.get("status"),
+        project.get("executed_at"),
+        project.get("source"),
+        json.dumps(data, ensure_ascii=False),
+        project.get(CODE_FIELD),
+    )
+
+
+def _row_to_project(row, with_code=True):
+    project = json.loads(row["data"])
+    if with_code:
+        project[CODE_FIELD] = row["details_markdown"] or ""
+    return project
+
+
+def _migrate_legacy_json(conn):
+    """Imports projects.json into the store once, keyed by a meta flag."""
+    legacy_file = Path(Config.PROJECTS_JSON_FILE)
+    done = conn.execute("SELECT value FROM meta WHERE key = 'legacy_json_migrated'").fetchone()
+    if done or not legacy_file.exists():
+        return
+    try:
+        projects = json.loads(legacy_file.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"⚠️ Could not read legacy projects file: {e}")
+        return
+
+    rows = [_split(p) for p in projects if isinstance(p, dict) and p.get("id") is not None]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO projects (id, title, status, executed_at, source, data, details_markdown) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_json_migrated', ?)",
+            (str(len(rows)),)
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"📦 Migrated {len(rows)} project(s) from {legacy_file} into {Config.PROJECTS_DB}")
+
+
+def _bump_revision(conn):
+    """Every write bumps a store-wide revision (used for HTTP ETags)."""
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('revision', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
+
+def append(project):
+    """
+    Stores a new project. If its id is already taken (e.g. two processes in the
+    same second) the next free id is used and written back into `project`.
+    """
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        taken = conn.execute(
+            "SELECT 1 FROM projects WHERE id = ?", (project.get("id"),)
+        ).fetchone()
+        if taken or project.get("id") is None:
+            project["id"] = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM projects").fetchone()[0]
+        conn.execute(
+            "INSERT INTO projects (id, title, status, executed_at, source, data, details_markdown) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            _split(project)
+        )
+        _bump_revision(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return project
+
+
+def append_many(projects):
+    """
+    Bulk import in one transaction (imports, benchmark seeding). Projects must
+    carry unique ids; rows whose id already exists are skipped. Returns the number inserted.
+    """
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO projects (id, title, status, executed_at, source, data, details_markdown) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (_split(p) for p in projects)
+        )
+        inserted = conn.total_changes - before
+        _bump_revision(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return inserted
+
+
+def revision():
+    """Store-wide revision number; changes whenever any project is written or removed."""
+    row = _connect().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def exists(project_id):
+    """Primary-key probe that reads no project data (for ETag checks)."""
+    row = _connect().execute("SELECT 1 FROM projects WHERE id = ?", (project_id,)).fetchone()
+    return row is not None
+
+
+def get_code(project_id):
+    """Returns only the code blob of one project, or None when it doesn't exist."""
+    row = _connect().execute(
+        "SELECT details_markdown FROM projects WHERE id = ?", (project_id,)
+    ).fetchone()
+    return (row[0] or "") if row else None
+
+
+def get(project_id, with_code=True):
+    """Returns one project by id, or None."""
+    row = _connect().execute(
+        "SELECT data, details_markdown FROM projects WHERE id = ?", (project_id,)
+    ).fetchone()
+    return _row_to_project(row, with_code) if row else None
+
+
+def list_recent(limit=None, before_id=None, with_code=True):
+    """Newest-first range scan; `before_id` continues after a previous page."""
+    columns = "data, details_markdown" if with_code else "data"
+    sql = f"SELECT {columns} FROM projects"
+    params = []
+    if before_id is not None:
+        sql += " WHERE id < ?"
+        params.append(before_id)
+    sql += " ORDER BY id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    rows = _connect().execute(sql, params).fetchall()
+    return [_row_to_project(row, with_code) for row in rows]
+
+
+def count():
+    return _connect().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+
+def compact(keep_latest=None):
+    """
+    Retention + compaction: keeps only the newest `keep_latest` projects
+    (Config.PROJECTS_RETENTION when omitted, 0 = keep everything),
+    then checkpoints the WAL and vacuums the database file.
+    """
+    keep_latest = Config.PROJECTS_RETENTION if keep_latest is None else keep_latest
+    conn = _connect()
+    removed = 0
+    if keep_latest > 0:
+        cursor = conn.execute(
+            "DELETE FROM projects WHERE id NOT IN "
+            "(SELECT id FROM projects ORDER BY id DESC LIMIT ?)",
+            (keep_latest,)
+        )
+        removed = cursor.rowcount
+        if removed:
+            _bump_revision(conn)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    print(f"🧹 Project store compacted: removed {removed}, kept {count()}")
+    return {"status": "success", "removed": removed, "remaining": count()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "compact":
+        compact(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    else:
+        print("usage: python -m app.utils.project_store compact [keep_latest]")
@@ -0,0 +1,300 @@
+# app/utils/rate_limit.py
+"""
+🚦 Per-provider rate limiting and circuit breaking for outbound calls.
+Each provider (openrouter, serper, ...) has:
+  • a token bucket shared by every thread — requests wait for a token instead of
+    hammering the API; Retry-After and X-RateLimit-* headers pause the whole bucket
+  • circuit breakers — after CIRCUIT_FAILURE_THRESHOLD consecutive failures the
+    circuit is failed fast for CIRCUIT_RESET_TIMEOUT seconds, then one half-open
+    probe decides whether it has recovered. Callers may name a circuit (the LLM
+    calls use the model), so one dead model doesn't cut off the other models
+    behind the same host; the token bucket stays shared per host
+Both raise ProviderUnavailable, which callers treat as "try again later"
+rather than as a real answer. The async client (async_http) shares the same
+buckets and breakers, waiting with asyncio.sleep instead of blocking a thread.
+"""
+import asyncio
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from config import Config
+
+
+class ProviderUnavailable(Exception):
+    """A provider is rate limited or down; the call was not (or could not be) made."""
+
+    def __init__(self, provider, message, retry_after=None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, float(rate_per_minute) / 6)  # ~10s burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_take(self):
+        """Takes a token if one is free. Returns (now, 0) on success, else (now, seconds to wait)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return now, 0
+            return now, max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.rate else 1)
+
+    def acquire(self, max_wait):
+        """
+        Takes one token, sleeping until one is available.
+        Returns 0 on success, or the seconds still needed when that exceeds `max_wait`.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            now, wait = self._try_take()
+            if not wait:
+                return 0
+            if now + wait > deadline:
+                return wait
+            time.sleep(min(wait, 1.0))
+
+    async def aacquire(self, max_wait):
+        """`acquire` for coroutines: waits on the event loop instead of blocking the thread."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            now, wait = self._try_take()
+            if not wait:
+                return 0
+            if now + wait > deadline:
+                return wait
+            await asyncio.sleep(min(wait, 1.0))
+
+    def pause(self, seconds):
+        """Blocks the bucket for `seconds` (server asked us to back off)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+    def limit_remaining(self, remaining):
+        """Never hold more tokens than the server says are left in its window."""
+        with self._lock:
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class CircuitBreaker:
+    """closed → open after N consecutive failures → half-open probe → closed / open."""
+
+    def __init__(self, failure_threshold, reset_timeout, name="provider"):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when a request may go out; in half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release_probe(self):
+        """Gives back a half-open probe slot that was not used."""
+        with self._lock:
+            self._probing = False
+
+    def retry_in(self):
+        with self._lock:
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"✅ Circuit closed — {self.name} recovered")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"🔌 Circuit opened for {self.name} after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class Provider:
+    """Bucket for one upstream API, plus a breaker per circuit (None = the whole provider)."""
+
+    def __init__(self, name, rate_per_minute):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute)
+        self.breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, circuit=None):
+        breaker = self.breakers.get(circuit)
+        if breaker is None:
+            with self._breakers_lock:
+                breaker = self.breakers.get(circuit)
+                if breaker is None:
+                    breaker = self.breakers[circuit] = CircuitBreaker(
+                        Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_TIMEOUT,
+                        name=f"{self.name}/{circuit}" if circuit else self.name
+                    )
+        return breaker
+
+    def _check_circuit(self, circuit):
+        breaker = self.breaker(circuit)
+        if not breaker.allow():
+            raise ProviderUnavailable(breaker.name, "circuit open, failing fast", breaker.retry_in())
+
+    def _check_wait(self, wait, circuit):
+        if wait:
+            self.breaker(circuit).release_probe()
+            raise ProviderUnavailable(self.name, f"rate limited for another {wait:.0f}s", wait)
+
+    def before_request(self, circuit=None):
+        """Waits for capacity; raises ProviderUnavailable instead of waiting too long."""
+        self._check_circuit(circuit)
+        self._check_wait(self.bucket.acquire(Config.RATE_LIMIT_MAX_WAIT), circuit)
+
+    async def abefore_request(self, circuit=None):
+        """`before_request` for the async client."""
+        self._check_circuit(circuit)
+        self._check_wait(await self.bucket.aacquire(Config.RATE_LIMIT_MAX_WAIT), circuit)
+
+    def after_response(self, response, circuit=None):
+        """Feeds rate-limit headers into the bucket and the outcome into the circuit's breaker."""
+        remaining = _header_number(response, "X-RateLimit-Remaining")
+        reset = _reset_seconds(response)
+        if remaining is not None:
+            self.bucket.limit_remaining(remaining)
+            if remaining <= 0 and reset:
+                self.bucket.pause(reset)
+
+        if response.status_code == 429:
+            retry_after = _header_number(response, "Retry-After") or reset or Config.HTTP_BACKOFF_MAX
+            print(f"🚦 {self.name}: 429 — pausing requests for {retry_after:.0f}s")
+            self.bucket.pause(retry_after)
+            self.breaker(circuit).record_success()  # rate limited, but reachable
+        elif response.status_code >= 500:
+            self.breaker(circuit).record_failure()
+        else:
+            self.breaker(circuit).record_success()
+
+    def after_error(self, circuit=None):
+        self.breaker(circuit).record_failure()
+
+    def snapshot(self):
+        breaker = self.breaker()
+        return {
+            "circuit": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "circuits": {
+                name: {"circuit": b.state, "consecutive_failures": b.failures}
+                for name, b in list(self.breakers.items()) if name is not None
+            },
+            "tokens": round(self.bucket.tokens, 2),
+            "paused_for": round(max(0.0, self.bucket.blocked_until - time.monotonic()), 1),
+        }
+
+
+def _header_number(response, name):
+    value = response.headers.get(name)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _reset_seconds(response):
+    """X-RateLimit-Reset as seconds from now (accepts epoch ms, epoch s or a delta)."""
+    value = _header_number(response, "X-RateLimit-Reset")
+    if value is None:
+        return None
+    now = time.time()
+    if value > 1e12:
+        return max(0.0, value / 1000 - now)
+    if value > 1e9:
+        return max(0.0, value - now)
+    return value
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def provider_name(url):
+    host = urlsplit(url).netloc.lower()
+    if "openrouter" in host:
+        return "openrouter"
+    if "serper" in host:
+        return "serper"
+    return host
+
+
+def get_provider(url):
+    """Returns the shared Provider (token bucket + breakers) for the API behind `url`."""
+    name = provider_name(url)
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                rpm = {
+                    "openrouter": Config.OPENROUTER_RPM,
+                    "serper": Config.SERPER_RPM,
+                }.get(name, Config.DEFAULT_RPM)
+                provider = _providers[name] = Provider(name, rpm)
+    return provider
+
+
+def snapshot():
+    """State of every provider seen so far (for status endpoints)."""
+    return {name: provider.snapshot() for name, provider in list(_providers.items())}
+
+
+def is_temporary_failure(error):
+    """True for errors that mean "provider busy or down" rather than a real answer."""
+    if isinstance(error, (ProviderUnavailable, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    httpx = sys.modules.get("httpx")  # only loaded once the async client is in use
+    if httpx is not None:
+        if isinstance(error, httpx.TransportError):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
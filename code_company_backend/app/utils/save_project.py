@@ -1,31 +1,32 @@
 # app/utils/save_project.py
-import json
-from pathlib import Path
-from datetime import datetime
+from config import Config
+from app.utils import project_search, project_store
+from app.utils.dedupe import index_project
+from app.utils.metrics import timed_phase
 
-PROJECTS_FILE = Path("app/data/projects.json")
-
-def _read_projects():
-    if PROJECTS_FILE.exists():
-        try:
-            return json.loads(PROJECTS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return []
-    return []
-
-def _write_projects(data):
-    PROJECTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    PROJECTS_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
 
+@timed_phase("project_write")
 def append_project(project_obj):
     """
-    Insert new project at start (newest first).
+    Store a new project (listed newest first).
     project_obj should be a dict with at least 'title' and 'status'.
     """
-    data = _read_projects()
-    data.insert(0, project_obj)
-    _write_projects(data)
-    return project_obj
+    project = project_store.append(project_obj)
+    if Config.DEDUPE_ENABLED:
+        try:
+            index_project(project)
+        except Exception as e:
+            print(f"⚠️ Dedupe index update failed: {e}")
+    try:
+        project_search.index_project(project)
+    except Exception as e:
+        print(f"⚠️ Search index update failed: {e}")
+    return project
+
 
 def get_all_projects():
-    return _read_projects()
+    return project_store.list_recent()
+
+
+def get_project(project_id):
+    return project_store.get(project_id)
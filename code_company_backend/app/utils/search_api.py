@@ -1,101 +1,264 @@
-import requests
-from datetime import datetime, timedelta
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
 from config import Config
-from supabase import create_client
+from app.utils import tracing
+from app.utils.cache import AsyncSingleFlight, SingleFlight, TTLCache
+from app.utils.http_client import post_json
+from app.utils.metrics import record_cache, timed_phase
+from app.utils.supabase_client import get_supabase
 
-# Initialize Supabase (safe even if empty)
-supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
-CACHE_TTL = 300  # 5 minutes
+CACHE_TTL = Config.SEARCH_CACHE_TTL
+
+# Tier 1: in-process LRU+TTL in front of the Supabase search_cache table (tier 2).
+# Tier 2 upserts on (query, provider), which needs a unique constraint:
+#   alter table search_cache add constraint search_cache_query_provider_key unique (query, provider);
+_memory_cache = TTLCache(maxsize=Config.SEARCH_CACHE_SIZE, ttl=CACHE_TTL)
+_inflight = SingleFlight()
+_ainflight = AsyncSingleFlight()
+_last_purge = 0.0
+
+
+def _seconds_left(expiry):
+    """Seconds until a Supabase expiry timestamp, or None when it can't be parsed."""
+    try:
+        expires_at = datetime.fromisoformat(str(expiry).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return (expires_at - datetime.now(timezone.utc)).total_seconds()
 
 
 # 🔹 Retrieve cached search results from Supabase
+@timed_phase("supabase_cache_lookup")
 def _get_cached_result(query, provider):
-    """Check Supabase cache before making a new search request."""
+    """
+    Check Supabase cache before making a new search request.
+    Returns (results, seconds_left) for the freshest unexpired row, or (None, None).
+    """
+    supabase = get_supabase()
+    if supabase is None:
+        return None, None
     try:
         now = datetime.utcnow().isoformat()
         response = supabase.table("search_cache") \
             .select("results, expiry") \
             .eq("query", query) \
             .eq("provider", provider) \
+            .gt("expiry", now) \
+            .order("expiry", desc=True) \
+            .limit(1) \
             .execute()
 
         if response.data:
             item = response.data[0]
-            expiry = item.get("expiry")
-            if expiry and expiry > now:
-                return item["results"]
+            return item["results"], _seconds_left(item.get("expiry"))
     except Exception as e:
         print(f"⚠️ Cache fetch error: {e}")
-    return None
+    return None, None
 
 
 # 🔹 Save search results to Supabase cache
 def _set_cached_result(query, provider, results):
-    """Save result to Supabase cache."""
+    """Upsert the result into the Supabase cache (one row per query + provider)."""
+    supabase = get_supabase()
+    if supabase is None:
+        return
     try:
         expiry = (datetime.utcnow() + timedelta(seconds=CACHE_TTL)).isoformat()
-        supabase.table("search_cache").insert({
+        supabase.table("search_cache").upsert({
             "query": query,
             "provider": provider,
             "results": results,
             "expiry": expiry
-        }).execute()
+        }, on_conflict="query,provider").execute()
     except Exception as e:
         print(f"⚠️ Cache save error: {e}")
+    _purge_expired()
+
+
+# 🔹 Drop expired rows from the Supabase cache (at most once per purge interval)
+def _purge_expired():
+    global _last_purge
+    supabase = get_supabase()
+    if supabase is None:
+        return
+    if time.monotonic() - _last_purge < Config.SEARCH_CACHE_PURGE_INTERVAL:
+        return
+    _last_purge = time.monotonic()
+    try:
+        supabase.table("search_cache") \
+            .delete() \
+            .lt("expiry", datetime.utcnow().isoformat()) \
+            .execute()
+    except Exception as e:
+        print(f"⚠️ Cache purge error: {e}")
 
 
 # 🔹 Main Search Function
-def search(query: str, provider: str = None):
-    """Search function with Supabase caching and Serper.dev fallback."""
+def search(query: str, provider: str = None, page: int = 1):
+    """
+    Search function with two cache tiers and Serper.dev fallback:
+    in-process LRU+TTL → Supabase search_cache → live search.
+    Concurrent identical queries share a single lookup.
+    `page` > 1 fetches further result pages (cached separately).
+    """
     provider = provider or Config.SEARCH_MODE
+    key = (query, provider, page)
 
-    # Step 1: Check Supabase cache
-    cached = _get_cached_result(query, provider)
-    if cached:
-        print("✅ Using cached results")
-        return cached
+    with tracing.span("search", provider=provider, page=page):
+        # Step 1: Check the in-process cache
+        cached = _memory_cache.get(key)
+        record_cache("search_memory", cached is not None)
+        if cached is not None:
+            tracing.annotate(cache="memory", results=len(cached))
+            return cached
 
-    results = []
+        results, shared = _inflight.do(key, lambda: _search_uncached(query, provider, page))
+        if shared:
+            print("✅ Joined in-flight search for the same query")
+            tracing.annotate(cache="shared")
+        return results
+
+
+def _search_uncached(query, provider, page=1):
+    """Supabase cache lookup, then a live search on miss. Fills both cache tiers."""
+    cache_query = _cache_query(query, page)
 
-    # Step 2: Perform actual search
+    # Step 2: Check Supabase cache
+    cached = _use_supabase_hit(query, provider, page, *_get_cached_result(cache_query, provider))
+    if cached is not None:
+        return cached
+
+    # Step 3: Perform actual search
     if provider == "mock":
-        results = [{"title": f"Mock result for '{query}'", "snippet": "Demo snippet", "url": "#"}]
+        results = _mock_results(query)
     else:
         try:
-            api_url = Config.SEARCH_API_URL or "https://google.serper.dev/search"
-            api_key = Config.SEARCH_API_KEY or Config.SERPER_API_KEY
+            api_url, payload, headers = _serper_request(query, page)
+            response = post_json(api_url, payload, headers=headers, timeout=Config.SEARCH_TIMEOUT)
+            response.raise_for_status()
+            results = _parse_organic(response.json())
+        except Exception as e:
+            return _error_results(e)
 
-            headers = {
-                "X-API-KEY": api_key,
-                "Content-Type": "application/json"
-            }
-            payload = {"q": query, "gl": "in", "hl": "en", "num": 10}
+    # Step 4: Save to both cache tiers
+    _set_cached_result(cache_query, provider, results)
+    return _remember(query, provider, page, results)
 
-            response = requests.post(api_url, headers=headers, json=payload, timeout=Config.SEARCH_TIMEOUT)
-            response.raise_for_status()
-            data = response.json()
-
-            # Safe parsing
-            for item in data.get("organic", []):
-                title = item.get("title", "Untitled Result")
-                snippet = item.get("snippet", "No description available.")
-                link = item.get("link") or item.get("url") or "#"
-                results.append({
-                    "title": title,
-                    "snippet": snippet,
-                    "url": link
-                })
 
-        except Exception as e:
-            print(f"⚠️ Serper.dev API error: {e}")
-            results = [{"title": "Error fetching results", "snippet": str(e), "url": "#"}]
+def _cache_query(query, page):
+    return query if page == 1 else f"{query} [page {page}]"
+
+
+def _use_supabase_hit(query, provider, page, cached, seconds_left):
+    """Records a Supabase cache lookup; on a hit, fills the memory tier and returns the results."""
+    record_cache("search_supabase", cached is not None)
+    if cached is None:
+        return None
+    print("✅ Using cached results")
+    tracing.annotate(cache="supabase", results=len(cached))
+    if seconds_left is None or seconds_left > 0:
+        _memory_cache.set((query, provider, page), cached, ttl=min(CACHE_TTL, seconds_left or CACHE_TTL))
+    return cached
+
+
+def _mock_results(query):
+    return [{"title": f"Mock result for '{query}'", "snippet": "Demo snippet", "url": "#"}]
+
+
+def _serper_request(query, page):
+    """(url, payload, headers) for one Serper.dev search."""
+    api_url = Config.SEARCH_API_URL or "https://google.serper.dev/search"
+    api_key = Config.SEARCH_API_KEY or Config.SERPER_API_KEY
+
+    headers = {
+        "X-API-KEY": api_key,
+        "Content-Type": "application/json"
+    }
+    payload = {"q": query, "gl": "in", "hl": "en", "num": 10}
+    if page > 1:
+        payload["page"] = page
+    return api_url, payload, headers
 
-    # Step 3: Save to Supabase cache
-    _set_cached_result(query, provider, results)
+
+def _parse_organic(data):
+    """Safe parsing of Serper's organic results."""
+    results = []
+    for item in data.get("organic", []):
+        title = item.get("title", "Untitled Result")
+        snippet = item.get("snippet", "No description available.")
+        link = item.get("link") or item.get("url") or "#"
+        results.append({
+            "title": title,
+            "snippet": snippet,
+            "url": link
+        })
+    return results
+
+
+def _error_results(error):
+    print(f"⚠️ Serper.dev API error: {error}")
+    # Errors are returned but never cached, so the next call retries
+    return [{"title": "Error fetching results", "snippet": str(error), "url": "#"}]
+
+
+def _remember(query, provider, page, results):
+    tracing.annotate(cache="miss", results=len(results))
+    _memory_cache.set((query, provider, page), results)
     return results
 
 
+# 🔹 Async search (async pipeline): Supabase calls run on worker threads, Serper on httpx
+async def asearch(query: str, provider: str = None, page: int = 1):
+    """`search` for coroutines — same cache tiers; concurrent identical queries share one lookup."""
+    provider = provider or Config.SEARCH_MODE
+    key = (query, provider, page)
+
+    with tracing.span("search", provider=provider, page=page):
+        cached = _memory_cache.get(key)
+        record_cache("search_memory", cached is not None)
+        if cached is not None:
+            tracing.annotate(cache="memory", results=len(cached))
+            return cached
+
+        results, shared = await _ainflight.do(key, lambda: _asearch_uncached(query, provider, page))
+        if shared:
+            print("✅ Joined in-flight search for the same query")
+            tracing.annotate(cache="shared")
+        return results
+
+
+async def _asearch_uncached(query, provider, page=1):
+    from app.utils.async_http import apost_json
+
+    cache_query = _cache_query(query, page)
+    lookup = await asyncio.to_thread(_get_cached_result, cache_query, provider)
+    cached = _use_supabase_hit(query, provider, page, *lookup)
+    if cached is not None:
+        return cached
+
+    if provider == "mock":
+        results = _mock_results(query)
+    else:
+        try:
+            api_url, payload, headers = _serper_request(query, page)
+            response = await apost_json(api_url, payload, headers=headers, timeout=Config.SEARCH_TIMEOUT)
+            response.raise_for_status()
+            results = _parse_organic(response.json())
+        except Exception as e:
+            return _error_results(e)
+
+    await asyncio.to_thread(_set_cached_result, cache_query, provider, results)
+    return _remember(query, provider, page, results)
+
+
 # 🔹 Compatibility Wrapper
-def search_project(query: str):
+def search_project(query: str, page: int = 1):
     """Wrapper around `search()` for Technical Manager compatibility."""
-    return search(query)
+    return search(query, page=page)
+
+
+async def asearch_project(query: str, page: int = 1):
+    return await asearch(query, page=page)
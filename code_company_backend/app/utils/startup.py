@@ -0,0 +1,65 @@
+# app/utils/startup.py
+"""
+🚀 Startup timing — how long a process takes from exec to serving.
+Stages are marked as milliseconds since the process started (read from /proc
+on Linux, otherwise since this module was first imported); costs deferred to
+first use (e.g. the Supabase client) are recorded separately as lazy inits.
+Printed once the app is ready and exported on /metrics.
+"""
+import os
+import threading
+import time
+
+_lock = threading.Lock()
+_stages = {}      # stage → ms since process start
+_lazy = {}        # component → ms spent initialising it on first use
+_imported_at = time.time()
+
+
+def _process_started_at():
+    """Wall-clock start of this process (Linux /proc), or the import time of this module."""
+    try:
+        with open(f"/proc/{os.getpid()}/stat", encoding="utf-8") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="utf-8") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return _imported_at
+
+
+PROCESS_STARTED_AT = _process_started_at()
+
+
+def elapsed_ms():
+    return round((time.time() - PROCESS_STARTED_AT) * 1000, 1)
+
+
+def mark(stage):
+    """Records that `stage` was reached now. Returns its offset in ms."""
+    offset = elapsed_ms()
+    with _lock:
+        _stages.setdefault(stage, offset)
+    return offset
+
+
+def record_lazy(component, seconds):
+    """Records the one-time cost of something initialised on first use."""
+    with _lock:
+        _lazy[component] = round(seconds * 1000, 1)
+
+
+def report():
+    with _lock:
+        return {
+            "process_started_at": PROCESS_STARTED_AT,
+            "stages_ms": dict(_stages),
+            "lazy_init_ms": dict(_lazy),
+        }
+
+
+def print_report(name):
+    stages = report()["stages_ms"]
+    ready = stages.get("ready", elapsed_ms())
+    details = ", ".join(f"{stage} at {ms:.0f} ms" for stage, ms in stages.items() if stage != "ready")
+    print(f"🚀 {name} ready {ready:.0f} ms after process start" + (f" ({details})" if details else ""))
@@ -0,0 +1,154 @@
+# app/utils/state_store.py
+"""
+🧠 State store — keeps the memory.json state in memory behind a lock and
+writes it behind to disk with atomic temp-file + rename writes.
+
+State is split into namespaces ("pipeline" for the step routes, "saved" for
+/save payloads, ...) so one kind of write never clobbers another.
+Reads return copies, so callers can mutate them freely.
+
+Several processes share the file (web workers, the scheduler worker): a flush
+re-reads it under a file lock and replaces only the namespaces this process
+changed, and a rewrite by another process is picked up on the next read.
+"""
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from config import Config
+from app.utils.file_lock import locked
+
+FORMAT_VERSION = 1
+LEGACY_PIPELINE_KEYS = ("current_project", "last_action")
+
+
+class StateStore:
+    """Namespaced in-memory state with debounced, crash-safe persistence."""
+
+    def __init__(self, path, flush_delay=0.5):
+        self.path = Path(path)
+        self.flush_delay = flush_delay
+        self._namespaces = None
+        self._dirty_namespaces = set()  # changed here and not yet flushed
+        self._file_stat = None  # (mtime_ns, size) of the file we last read or wrote
+        self._lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._writer = None
+
+    # 🔹 Loading
+    def _stat(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read_file(self):
+        """Namespaces on disk; legacy flat memory.json files are split into namespaces."""
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            raw = {}
+
+        if isinstance(raw, dict) and raw.get("version") == FORMAT_VERSION:
+            return raw.get("namespaces", {})
+        if isinstance(raw, dict):
+            pipeline = {k: raw[k] for k in LEGACY_PIPELINE_KEYS if k in raw}
+            saved = {k: v for k, v in raw.items() if k not in LEGACY_PIPELINE_KEYS}
+            return {"pipeline": pipeline, "saved": saved}
+        return {"saved": {"data": raw}}
+
+    def _load(self):
+        """Reads the file on first use and again after another process rewrote it (unflushed namespaces are kept)."""
+        stat = self._stat()
+        if self._namespaces is not None and stat == self._file_stat:
+            return
+        disk = self._read_file()
+        self._file_stat = stat
+        if self._namespaces is not None:
+            for name in self._dirty_namespaces:
+                disk[name] = self._namespaces.get(name, {})
+        self._namespaces = disk
+
+    # 🔹 Reads and writes
+    def get(self, namespace):
+        """Returns a copy of one namespace (empty dict when unset)."""
+        with self._lock:
+            self._load()
+            return copy.deepcopy(self._namespaces.get(namespace, {}))
+
+    def set(self, namespace, data):
+        """Replaces one namespace and schedules a write-behind flush."""
+        with self._lock:
+            self._load()
+            self._namespaces[namespace] = copy.deepcopy(data)
+            self._dirty_namespaces.add(namespace)
+        self._schedule_flush()
+
+    def update(self, namespace, changes):
+        """Merges `changes` into one namespace atomically."""
+        with self._lock:
+            self._load()
+            current = self._namespaces.setdefault(namespace, {})
+            current.update(copy.deepcopy(changes))
+            self._dirty_namespaces.add(namespace)
+        self._schedule_flush()
+
+    # 🔹 Persistence
+    def _schedule_flush(self):
+        self._dirty.set()
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="state-store-writer", daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self):
+        """Coalesces bursts of writes into one disk write per flush_delay."""
+        while True:
+            self._dirty.wait()
+            if self.flush_delay:
+                threading.Event().wait(self.flush_delay)
+            self.flush()
+
+    def flush(self):
+        """Writes this process's changed namespaces to disk now (merged under the file lock, temp file + atomic rename)."""
+        with self._lock:
+            if self._namespaces is None or not self._dirty.is_set():
+                return
+            self._dirty.clear()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with locked(self.path):
+                self._load()  # merge in what other processes wrote since our last read
+                body = json.dumps(
+                    {"version": FORMAT_VERSION, "namespaces": self._namespaces},
+                    ensure_ascii=False,
+                    separators=(",", ":")
+                )
+                fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".state-", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(body)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, self.path)
+                except OSError as e:
+                    print(f"⚠️ State store write error: {e}")
+                    self._dirty.set()
+                    try:
+                        os.unlink(tmp)
+                    except OSError:
+                        pass
+                    return
+                self._dirty_namespaces.clear()
+                self._file_stat = self._stat()
+
+
+state_store = StateStore(Config.MEMORY_FILE, flush_delay=Config.STATE_FLUSH_DELAY)
+atexit.register(state_store.flush)
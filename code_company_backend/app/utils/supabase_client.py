@@ -0,0 +1,39 @@
+# app/utils/supabase_client.py
+"""
+🗄️ Shared Supabase client.
+One client per process, created on first use: the `supabase` SDK (and its
+httpx / postgrest stack) is imported only then, so processes that never touch
+Supabase don't pay for it at boot. Returns None when SUPABASE_URL / SUPABASE_KEY
+are empty or the client can't be built, and callers skip the Supabase step.
+"""
+import threading
+import time
+
+from config import Config
+from app.utils import startup
+
+_client = None
+_failed = False
+_lock = threading.Lock()
+
+
+def get_supabase():
+    """The process-wide Supabase client, or None when Supabase is not configured."""
+    global _client, _failed
+    if _client is not None or _failed:
+        return _client
+    with _lock:
+        if _client is None and not _failed:
+            if not (Config.SUPABASE_URL and Config.SUPABASE_KEY):
+                print("⚠️ Supabase is not configured (SUPABASE_URL / SUPABASE_KEY) — skipping Supabase calls")
+                _failed = True
+                return None
+            started = time.perf_counter()
+            try:
+                from supabase import create_client
+                _client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+                startup.record_lazy("supabase_client", time.perf_counter() - started)
+            except Exception as e:
+                print(f"⚠️ Could not create the Supabase client: {e}")
+                _failed = True
+    return _client
@@ -1,12 +1,27 @@
-from supabase import create_client
+import base64
+import binascii
+import json
 from config import Config
 from datetime import datetime
+from app.utils.supabase_client import get_supabase
+from app.utils.supabase_writer import BufferedWriter, register_shutdown
 
-# Initialize Supabase client
-supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+# Background writer: batches project_history inserts, spools to disk when Supabase is down
+history_writer = register_shutdown(BufferedWriter(
+    client_factory=get_supabase,
+    table="project_history",
+    batch_size=Config.SUPABASE_BATCH_SIZE,
+    flush_interval=Config.SUPABASE_FLUSH_INTERVAL,
+    spool_path=Config.SUPABASE_SPOOL_FILE,
+    replay_interval=Config.SUPABASE_SPOOL_REPLAY_INTERVAL,
+    metrics_phase="supabase_logging"
+))
 
 def log_project_run(project_title, ceo_decision, ceo_reason, operations_status):
-    """Insert a new company run record into Supabase project_history."""
+    """
+    Queue a new company run record for Supabase project_history.
+    The insert happens on the background writer, so this returns immediately.
+    """
     try:
         data = {
             "project_title": project_title,
@@ -15,21 +30,108 @@ def log_project_run(project_title, ceo_decision, ceo_reason, operations_status):
             "operations_status": operations_status,
             "timestamp": datetime.utcnow().isoformat()
         }
-        response = supabase.table("project_history").insert(data).execute()
-        return {"status": "success", "data": response.data}
+        history_writer.enqueue(data)
+        return {"status": "queued", "data": data}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
-def fetch_project_history():
-    """Fetch all company project runs from Supabase."""
+HISTORY_COLUMNS = ("id", "project_title", "ceo_decision", "ceo_reason", "operations_status", "timestamp")
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor for the row a page ended on."""
+    raw = json.dumps([row.get("timestamp"), row.get("id")])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def parse_timestamp(value):
+    """Returns `value` if it is an ISO-8601 timestamp; raises ValueError otherwise."""
+    try:
+        datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except (TypeError, AttributeError, ValueError):
+        raise ValueError(f"Not an ISO-8601 timestamp: {value!r}") from None
+    return value
+
+
+def decode_cursor(cursor):
+    """
+    Returns (timestamp, id) from a cursor made by encode_cursor; raises ValueError
+    for anything else, since both values end up in a PostgREST filter.
+    """
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if isinstance(row_id, bool) or not isinstance(row_id, int):
+            raise ValueError("row id must be an integer")
+        return parse_timestamp(timestamp), row_id
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor") from None
+
+
+def check_columns(columns):
+    """Raises ValueError for names that are not project_history columns."""
+    unknown = [c for c in columns or () if c not in HISTORY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+
+def _select_columns(columns):
+    """Always keeps timestamp + id so the next cursor can be built."""
+    if not columns:
+        return "*"
+    check_columns(columns)
+    wanted = list(dict.fromkeys(list(columns) + ["timestamp", "id"]))
+    return ",".join(wanted)
+
+
+def fetch_project_history(limit=None, cursor=None, since=None, columns=None):
+    """
+    Fetch one page of company project runs from Supabase.
+    Keyset pagination on (timestamp, id): pass the returned `next_cursor` back as `cursor`.
+    `since` returns only rows newer than that ISO timestamp (delta fetch);
+    `columns` limits the selected columns.
+    """
+    supabase = get_supabase()
+    if supabase is None:
+        return {"status": "error", "message": "Supabase is not configured"}
+    try:
+        query = supabase.table("project_history").select(_select_columns(columns))
+
+        if cursor:
+            ts, row_id = decode_cursor(cursor)
+            query = query.or_(f'timestamp.lt."{ts}",and(timestamp.eq."{ts}",id.lt.{row_id})')
+        if since:
+            query = query.gt("timestamp", parse_timestamp(since))
+
+        query = query.order("timestamp", desc=True).order("id", desc=True)
+        if limit:
+            query = query.limit(limit)
+
+        response = query.execute()
+        rows = response.data or []
+        next_cursor = encode_cursor(rows[-1]) if limit and len(rows) == limit else None
+        return {"status": "success", "data": rows, "next_cursor": next_cursor}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def fetch_project_history_after(after_id=None, limit=None, columns=None):
+    """
+    Rows with an id above `after_id`, in insert (id) order. Ids only grow, so
+    unlike the (timestamp, id) cursor this also returns rows inserted late with
+    an older timestamp (e.g. replayed from the writer spool).
+    """
+    supabase = get_supabase()
+    if supabase is None:
+        return {"status": "error", "message": "Supabase is not configured"}
     try:
-        response = (
-            supabase.table("project_history")
-            .select("*")
-            .order("timestamp", desc=True)
-            .execute()
-        )
-        return {"status": "success", "data": response.data}
+        query = supabase.table("project_history").select(_select_columns(columns))
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        query = query.order("id")
+        if limit:
+            query = query.limit(limit)
+        rows = query.execute().data or []
+        return {"status": "success", "data": rows}
     except Exception as e:
         return {"status": "error", "message": str(e)}
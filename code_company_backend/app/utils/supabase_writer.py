@@ -0,0 +1,191 @@
+# app/utils/supabase_writer.py
+"""
+📮 Buffered background writer for Supabase tables.
+Rows are queued by the request path and inserted in batches by a daemon thread
+once `batch_size` rows are waiting or `flush_interval` seconds have passed.
+If Supabase is unreachable the batch is appended to a local JSONL spool and
+replayed on a later flush; pending rows are drained on shutdown. Spool lines
+that can't be parsed (e.g. cut off by a crash mid-append) are moved to
+`<spool>.bad` instead of blocking the replay. The web process and the
+scheduler worker share the spool, so appends and the replay's read + delete
+hold a cross-process file lock.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from app.utils.file_lock import locked
+from app.utils.metrics import observe_phase
+
+
+class BufferedWriter:
+    """Batches inserts into one Supabase table, spilling to disk on failure."""
+
+    def __init__(self, client_factory, table, batch_size, flush_interval, spool_path,
+                 replay_interval=60, metrics_phase=None):
+        self.client_factory = client_factory
+        self.metrics_phase = metrics_phase  # insert latency shows up under this /metrics phase
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = Path(spool_path)
+        self.replay_interval = replay_interval
+        self._last_replay = 0.0
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def enqueue(self, row):
+        """Queues one row for insertion; never blocks on the network."""
+        self.ensure_started()
+        self._queue.put(row)
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name=f"supabase-writer-{self.table}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+            self._replay_spool()
+
+    def _collect_batch(self):
+        """Waits for the first row, then gathers more until size or time threshold."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, rows):
+        client = self.client_factory()
+        if client is None:
+            raise RuntimeError("Supabase is not configured")
+        started = time.perf_counter()
+        try:
+            client.table(self.table).insert(rows).execute()
+        except Exception:
+            if self.metrics_phase:
+                observe_phase(self.metrics_phase, time.perf_counter() - started, failed=True)
+            raise
+        if self.metrics_phase:
+            observe_phase(self.metrics_phase, time.perf_counter() - started)
+
+    def _write(self, rows):
+        with self._flush_lock:
+            try:
+                self._insert(rows)
+                print(f"🗄️ Supabase: inserted {len(rows)} {self.table} row(s)")
+            except Exception as e:
+                print(f"⚠️ Supabase insert failed, spooling {len(rows)} row(s): {e}")
+                self._spool(rows)
+
+    # 🔹 Local spool
+    def _spool(self, rows):
+        with self._spool_lock, locked(self.spool_path):
+            self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def spooled_count(self):
+        with self._spool_lock:
+            if not self.spool_path.exists():
+                return 0
+            with open(self.spool_path, encoding="utf-8") as f:
+                return sum(1 for line in f if line.strip())
+
+    def _replay_spool(self):
+        """Re-inserts spooled rows (at most once per replay_interval); failures stay spooled."""
+        if time.monotonic() - self._last_replay < self.replay_interval:
+            return
+        self._last_replay = time.monotonic()
+        with self._spool_lock, locked(self.spool_path):
+            if not self.spool_path.exists() or self.spool_path.stat().st_size == 0:
+                return
+            with open(self.spool_path, encoding="utf-8") as f:
+                rows = self._parse_spool(f)
+            self.spool_path.unlink()
+        if not rows:
+            return
+
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            try:
+                with self._flush_lock:
+                    self._insert(chunk)
+            except Exception:
+                self._spool(rows[start:])
+                return
+        print(f"♻️ Supabase: replayed {len(rows)} spooled {self.table} row(s)")
+
+    def _parse_spool(self, lines):
+        """Spooled rows; unreadable lines are quarantined to the .bad file (spool lock held)."""
+        rows, bad = [], []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                bad.append(line if line.endswith("\n") else line + "\n")
+        if bad:
+            bad_path = self.spool_path.with_name(self.spool_path.name + ".bad")
+            with open(bad_path, "a", encoding="utf-8") as f:
+                f.writelines(bad)
+            print(f"⚠️ Supabase: moved {len(bad)} unreadable spool line(s) to {bad_path}")
+        return rows
+
+    def flush(self):
+        """Synchronously writes everything still queued (used on shutdown)."""
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(rows), self.batch_size):
+            self._write(rows[start:start + self.batch_size])
+
+    def close(self):
+        """Stops the background thread and drains pending rows."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+def register_shutdown(writer):
+    """Drains `writer` at interpreter exit; starts it now if a spool is waiting for replay."""
+    atexit.register(writer.close)
+    if writer.spool_path.exists():
+        writer.ensure_started()
+    return writer
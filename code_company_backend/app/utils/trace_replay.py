@@ -0,0 +1,451 @@
+# app/utils/trace_replay.py
+"""
+🔁 Inspect stored run traces and replay them against local stub providers.
+
+    python -m app.utils.trace_replay list [--slowest] [--limit N]
+    python -m app.utils.trace_replay show <trace_id>
+    python -m app.utils.trace_replay replay <trace_id> [--speed 2] [--keep] [--json]
+
+`replay` starts one local HTTP server standing in for OpenRouter, Serper and
+the Supabase REST API. Each outbound call of the recorded run is answered in
+order with the recorded latency and status (429 / 5xx / dropped connection
+included), so retries, rate-limit pauses and slow phases happen again. LLM
+replies come from the trace (TRACE_CAPTURE_BODIES), the LLM cache, or a
+synthetic reply of the recorded size. The run itself executes the real
+pipeline code with every data file in a scratch directory, then the phase
+timings are printed next to the original ones.
+
+Config-dependent modules are imported only after the environment points at
+the stubs, so this module sticks to the standard library at import time.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PHASE_ORDER = ("technical", "ceo_batch", "ceo", "operations", "validation",
+               "supabase_logging", "project_write")
+
+
+# 🔹 Reading traces (no Config import)
+def _trace_dir():
+    return Path(os.getenv("TRACE_DIR", "app/data/traces"))
+
+
+def load_trace(trace_id_or_path):
+    path = Path(trace_id_or_path)
+    if not path.exists():
+        path = _trace_dir() / f"{trace_id_or_path}.json.gz"
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _index():
+    try:
+        with open(_trace_dir() / "index.jsonl", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+
+
+def _batch_members(batch_trace):
+    """Run traces that belong to a company_batch trace."""
+    members = []
+    for entry in _index():
+        if entry.get("batch_id") == batch_trace["id"]:
+            try:
+                members.append(load_trace(entry["id"]))
+            except (OSError, ValueError):
+                print(f"⚠️ Missing trace {entry['id']} of batch {batch_trace['id']}")
+    return members
+
+
+def _duration(span):
+    return (span.get("end") or span["start"]) - span["start"]
+
+
+def phase_totals(traces):
+    """Milliseconds per top-level phase, summed over `traces`."""
+    totals = defaultdict(float)
+    for trace in traces:
+        for span in trace["spans"]:
+            if span["parent"] is None:
+                totals[span["name"]] += _duration(span)
+    return dict(totals)
+
+
+def _timeline(traces):
+    """Every span of `traces` with absolute start times, oldest first."""
+    spans = []
+    for trace in traces:
+        base = trace["started_at"] * 1000
+        by_id = {span["id"]: span for span in trace["spans"]}
+        for span in trace["spans"]:
+            spans.append((base + span["start"], span, by_id, trace))
+    spans.sort(key=lambda item: item[0])
+    return spans
+
+
+# 🔹 Stub providers
+class _Call:
+    """One recorded outbound call the stub will answer."""
+
+    def __init__(self, latency, status=200, error=None, reply=None, size=0, extra_ms=0.0):
+        self.latency = latency          # seconds before the response (headers) is sent
+        self.status = status
+        self.error = error              # exception name → connection is dropped
+        self.reply = reply              # recorded LLM reply, if captured
+        self.size = size                # recorded reply / response size
+        self.extra_ms = extra_ms        # streaming: body time after the headers
+
+
+class StubProviders:
+    """Threaded local HTTP server answering OpenRouter / Serper / Supabase calls from a trace."""
+
+    def __init__(self, traces, speed=1.0, llm_cache_dir=None):
+        self.speed = max(speed, 0.01)
+        self.llm_cache_dir = Path(llm_cache_dir) if llm_cache_dir else None
+        self.queues = {"openrouter": deque(), "serper": deque(),
+                       "supabase_lookup": deque(), "supabase_write": deque()}
+        self.served = defaultdict(int)
+        self.attrs = {}
+        for trace in traces:
+            for key, value in trace.get("attrs", {}).items():
+                self.attrs.setdefault(key, value)
+        self._lock = threading.Lock()
+        self._load(traces)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _load(self, traces):
+        for _, span, by_id, _ in _timeline(traces):
+            attrs = span.get("attrs", {})
+            seconds = _duration(span) / 1000
+            if span["name"] == "http" and attrs.get("provider") in ("openrouter", "serper"):
+                parent = by_id.get(span["parent"]) or {}
+                llm = parent.get("attrs", {}) if parent.get("name") == "llm" else {}
+                extra = max(0.0, _duration(parent) - _duration(span)) if llm.get("stream") else 0.0
+                self.queues[attrs["provider"]].append(_Call(
+                    seconds, status=attrs.get("status", 200), error=attrs.get("error"),
+                    reply=llm.get("reply"), size=llm.get("reply_chars") or attrs.get("response_bytes") or 0,
+                    extra_ms=extra,
+                ))
+            elif span["name"] == "supabase_cache_lookup":
+                self.queues["supabase_lookup"].append(_Call(seconds))
+            elif span["name"] == "supabase_logging":
+                self.queues["supabase_write"].append(_Call(seconds))
+
+    def recorded_counts(self):
+        return {name: len(queue) for name, queue in self.queues.items()}
+
+    def _next(self, name):
+        with self._lock:
+            self.served[name] += 1
+            queue = self.queues[name]
+            return queue.popleft() if queue else _Call(0.0)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Replies
+    def _cached_reply(self, payload):
+        if self.llm_cache_dir is None:
+            return None
+        messages = {m.get("role"): m.get("content") for m in payload.get("messages", [])}
+        raw = json.dumps([payload.get("model"), messages.get("system"), messages.get("user")], ensure_ascii=False)
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        try:
+            entry = json.loads((self.llm_cache_dir / key[:2] / f"{key}.json").read_text(encoding="utf-8"))
+            return entry.get("completion")
+        except (OSError, ValueError):
+            return None
+
+    def _synthetic_reply(self, payload, size):
+        messages = {m.get("role"): m.get("content") or "" for m in payload.get("messages", [])}
+        system, user = messages.get("system", ""), messages.get("user", "")
+        if "CEO" in system:
+            decision = self.attrs.get("ceo_decision")
+            decision = decision if decision in ("approve", "reject") else "approve"
+            ids = re.findall(r'"id":\s*"([^"]+)"', user)
+            if ids:
+                return json.dumps({"decisions": [
+                    {"id": cid, "decision": decision, "reason": "Replayed decision."} for cid in ids
+                ]})
+            return json.dumps({"decision": decision, "reason": "Replayed decision."})
+        code = "def main():\n    print('replayed run')\n\n\nif __name__ == '__main__':\n    main()\n"
+        padding = max(0, size - len(code) - 200)
+        code += "".join(f"# {'x' * 70}\n" for _ in range(padding // 73))
+        return json.dumps({
+            "solution_summary": "Replayed solution.",
+            "detailed_steps": "Replayed steps.",
+            "final_code": code,
+            "conclusion": "Replayed conclusion.",
+        })
+
+    def _search_results(self, size):
+        results = [{
+            "title": self.attrs.get("project_title") or "Python automation project",
+            "snippet": self.attrs.get("problem_summary") or "Replayed search result.",
+            "link": self.attrs.get("source_link") or "https://example.com/replayed",
+        }]
+        while len(results) < 10 and len(json.dumps(results)) < size:
+            n = len(results)
+            results.append({"title": f"Filler result {n}", "snippet": "Unrelated.",
+                            "link": f"https://example.com/filler/{n}"})
+        return {"organic": results}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    return json.loads(raw or b"{}")
+                except ValueError:
+                    return {}
+
+            def _send(self, status, body, content_type="application/json"):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _answer(self, call, body_fn):
+                time.sleep(call.latency / stub.speed)
+                if call.error:
+                    self.close_connection = True  # client sees a dropped connection
+                    return
+                if isinstance(call.status, int) and call.status >= 400:
+                    self._send(call.status, {"error": {"message": f"replayed {call.status}"}})
+                    return
+                body_fn()
+
+            def _openrouter(self, payload):
+                call = stub._next("openrouter")
+                reply = call.reply or stub._cached_reply(payload) or stub._synthetic_reply(payload, call.size)
+
+                def send():
+                    if not payload.get("stream"):
+                        self._send(200, {"choices": [{"message": {"content": reply}}]})
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    self.close_connection = True
+                    chunks = [reply[i:i + 64] for i in range(0, len(reply), 64)] or [""]
+                    pause = call.extra_ms / 1000 / stub.speed / len(chunks)
+                    for chunk in chunks:
+                        event = {"choices": [{"delta": {"content": chunk}}]}
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        time.sleep(pause)
+                    self.wfile.write(b"data: [DONE]\n\n")
+
+                self._answer(call, send)
+
+            def do_POST(self):
+                payload = self._body()
+                if self.path.endswith("/chat/completions"):
+                    self._openrouter(payload)
+                elif self.path.startswith("/search"):
+                    call = stub._next("serper")
+                    self._answer(call, lambda: self._send(200, stub._search_results(call.size)))
+                elif self.path.startswith("/rest/v1/"):
+                    self._answer(stub._next("supabase_write"), lambda: self._send(201, []))
+                else:
+                    self._send(404, {"error": "unknown path"})
+
+            def do_GET(self):
+                if self.path.startswith("/rest/v1/search_cache"):
+                    self._answer(stub._next("supabase_lookup"), lambda: self._send(200, []))
+                elif self.path.startswith("/rest/v1/"):
+                    self._send(200, [])
+                else:
+                    self._send(404, {"error": "unknown path"})
+
+            def do_DELETE(self):
+                self._send(200, [])
+
+            do_PATCH = do_POST
+
+        return Handler
+
+
+# 🔹 Replay
+def _scratch_env(workdir, stub_url, uses_serper):
+    """Points providers at the stubs and every data file at `workdir`."""
+    env = {
+        "OPENROUTER_API_URL": f"{stub_url}/api/v1/chat/completions",
+        "OPENROUTER_API_KEY": "replay",
+        "SEARCH_MODE": "http" if uses_serper else "mock",
+        "SEARCH_API_URL": f"{stub_url}/search",
+        "SEARCH_API_KEY": "replay",
+        "SUPABASE_URL": stub_url,
+        "SUPABASE_KEY": "replay",
+        "MEMORY_FILE": f"{workdir}/memory.json",
+        "DATA_FILE": f"{workdir}/data.json",
+        "PROJECTS_DB": f"{workdir}/projects.db",
+        "PROJECTS_JSON_FILE": f"{workdir}/projects.json",
+        "LLM_CACHE_DIR": f"{workdir}/llm_cache",
+        "SUPABASE_SPOOL_FILE": f"{workdir}/supabase_spool.jsonl",
+        "HISTORY_MIRROR_DB": f"{workdir}/history.db",
+        "SCHEDULER_STATE_FILE": f"{workdir}/scheduler_state.json",
+        "APPROVAL_MODEL_FILE": f"{workdir}/approval_model.json",
+        "TRACE_DIR": f"{workdir}/traces",
+        "TRACE_ENABLED": "true",
+    }
+    approval_model = os.getenv("APPROVAL_MODEL_FILE", "app/data/approval_model.json")
+    if os.path.exists(approval_model):
+        shutil.copy(approval_model, env["APPROVAL_MODEL_FILE"])
+    os.environ.update(env)
+
+
+def replay(trace_id, speed=1.0, keep=False):
+    """Re-runs a stored trace against the stubs. Returns the comparison dict."""
+    original = load_trace(trace_id)
+    traces = [original]
+    if original["kind"] == "company_batch":
+        traces += _batch_members(original)
+
+    llm_cache_dir = os.getenv("LLM_CACHE_DIR", "app/data/llm_cache")
+    stub = StubProviders(traces, speed=speed, llm_cache_dir=llm_cache_dir).start()
+    recorded = stub.recorded_counts()
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    _scratch_env(workdir, stub.base_url, recorded["serper"] > 0)
+    print(f"🔁 Replaying {original['id']} ({original['kind']}) at {speed}x against {stub.base_url}")
+
+    from app import pipeline
+    from app.utils import tracing
+    from app.utils.state_store import state_store
+    from app.utils.supabase_logger import history_writer
+
+    started = time.perf_counter()
+    try:
+        if original["kind"] == "company_batch":
+            pipeline.run_company_batch(original.get("attrs", {}).get("batch_size") or 1, use_cache=False)
+        elif original.get("attrs", {}).get("stream"):
+            for _ in pipeline.run_company_stream(use_cache=False):
+                pass
+        else:
+            pipeline.run_company(use_cache=False)
+    finally:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        # Drain background writers while the stubs and the scratch directory still exist
+        history_writer.close()
+        state_store.flush()
+        stub.stop()
+
+    replayed = [tracing.load(entry["id"]) for entry in tracing.list_traces(limit=1000)]
+    replayed = [t for t in replayed if t]
+    before, after = phase_totals(traces), phase_totals(replayed)
+    phases = [p for p in PHASE_ORDER if p in before or p in after]
+    phases += sorted((set(before) | set(after)) - set(phases))
+    result = {
+        "trace_id": original["id"],
+        "speed": speed,
+        "original_ms": sum(t.get("duration_ms") or 0 for t in traces if t["kind"] == original["kind"]),
+        "replay_ms": elapsed_ms,
+        "phases": {p: {"original_ms": round(before.get(p, 0), 1), "replay_ms": round(after.get(p, 0), 1)}
+                   for p in phases},
+        "calls": {"recorded": recorded, "served": dict(stub.served)},
+        "replay_traces": [t["id"] for t in replayed],
+        "workdir": workdir if keep else None,
+    }
+    if not keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+# 🔹 CLI
+def _print_tree(trace):
+    print(f"{trace['id']}  {trace['kind']}  {trace.get('duration_ms')} ms")
+    for key, value in (trace.get("attrs") or {}).items():
+        print(f"  {key}: {value}")
+    children = defaultdict(list)
+    for span in trace["spans"]:
+        children[span["parent"]].append(span)
+
+    def walk(parent, depth):
+        for span in children.get(parent, []):
+            attrs = " ".join(f"{k}={v}" for k, v in span.get("attrs", {}).items() if k != "reply")
+            print(f"  {'  ' * depth}{span['name']:<22} {span['start']:>10.1f} +{_duration(span):>9.1f} ms  {attrs}")
+            walk(span["id"], depth + 1)
+
+    walk(None, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.utils.trace_replay")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="recent (or slowest) traces")
+    listing.add_argument("--slowest", action="store_true")
+    listing.add_argument("--limit", type=int, default=20)
+    show = commands.add_parser("show", help="span tree of one trace")
+    show.add_argument("trace_id")
+    run = commands.add_parser("replay", help="re-run a trace against local stub providers")
+    run.add_argument("trace_id")
+    run.add_argument("--speed", type=float, default=1.0, help="divide recorded latencies by this")
+    run.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    run.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        entries = _index()
+        entries = sorted(entries, key=lambda e: e.get("duration_ms") or 0, reverse=True) if args.slowest \
+            else list(reversed(entries))
+        for entry in entries[:args.limit]:
+            print(f"{entry['id']}  {entry.get('kind', ''):<14} {entry.get('duration_ms') or 0:>10.1f} ms  "
+                  f"{entry.get('operations_status') or ''}  {entry.get('project_title') or ''}")
+        return 0
+
+    if args.command == "show":
+        _print_tree(load_trace(args.trace_id))
+        return 0
+
+    result = replay(args.trace_id, speed=args.speed, keep=args.keep)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"\n{'phase':<22} {'original ms':>12} {'replay ms':>12}")
+    for phase, timings in result["phases"].items():
+        print(f"{phase:<22} {timings['original_ms']:>12.1f} {timings['replay_ms']:>12.1f}")
+    print(f"{'total':<22} {result['original_ms']:>12.1f} {result['replay_ms']:>12.1f}")
+    print(f"\ncalls recorded {result['calls']['recorded']}, served {result['calls']['served']}")
+    if result["workdir"]:
+        print(f"scratch directory kept at {result['workdir']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
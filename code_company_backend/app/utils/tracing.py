@@ -0,0 +1,229 @@
+# app/utils/tracing.py
+"""
+🧵 Per-run traces — every company run is saved as a tree of timed spans.
+A span covers one phase (technical, ceo, operations, ...) or one call inside it
+(llm completion, search, one HTTP attempt) and carries what explains its time:
+request / response sizes, cache hits, the model used, the attempt number.
+
+The active span travels in a contextvar, so nested calls attach themselves
+without any plumbing; code outside a trace pays one contextvar lookup.
+Traces are written as gzipped JSON to TRACE_DIR (one file per run) plus a
+line in index.jsonl; the newest TRACE_RETENTION traces are kept.
+Inspect and replay them with `python -m app.utils.trace_replay`.
+"""
+import contextvars
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import Config
+from app.utils.file_lock import locked
+
+INDEX_FILE = "index.jsonl"
+PRUNE_EVERY = 20
+
+_current = contextvars.ContextVar("trace_span", default=None)  # (trace, span) or None
+_write_lock = threading.Lock()
+_saves = 0
+
+
+class Trace:
+    """One run: trace-level attributes plus a flat list of spans with parent ids."""
+
+    def __init__(self, kind, **attrs):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.kind = kind
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.duration_ms = None
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def offset_ms(self):
+        return round((time.perf_counter() - self._t0) * 1000, 2)
+
+    def open_span(self, name, parent, attrs):
+        span = {"name": name, "parent": parent["id"] if parent else None,
+                "start": self.offset_ms(), "end": None, "attrs": attrs}
+        with self._lock:
+            span["id"] = len(self.spans) + 1
+            self.spans.append(span)
+        return span
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": len(self.spans),
+            **{k: v for k, v in self.attrs.items() if isinstance(v, (str, int, float, bool, type(None)))},
+        }
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+        return {**self.summary(), "attrs": self.attrs, "spans": spans}
+
+
+def current_trace():
+    current = _current.get()
+    return current[0] if current else None
+
+
+@contextmanager
+def start_trace(kind, **attrs):
+    """Opens a new trace for the block and saves it when the block ends."""
+    if not Config.TRACE_ENABLED:
+        yield None
+        return
+    trace = Trace(kind, **attrs)
+    token = _current.set((trace, None))
+    try:
+        yield trace
+    except BaseException as e:
+        trace.attrs.setdefault("error", f"{e.__class__.__name__}: {e}")
+        raise
+    finally:
+        trace.duration_ms = trace.offset_ms()
+        try:
+            _current.reset(token)
+        except ValueError:  # generator closed from another context
+            _current.set(None)
+        save(trace)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Times the block as a child of the current span; a no-op outside a trace."""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    trace, parent = current
+    record = trace.open_span(name, parent, attrs)
+    token = _current.set((trace, record))
+    try:
+        yield record
+    except BaseException as e:
+        record["attrs"]["error"] = e.__class__.__name__
+        raise
+    finally:
+        record["end"] = trace.offset_ms()
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set((trace, parent))
+
+
+def annotate(**attrs):
+    """Adds attributes to the current span (or the trace itself at the top level)."""
+    current = _current.get()
+    if current is None:
+        return
+    trace, record = current
+    (record["attrs"] if record else trace.attrs).update(attrs)
+
+
+def annotate_trace(**attrs):
+    """Adds attributes to the trace (run-level facts such as the project title)."""
+    trace = current_trace()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+# 🔹 Storage
+def _trace_dir():
+    return Path(Config.TRACE_DIR)
+
+
+def trace_path(trace_id):
+    return _trace_dir() / f"{trace_id}.json.gz"
+
+
+def save(trace):
+    """Writes the trace atomically and appends its summary to the index."""
+    global _saves
+    directory = _trace_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        body = gzip.compress(
+            json.dumps(trace.to_dict(), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"),
+            compresslevel=6
+        )
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, trace_path(trace.id))
+        # the web process and the scheduler worker share the index
+        with _write_lock, locked(directory / INDEX_FILE):
+            with open(directory / INDEX_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.summary(), ensure_ascii=False, default=str) + "\n")
+            _saves += 1
+            if _saves % PRUNE_EVERY == 0:
+                _prune()
+    except OSError as e:
+        print(f"⚠️ Trace write error: {e}")
+
+
+def _prune():
+    """Keeps the newest TRACE_RETENTION traces (ids sort by start time); the caller holds the index lock."""
+    directory = _trace_dir()
+    files = sorted(directory.glob("*.json.gz"))
+    excess = files[:max(0, len(files) - Config.TRACE_RETENTION)]
+    if not excess:
+        return
+    for path in excess:
+        path.unlink(missing_ok=True)
+    kept = {path.name[:-len(".json.gz")] for path in files[len(excess):]}
+    entries = [entry for entry in _read_index() if entry.get("id") in kept]
+    index = directory / INDEX_FILE
+    tmp = index.with_suffix(".tmp")
+    tmp.write_text("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries), encoding="utf-8")
+    os.replace(tmp, index)
+
+
+def _read_index():
+    """Index entries; a torn or corrupt line is skipped, not the whole index."""
+    entries = []
+    try:
+        with open(_trace_dir() / INDEX_FILE, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def list_traces(limit=50, slowest=False, kind=None):
+    """Newest (or slowest) trace summaries from the index."""
+    entries = [e for e in _read_index() if kind is None or e.get("kind") == kind]
+    if slowest:
+        entries.sort(key=lambda e: e.get("duration_ms") or 0, reverse=True)
+    else:
+        entries.reverse()
+    return entries[:limit]
+
+
+def load(trace_id_or_path):
+    """Loads a stored trace by id or file path. Returns None when missing."""
+    path = Path(trace_id_or_path)
+    if not path.exists():
+        path = trace_path(trace_id_or_path)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
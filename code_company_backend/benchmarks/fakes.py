@@ -0,0 +1,298 @@
+# benchmarks/fakes.py
+"""
+🎭 Local stand-ins for the backend's providers, for benchmarks and offline runs.
+  • FakeOpenRouter — /api/v1/chat/completions with configurable latency, jitter,
+    error rate (429 / 500) and SSE streaming; replies look like the CEO and
+    Operations JSON the models return, with a `usage` block
+  • FakeSerper     — /search with a fixed latency and 10 distinct organic results
+    per (query, page)
+  • FakeSupabase   — a small in-memory PostgREST: /rest/v1/<table> with select,
+    eq / gt / lt / gte / lte filters, order, limit, insert, upsert (on_conflict) and delete
+Each runs a threaded HTTP server on 127.0.0.1 (port 0 = any free port).
+
+    python -m benchmarks.fakes          # start all three and print the env to use
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog (5) resets connections when the async path opens dozens at once
+    request_queue_size = 256
+
+
+class FakeServer:
+    """Threaded HTTP server on a background thread; subclasses implement handle()."""
+
+    def __init__(self, port=0):
+        self.requests = defaultdict(int)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                with server._lock:
+                    server.requests[self.command] += 1
+                server.handle(self, raw)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        self.httpd = _Server(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, handler, raw):
+        raise NotImplementedError
+
+    @staticmethod
+    def send_json(handler, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+class FakeOpenRouter(FakeServer):
+    """Chat completions with latency ± jitter, a share of 429 / 500 errors and SSE streaming."""
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, stream_chunks=20,
+                 code_lines=40, approve_rate=1.0, port=0, seed=None):
+        super().__init__(port)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self.code_lines = code_lines
+        self.approve_rate = approve_rate
+        self._random = random.Random(seed)
+
+    def _reply(self, payload):
+        messages = {m.get("role"): m.get("content") or "" for m in payload.get("messages", [])}
+        system, user = messages.get("system", ""), messages.get("user", "")
+        decision = "approve" if self._random.random() < self.approve_rate else "reject"
+        if "CEO" in system:
+            ids = re.findall(r'"id":\s*"([^"]+)"', user)
+            if ids:
+                return json.dumps({"decisions": [
+                    {"id": cid, "decision": decision, "reason": "Benchmark decision."} for cid in ids
+                ]})
+            return json.dumps({"decision": decision, "reason": "Benchmark decision."})
+        body = "".join(f"    total += {i}  # step {i}\n" for i in range(self.code_lines))
+        code = f"def main():\n    total = 0\n{body}    print(total)\n\n\nif __name__ == '__main__':\n    main()\n"
+        return json.dumps({
+            "solution_summary": "Benchmark solution.",
+            "detailed_steps": "1. Sum the steps. 2. Print the total.",
+            "final_code": code,
+            "conclusion": "Generated by the fake OpenRouter.",
+        })
+
+    def handle(self, handler, raw):
+        if not handler.path.endswith("/chat/completions"):
+            return self.send_json(handler, 404, {"error": {"message": "unknown path"}})
+        payload = json.loads(raw or b"{}")
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+
+        if self._random.random() < self.error_rate:
+            if self._random.random() < 0.5:
+                return self.send_json(handler, 429, {"error": {"message": "rate limited"}}, {"Retry-After": "1"})
+            return self.send_json(handler, 500, {"error": {"message": "upstream error"}})
+
+        reply = self._reply(payload)
+        usage = {"prompt_tokens": sum(len(m.get("content") or "") for m in payload.get("messages", [])) // 4,
+                 "completion_tokens": len(reply) // 4}
+        if not payload.get("stream"):
+            return self.send_json(handler, 200, {
+                "model": payload.get("model"),
+                "choices": [{"message": {"role": "assistant", "content": reply}}],
+                "usage": usage,
+            })
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        handler.wfile.write(b": OPENROUTER PROCESSING\n\n")
+        size = max(1, len(reply) // max(1, self.stream_chunks))
+        for start in range(0, len(reply), size):
+            event = {"choices": [{"delta": {"content": reply[start:start + size]}}]}
+            handler.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+        handler.wfile.write(f"data: {json.dumps({'choices': [{'delta': {}}], 'usage': usage})}\n\n".encode("utf-8"))
+        handler.wfile.write(b"data: [DONE]\n\n")
+
+
+class FakeSerper(FakeServer):
+    """Google-style organic results, distinct per (query, page) so dedupe has work to do."""
+
+    def __init__(self, latency=0.02, results=10, port=0):
+        super().__init__(port)
+        self.latency = latency
+        self.results = results
+
+    def handle(self, handler, raw):
+        if not handler.path.startswith("/search"):
+            return self.send_json(handler, 404, {"message": "unknown path"})
+        payload = json.loads(raw or b"{}")
+        time.sleep(self.latency)
+        tag = hashlib.sha1(f"{payload.get('q')}|{payload.get('page', 1)}".encode()).hexdigest()[:8]
+        topics = ("CSV cleaner", "log parser", "file organiser", "web scraper", "PDF merger",
+                  "API client", "backup script", "image resizer", "email notifier", "task scheduler")
+        organic = [{
+            "title": f"Python {topics[i % len(topics)]} automation project {tag}-{i}",
+            "snippet": f"Build a Python script that automates a {topics[i % len(topics)]} workflow ({tag}-{i}).",
+            "link": f"https://example.com/{tag}/{i}",
+            "position": i + 1,
+        } for i in range(self.results)]
+        self.send_json(handler, 200, {"searchParameters": payload, "organic": organic})
+
+
+_FILTER = re.compile(r"^(eq|neq|gt|gte|lt|lte)\.(.*)$", re.S)
+
+
+class FakeSupabase(FakeServer):
+    """In-memory PostgREST subset for the tables the backend uses."""
+
+    def __init__(self, latency=0.005, port=0):
+        super().__init__(port)
+        self.latency = latency
+        self.tables = defaultdict(list)
+        self._ids = defaultdict(int)
+        self._table_lock = threading.Lock()
+
+    @staticmethod
+    def _matches(row, filters):
+        for column, op, value in filters:
+            current = row.get(column)
+            if current is None:
+                return False
+            current, value = str(current), str(value)
+            if op == "eq" and current != value or op == "neq" and current == value:
+                return False
+            if op == "gt" and not current > value or op == "gte" and not current >= value:
+                return False
+            if op == "lt" and not current < value or op == "lte" and not current <= value:
+                return False
+        return True
+
+    def _parse(self, handler):
+        parts = urlsplit(handler.path)
+        table = unquote(parts.path[len("/rest/v1/"):]).strip("/")
+        params = parse_qs(parts.query, keep_blank_values=True)
+        filters = []
+        for column, values in params.items():
+            if column in ("select", "order", "limit", "offset", "on_conflict", "or"):
+                continue
+            for value in values:
+                match = _FILTER.match(value)
+                if match:
+                    filters.append((column, match.group(1), match.group(2).strip('"')))
+        return table, params, filters
+
+    def handle(self, handler, raw):
+        if not handler.path.startswith("/rest/v1/"):
+            return self.send_json(handler, 404, {"message": "unknown path"})
+        time.sleep(self.latency)
+        table, params, filters = self._parse(handler)
+
+        with self._table_lock:
+            rows = self.tables[table]
+            if handler.command == "GET":
+                found = [r for r in rows if self._matches(r, filters)]
+                for order in reversed((params.get("order") or [""])[0].split(",")):
+                    if order:
+                        column, _, direction = order.partition(".")
+                        found.sort(key=lambda r: str(r.get(column, "")), reverse=direction.startswith("desc"))
+                if params.get("limit"):
+                    found = found[:int(params["limit"][0])]
+                return self.send_json(handler, 200, found)
+
+            if handler.command == "DELETE":
+                removed = [r for r in rows if self._matches(r, filters)]
+                self.tables[table] = [r for r in rows if not self._matches(r, filters)]
+                return self.send_json(handler, 200, removed)
+
+            body = json.loads(raw or b"[]")
+            new_rows = body if isinstance(body, list) else [body]
+            conflict = [c for c in (params.get("on_conflict") or [""])[0].split(",") if c]
+            stored = []
+            for row in new_rows:
+                row = dict(row)
+                if conflict:
+                    existing = next((r for r in rows if all(str(r.get(c)) == str(row.get(c)) for c in conflict)), None)
+                    if existing is not None:
+                        existing.update(row)
+                        stored.append(existing)
+                        continue
+                self._ids[table] += 1
+                row.setdefault("id", self._ids[table])
+                rows.append(row)
+                stored.append(row)
+        return self.send_json(handler, 201, stored)
+
+
+def start_all(openrouter=None, serper=None, supabase=None):
+    """Starts the three fakes (kwargs are passed to each constructor). Returns a dict."""
+    return {
+        "openrouter": FakeOpenRouter(**(openrouter or {})).start(),
+        "serper": FakeSerper(**(serper or {})).start(),
+        "supabase": FakeSupabase(**(supabase or {})).start(),
+    }
+
+
+def provider_env(fakes):
+    """Environment variables that point the backend at the fakes."""
+    return {
+        "OPENROUTER_API_URL": f"{fakes['openrouter'].url}/api/v1/chat/completions",
+        "OPENROUTER_API_KEY": "benchmark",
+        "SEARCH_MODE": "http",
+        "SEARCH_API_URL": f"{fakes['serper'].url}/search",
+        "SEARCH_API_KEY": "benchmark",
+        "SUPABASE_URL": fakes["supabase"].url,
+        "SUPABASE_KEY": "benchmark",
+    }
+
+
+if __name__ == "__main__":
+    fakes = start_all()
+    for name, value in provider_env(fakes).items():
+        print(f"export {name}={value}")
+    print("# fakes running — Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for fake in fakes.values():
+            fake.stop()
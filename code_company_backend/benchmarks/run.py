@@ -0,0 +1,393 @@
+# benchmarks/run.py
+"""
+🏁 Offline load benchmark for the backend.
+For every project-store size it seeds a scratch store, starts the app in its own
+process with OpenRouter, Serper and Supabase pointed at local fakes
+(benchmarks/fakes.py), then drives concurrent requests at the chosen endpoints:
+  run       POST /company/run?wait=1&nocache=1   (full pipeline, one project per request)
+  stream    GET  /company/run/stream?nocache=1   (SSE pipeline, read to the end)
+  projects  GET  /api/projects?limit=50&view=slim&cursor=<random>
+  search    GET  /search?q=<one of --search-distinct queries>
+  vault     GET  /api/projects/search?q=<random seeded id prefix>&status=completed
+Per endpoint it reports throughput, p50 / p99 / max latency and errors, plus the
+server's peak RSS (VmHWM, Linux only), and writes everything as JSON to
+benchmarks/results/ so runs can be compared between commits.
+
+    python -m benchmarks.run --sizes 100,10000,100000,1000000
+    python -m benchmarks.run --sizes 1000 --endpoints projects,search --compare benchmarks/results/base.json
+Run from code_company_backend/.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from benchmarks.fakes import provider_env, start_all
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+ENDPOINTS = ("run", "stream", "projects", "search", "vault")
+SEED_CHUNK = 10000
+
+
+# 🔹 Scratch environment
+def _scratch_env(workdir, fakes, dedupe):
+    """Env for the app process: providers on the fakes, every data file in `workdir`."""
+    env = dict(os.environ)
+    env.update(provider_env(fakes))
+    env.update({
+        "MEMORY_FILE": f"{workdir}/memory.json",
+        "DATA_FILE": f"{workdir}/data.json",
+        "PROJECTS_DB": f"{workdir}/projects.db",
+        "PROJECTS_JSON_FILE": f"{workdir}/projects.json",
+        "LLM_CACHE_DIR": f"{workdir}/llm_cache",
+        "SUPABASE_SPOOL_FILE": f"{workdir}/supabase_spool.jsonl",
+        "HISTORY_MIRROR_DB": f"{workdir}/history.db",
+        "SCHEDULER_STATE_FILE": f"{workdir}/scheduler_state.json",
+        "APPROVAL_MODEL_FILE": f"{workdir}/approval_model.json",
+        "TRACE_DIR": f"{workdir}/traces",
+        "DEDUPE_ENABLED": "true" if dedupe else "false",
+        "FLASK_DEBUG": "false",
+        # The fakes answer instantly; client-side limits would only measure the token bucket
+        "OPENROUTER_RPM": "1000000",
+        "SERPER_RPM": "1000000",
+        "DEFAULT_RPM": "1000000",
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+# 🔹 Seeding (runs in a child process so its memory never counts towards the server)
+def _seed_projects(size, code_bytes):
+    started = time.time() - size
+    line = "    print('benchmark')  # padding\n"
+    code = "def main():\n" + line * max(1, code_bytes // len(line)) + "\n\nmain()\n"
+    for i in range(1, size + 1):
+        yield {
+            "id": i,
+            "title": f"Benchmark project {i}",
+            "summary": f"Seeded project {i} for the load benchmark.",
+            "details_markdown": code,
+            "status": "completed" if i % 10 else "failed",
+            "executed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started + i)),
+            "source": f"https://example.com/seed/{i}",
+        }
+
+
+def seed(size, code_bytes):
+    """Fills PROJECTS_DB with `size` projects (ids 1..size) in chunks, then builds the search index."""
+    from itertools import islice
+    from app.utils import project_search, project_store
+
+    projects = _seed_projects(size, code_bytes)
+    inserted = 0
+    while True:
+        chunk = list(islice(projects, SEED_CHUNK))
+        if not chunk:
+            break
+        inserted += project_store.append_many(chunk)
+    project_search.reindex()
+    print(f"🌱 Seeded {inserted} project(s) into {os.environ.get('PROJECTS_DB')}")
+
+
+def serve(port_file):
+    """Runs the app on a free port with a threaded server and writes the port to `port_file`."""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    Path(port_file).write_text(str(server.server_port), encoding="utf-8")
+    server.serve_forever()
+
+
+def _child(args, env, log):
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.run", *args],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def _peak_rss_mb(pid):
+    """Peak resident set size of a live process from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _wait_ready(process, port_file, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        if port_file.exists() and port_file.read_text(encoding="utf-8").strip():
+            base = f"http://127.0.0.1:{port_file.read_text(encoding='utf-8').strip()}"
+            try:
+                if requests.get(f"{base}/api/test", timeout=2).ok:
+                    return base
+            except requests.RequestException:
+                pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+# 🔹 Load generation
+def _request_factory(endpoint, base, size, distinct):
+    """Returns a function (session, i) -> None that raises on a failed request."""
+    if endpoint == "run":
+        def call(session, i):
+            response = session.post(f"{base}/company/run?wait=1&nocache=1", timeout=300)
+            response.raise_for_status()
+            if response.json().get("status") == "error":
+                raise RuntimeError(response.json().get("message"))
+    elif endpoint == "stream":
+        def call(session, i):
+            with session.get(f"{base}/company/run/stream?nocache=1", stream=True, timeout=300) as response:
+                response.raise_for_status()
+                body = b"".join(response.iter_content(chunk_size=None))
+            if b"event: error" in body:
+                raise RuntimeError("stream reported an error")
+    elif endpoint == "projects":
+        def call(session, i):
+            cursor = random.randint(1, size + 1) if size and i % 4 else None
+            params = {"limit": 50, "view": "slim"}
+            if cursor:
+                params["cursor"] = cursor
+            session.get(f"{base}/api/projects", params=params, timeout=60).raise_for_status()
+    elif endpoint == "vault":
+        def call(session, i):
+            # Prefix of a seeded id: matches roughly size / 10**(digits - len(prefix)) projects
+            prefix = str(random.randint(1, max(size, 1)))[:4]
+            params = {"q": f"seeded {prefix}", "status": "completed", "limit": 20}
+            session.get(f"{base}/api/projects/search", params=params, timeout=60).raise_for_status()
+    else:
+        def call(session, i):
+            query = f"python automation project idea {i % distinct}"
+            session.get(f"{base}/search", params={"q": query}, timeout=60).raise_for_status()
+    return call
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def load(call, total, concurrency, warmup=0):
+    """Runs `total` calls on `concurrency` threads. Returns throughput and latency stats."""
+    local = threading.local()
+
+    def timed(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            call(session, i)
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, f"{e.__class__.__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(warmup)))
+        started = time.perf_counter()
+        outcomes = list(pool.map(timed, range(warmup, warmup + total)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds * 1000 for seconds, error in outcomes if error is None)
+    errors = [error for _, error in outcomes if error is not None]
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50), 2) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 99), 2) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+# 🔹 One store size
+def bench_size(size, args):
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench-{size}-"))
+    fakes = start_all(
+        openrouter={"latency": args.llm_latency, "jitter": args.llm_jitter,
+                    "error_rate": args.error_rate, "stream_chunks": args.stream_chunks, "seed": size},
+        serper={"latency": args.search_latency},
+        supabase={"latency": args.supabase_latency},
+    )
+    env = _scratch_env(workdir, fakes, args.dedupe)
+    result = {"size": size, "endpoints": {}}
+    server = None
+    try:
+        with open(workdir / "seed.log", "w", encoding="utf-8") as log:
+            started = time.perf_counter()
+            seeding = _child(["seed", str(size), "--code-bytes", str(args.code_bytes)], env, log)
+            if seeding.wait() != 0:
+                raise RuntimeError(f"seeding failed, see {workdir / 'seed.log'}")
+            result["seed_seconds"] = round(time.perf_counter() - started, 2)
+        result["db_mb"] = round(sum(p.stat().st_size for p in workdir.glob("projects.db*")) / 1024 ** 2, 1)
+
+        port_file = workdir / "port"
+        log = open(workdir / "server.log", "w", encoding="utf-8")
+        started = time.perf_counter()
+        server = _child(["serve", "--port-file", str(port_file)], env, log)
+        base = _wait_ready(server, port_file)
+        result["startup_seconds"] = round(time.perf_counter() - started, 2)
+        result["idle_rss_mb"] = _peak_rss_mb(server.pid)
+
+        for endpoint in args.endpoints:
+            total = args.run_requests if endpoint in ("run", "stream") else args.requests
+            call = _request_factory(endpoint, base, size, args.search_distinct)
+            stats = load(call, total, args.concurrency, warmup=args.warmup)
+            stats["peak_rss_mb"] = _peak_rss_mb(server.pid)
+            result["endpoints"][endpoint] = stats
+            print(f"   {endpoint:<9} {stats['throughput_rps']} req/s  p50 {stats['p50_ms']} ms  "
+                  f"p99 {stats['p99_ms']} ms  errors {stats['errors']}")
+        result["peak_rss_mb"] = _peak_rss_mb(server.pid)
+        result["provider_requests"] = {name: dict(fake.requests) for name, fake in fakes.items()}
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            log.close()
+        for fake in fakes.values():
+            fake.stop()
+        if args.keep:
+            print(f"   scratch kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+# 🔹 Reporting
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+        return f"{commit}-dirty" if dirty and commit else commit or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(report, baseline, tolerance):
+    """Prints p99 / throughput changes against a baseline report. Returns the regressions."""
+    previous = {(r["size"], name): stats for r in baseline.get("results", [])
+                for name, stats in r.get("endpoints", {}).items()}
+    regressions = []
+    print(f"\n📊 Against {baseline.get('meta', {}).get('commit')}:")
+    for r in report["results"]:
+        for name, stats in r["endpoints"].items():
+            old = previous.get((r["size"], name))
+            if not old or not old.get("p99_ms") or not stats.get("p99_ms"):
+                continue
+            p99 = stats["p99_ms"] / old["p99_ms"] - 1
+            rps = (stats["throughput_rps"] or 0) / (old["throughput_rps"] or 1) - 1
+            flag = "⚠️" if p99 > tolerance else "  "
+            print(f"   {flag} size {r['size']:>8} {name:<9} p99 {p99:+.0%}  throughput {rps:+.0%}")
+            if p99 > tolerance:
+                regressions.append({"size": r["size"], "endpoint": name, "p99_change": round(p99, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    commands = parser.add_subparsers(dest="command")
+    seeding = commands.add_parser("seed", help="(internal) seed PROJECTS_DB")
+    seeding.add_argument("size", type=int)
+    seeding.add_argument("--code-bytes", type=int, default=512)
+    serving = commands.add_parser("serve", help="(internal) run the app for the benchmark")
+    serving.add_argument("--port-file", required=True)
+
+    parser.add_argument("--sizes", default="100,10000,100000,1000000", help="project-store sizes")
+    parser.add_argument("--endpoints", default="run,projects,search", help=f"any of {','.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=500, help="requests per read endpoint")
+    parser.add_argument("--run-requests", type=int, default=20, help="requests per pipeline endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--search-distinct", type=int, default=50, help="distinct /search queries")
+    parser.add_argument("--code-bytes", type=int, default=512, help="code blob size of seeded projects")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of OpenRouter 429/500 replies")
+    parser.add_argument("--stream-chunks", type=int, default=20)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--supabase-latency", type=float, default=0.005)
+    parser.add_argument("--dedupe", action="store_true", help="keep the near-duplicate index on (slow to build at 1M)")
+    parser.add_argument("--keep", action="store_true", help="keep scratch directories and server logs")
+    parser.add_argument("--output", help="report path ('-' = stdout); default benchmarks/results/<time>-<commit>.json")
+    parser.add_argument("--compare", help="baseline report to compare p99 / throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p99 growth before --compare fails")
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        return seed(args.size, args.code_bytes)
+    if args.command == "serve":
+        return serve(args.port_file)
+
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("command", "output", "compare")},
+        },
+        "results": [],
+    }
+    for size in args.sizes:
+        print(f"🏁 Project store size {size}")
+        report["results"].append(bench_size(size, args))
+
+    regressions = []
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        report["regressions"] = regressions
+
+    body = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(body)
+    else:
+        path = Path(args.output) if args.output else \
+            RESULTS_DIR / f"{time.strftime('%Y%m%dT%H%M%S')}-{commit or 'unknown'}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body + "\n", encoding="utf-8")
+        print(f"📝 Report written to {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,15 +12,119 @@ class Config:
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
     SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
 
+    # 🔹 OpenRouter (CEO + Operations Manager)
+    OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+    OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openai/gpt-oss-20b:free")
+    CEO_TIMEOUT = int(os.getenv("CEO_TIMEOUT", 60))
+    OPERATIONS_TIMEOUT = int(os.getenv("OPERATIONS_TIMEOUT", 90))
+
+    # 🔹 Model routing (comma-separated candidates per role, in preference order)
+    CEO_MODELS = [m.strip() for m in os.getenv("CEO_MODELS", OPENROUTER_MODEL).split(",") if m.strip()]
+    OPERATIONS_MODELS = [m.strip() for m in os.getenv("OPERATIONS_MODELS", OPENROUTER_MODEL).split(",") if m.strip()]
+    MODEL_STATS_WINDOW = int(os.getenv("MODEL_STATS_WINDOW", 50))  # recent calls per model
+    MODEL_BENCH_SECONDS = int(os.getenv("MODEL_BENCH_SECONDS", 300))  # rest for a failing model
+    MODEL_HEDGE_AFTER = float(os.getenv("MODEL_HEDGE_AFTER", 0))  # seconds before a hedged request; 0 = off
+    MODEL_HEDGE_WORKERS = int(os.getenv("MODEL_HEDGE_WORKERS", 0))  # threads for hedged calls; 0 = sized from batch/job limits
+
+    # 🔹 CEO local approval classifier (decides alone above the confidence threshold)
+    APPROVAL_MODEL_ENABLED = os.getenv("APPROVAL_MODEL_ENABLED", "true").lower() == "true"
+    APPROVAL_MODEL_FILE = os.getenv("APPROVAL_MODEL_FILE", "app/data/approval_model.json")
+    APPROVAL_MODEL_THRESHOLD = float(os.getenv("APPROVAL_MODEL_THRESHOLD", 0.9))
+    APPROVAL_MODEL_MIN_SAMPLES = int(os.getenv("APPROVAL_MODEL_MIN_SAMPLES", 30))
+    APPROVAL_MODEL_MIN_PER_CLASS = int(os.getenv("APPROVAL_MODEL_MIN_PER_CLASS", 10))  # approves and rejects each
+    APPROVAL_MODEL_HOLDOUT = float(os.getenv("APPROVAL_MODEL_HOLDOUT", 0.2))  # share held out to validate training
+    APPROVAL_MODEL_AUDIT_RATE = float(os.getenv("APPROVAL_MODEL_AUDIT_RATE", 0.05))  # share still sent to the LLM
+    APPROVAL_MODEL_FLUSH_DELAY = float(os.getenv("APPROVAL_MODEL_FLUSH_DELAY", 5))  # seconds updates are batched before a write
+
+    # 🔹 LLM Response Cache (on disk, keyed by model + prompts; ?nocache=1 bypasses)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "app/data/llm_cache")
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+    # 🔹 Outbound HTTP (shared pooled client for OpenRouter + Serper)
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+    HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+    HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 8))
+
+    # 🔹 Provider rate limits + circuit breaker (shared by all runs in the process)
+    OPENROUTER_RPM = float(os.getenv("OPENROUTER_RPM", 20))  # free models: 20 requests/minute
+    SERPER_RPM = float(os.getenv("SERPER_RPM", 300))
+    DEFAULT_RPM = float(os.getenv("DEFAULT_RPM", 600))
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))  # longer waits fail fast
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+
+    # 🔹 Async execution (pipeline runs on one asyncio loop with an httpx client)
+    ASYNC_RUNS = os.getenv("ASYNC_RUNS", "false").lower() == "true"  # default for /company/run; ?async=1|0 overrides
+    ASYNC_MAX_RUNS = int(os.getenv("ASYNC_MAX_RUNS", 200))  # concurrent runs on the loop; the rest wait
+    ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", 100))
+
     # 🔹 Search API Settings
     SEARCH_MODE = os.getenv("SEARCH_MODE", "mock")   # 'mock' or 'http'
     SEARCH_API_URL = os.getenv("SEARCH_API_URL", "")
     SEARCH_API_KEY = os.getenv("SEARCH_API_KEY", "")
     SEARCH_TIMEOUT = int(os.getenv("SEARCH_TIMEOUT", 10))
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 300))
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 256))
+    SEARCH_CACHE_PURGE_INTERVAL = int(os.getenv("SEARCH_CACHE_PURGE_INTERVAL", 3600))
 
     # 🔹 File Paths
     MEMORY_FILE = os.getenv("MEMORY_FILE", "app/data/memory.json")
+    STATE_FLUSH_DELAY = float(os.getenv("STATE_FLUSH_DELAY", 0.5))  # write-behind debounce (s)
     DATA_FILE = os.getenv("DATA_FILE", "app/data/data.json")
+    PROJECTS_DB = os.getenv("PROJECTS_DB", "app/data/projects.db")
+    PROJECTS_JSON_FILE = os.getenv("PROJECTS_JSON_FILE", "app/data/projects.json")  # legacy store, migrated once
+    PROJECTS_RETENTION = int(os.getenv("PROJECTS_RETENTION", 0))  # 0 = keep all
+    PROJECTS_PAGE_MAX = int(os.getenv("PROJECTS_PAGE_MAX", 100))
+    # Broad searches rank only their newest N matches (0 = always rank every match)
+    PROJECT_SEARCH_RANK_WINDOW = int(os.getenv("PROJECT_SEARCH_RANK_WINDOW", 2000))
+
+    # 🔹 Technical Manager candidate selection (skips executed / near-duplicate projects)
+    DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "true").lower() == "true"
+    DEDUPE_SIMILARITY = float(os.getenv("DEDUPE_SIMILARITY", 0.8))
+    TECHNICAL_MAX_PAGES = int(os.getenv("TECHNICAL_MAX_PAGES", 3))
+
+    # 🔹 Company Pipeline (batch mode: /company/run?batch=N)
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 10))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 4))
+
+    # 🔹 Generated code validation (after Operations; broken code is regenerated)
+    CODE_VALIDATION_ENABLED = os.getenv("CODE_VALIDATION_ENABLED", "true").lower() == "true"
+    CODE_VALIDATION_SMOKE_TEST = os.getenv("CODE_VALIDATION_SMOKE_TEST", "false").lower() == "true"
+    CODE_VALIDATION_WORKERS = int(os.getenv("CODE_VALIDATION_WORKERS", 2))
+    CODE_VALIDATION_TIMEOUT = int(os.getenv("CODE_VALIDATION_TIMEOUT", 10))
+    CODE_VALIDATION_MEMORY_MB = int(os.getenv("CODE_VALIDATION_MEMORY_MB", 256))
+    CODE_VALIDATION_RETRIES = int(os.getenv("CODE_VALIDATION_RETRIES", 1))
+    CODE_VALIDATION_CACHE_SIZE = int(os.getenv("CODE_VALIDATION_CACHE_SIZE", 512))
+    CODE_VALIDATION_SANDBOX = os.getenv("CODE_VALIDATION_SANDBOX", "namespaces")  # "none" = limits only, no isolation
+    CODE_VALIDATION_USER = os.getenv("CODE_VALIDATION_USER", "nobody")  # smoke tests drop to it when run as root
+    CODE_VALIDATION_GROUP = os.getenv("CODE_VALIDATION_GROUP", "nogroup")
+    CODE_VALIDATION_PYTHON = os.getenv("CODE_VALIDATION_PYTHON", "")  # interpreter for smoke tests (default: ours)
+
+    # 🔹 Background Jobs (/company/run returns a job id, see /company/jobs)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", 200))
+
+    # 🔹 Scheduler worker (python worker.py — autonomous runs on a cadence)
+    SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", 600))  # seconds between run starts
+    SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", 30))  # ± seconds
+    SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", 1))
+    SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", 1))  # projects per run
+    SCHEDULER_STATE_FILE = os.getenv("SCHEDULER_STATE_FILE", "app/data/scheduler_state.json")
+
+    # 🔹 Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # 🔹 Run traces (one gzipped span tree per run; see python -m app.utils.trace_replay)
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_DIR = os.getenv("TRACE_DIR", "app/data/traces")
+    TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", 500))  # newest traces kept
+    TRACE_CAPTURE_BODIES = os.getenv("TRACE_CAPTURE_BODIES", "false").lower() == "true"  # store LLM replies
 
     # 🔹 Flask & General Settings
     DEBUG = os.getenv("FLASK_DEBUG", "True").lower() == "true"
@@ -29,3 +133,16 @@ class Config:
     # 🔹 Supabase (for later data sync)
     SUPABASE_URL = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+
+    # 🔹 Supabase background writer (project_history inserts)
+    SUPABASE_BATCH_SIZE = int(os.getenv("SUPABASE_BATCH_SIZE", 20))
+    SUPABASE_FLUSH_INTERVAL = float(os.getenv("SUPABASE_FLUSH_INTERVAL", 2))
+    SUPABASE_SPOOL_FILE = os.getenv("SUPABASE_SPOOL_FILE", "app/data/supabase_spool.jsonl")
+    SUPABASE_SPOOL_REPLAY_INTERVAL = float(os.getenv("SUPABASE_SPOOL_REPLAY_INTERVAL", 60))
+
+    # 🔹 /company/history (keyset pagination + optional local mirror)
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 50))
+    HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", 500))
+    HISTORY_MIRROR_ENABLED = os.getenv("HISTORY_MIRROR_ENABLED", "False").lower() == "true"
+    HISTORY_MIRROR_DB = os.getenv("HISTORY_MIRROR_DB", "app/data/history.db")
+    HISTORY_MIRROR_SYNC_INTERVAL = int(os.getenv("HISTORY_MIRROR_SYNC_INTERVAL", 30))
@@ -1,14 +1,8 @@
 from app import create_app
-import schedule, time
-from threading import Thread
+from config import Config
 
 app = create_app()
 
-def auto_run():
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
-
+# Scheduled company runs live in their own process: `python worker.py`
 if __name__ == "__main__":
-    Thread(target=auto_run, daemon=True).start()
-    app.run(debug=True)
+    app.run(debug=Config.DEBUG)
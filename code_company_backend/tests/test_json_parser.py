@@ -0,0 +1,105 @@
+"""
+Lenient parsing of LLM replies: the repairs JSONStreamScanner makes, and that
+code inside string values (quotes, brackets, backslashes) survives intact.
+
+    python -m pytest tests        (or: python -m unittest discover tests)
+"""
+import json
+import unittest
+
+from app.utils.json_parser import JSONStreamScanner, extract_fields, parse_json_reply, parse_scanned
+
+CODE_FIELDS = ("solution_summary", "final_code", "conclusion")
+
+
+def reply(code, raw=True):
+    """An Operations-style reply whose final_code is pasted in unescaped when `raw`."""
+    value = f'"{code}"' if raw else json.dumps(code)
+    return '{"solution_summary": "Does it.", "final_code": ' + value + ', "conclusion": "Done."}'
+
+
+class ParseJsonReplyTest(unittest.TestCase):
+    def assertCode(self, text, code, status="repaired"):
+        result, got = parse_json_reply(text, required_keys=("final_code",))
+        self.assertEqual(got, status)
+        self.assertEqual(result["final_code"], code)
+        self.assertEqual(result["conclusion"], "Done.")
+
+    def test_valid_json(self):
+        self.assertCode(reply('open("f.txt", "w")', raw=False), 'open("f.txt", "w")', status="ok")
+
+    def test_code_fences(self):
+        self.assertCode("```json\n" + reply("x = 1", raw=False) + "\n```", "x = 1", status="ok")
+
+    def test_prose_and_fences_around_object(self):
+        text = "Here you go:\n```json\n" + reply('print("a", 1)') + "\n```\nEnjoy!"
+        self.assertCode(text, 'print("a", 1)')
+
+    def test_trailing_commas(self):
+        result, status = parse_json_reply('{"a": [1, 2,], "final_code": "x",}')
+        self.assertEqual((result, status), ({"a": [1, 2], "final_code": "x"}, "repaired"))
+
+    def test_raw_newlines_and_tabs(self):
+        self.assertCode(reply("def f():\n\treturn 1\n"), "def f():\n\treturn 1\n")
+
+    def test_quoted_call_arguments(self):
+        for code in ('with open("f.txt", "w") as f:\n    f.write("hi")',
+                     'print("a", 1)',
+                     'items = ["a", "b"]\nfirst = items[0]',
+                     'print("a", {"b": 2}, [3])'):
+            with self.subTest(code=code):
+                self.assertCode(reply(code), code)
+
+    def test_dict_literals_and_subscripts(self):
+        for code in ('headers = {"User-Agent": "bot"}\nrequests.get(url, headers=headers)',
+                     'value = data["key"]\nprint(value)',
+                     'config = {"name": "x", "size": 1}'):
+            with self.subTest(code=code):
+                self.assertCode(reply(code), code)
+
+    def test_regex_backslashes(self):
+        self.assertCode(reply(r'pattern = re.compile("\d+\.\w*")'), r'pattern = re.compile("\d+\.\w*")')
+
+    def test_prose_after_unfenced_object(self):
+        text = reply('x = {"k": "v"}\nprint(x)') + "\nLet me know if you need more."
+        self.assertCode(text, 'x = {"k": "v"}\nprint(x)')
+
+    def test_truncated_reply_is_closed(self):
+        result, status = parse_json_reply('{"solution_summary": "Does it.", "final_code": "import os\\nprint(')
+        self.assertEqual(status, "truncated")
+        self.assertEqual(result["solution_summary"], "Does it.")
+
+    def test_no_json(self):
+        self.assertEqual(parse_json_reply("Sorry, I can't help."), (None, None))
+
+
+class SalvageTest(unittest.TestCase):
+    def test_unclosed_field_is_not_salvaged(self):
+        fields = extract_fields('{"solution_summary": "Does it.", "final_code": "with open("f.txt', CODE_FIELDS)
+        self.assertEqual(fields, {"solution_summary": "Does it."})
+
+    def test_quote_at_cut_off_is_not_a_clean_close(self):
+        fields = extract_fields('{"solution_summary": "Does it.", "final_code": "print("', CODE_FIELDS)
+        self.assertNotIn("final_code", fields)
+
+    def test_closed_fields_are_salvaged(self):
+        fields = extract_fields(reply('open("f.txt", "w")'), CODE_FIELDS)
+        self.assertEqual(fields["final_code"], 'open("f.txt", "w")')
+
+
+class StreamingTest(unittest.TestCase):
+    def test_chunked_feed_matches_whole_reply(self):
+        text = reply('with open("f.txt", "w") as f:\n    f.write(data["k"])')
+        scanner = JSONStreamScanner()
+        streamed = ""
+        for i in range(0, len(text), 3):
+            streamed += "".join(delta for field, delta in scanner.feed(text[i:i + 3]) if field == "final_code")
+        result, status = parse_scanned(scanner, required_keys=("final_code",))
+        self.assertEqual(status, "repaired")
+        self.assertEqual(result["final_code"], 'with open("f.txt", "w") as f:\n    f.write(data["k"])')
+        self.assertEqual(streamed, result["final_code"])
+        self.assertEqual(scanner.complete_fields(CODE_FIELDS)["final_code"], result["final_code"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Failover inside a hedged pair: a primary that fails (or replies malformed)
+before MODEL_HEDGE_AFTER must hand over to the backup right away.
+
+    python -m pytest tests        (or: python -m unittest discover tests)
+"""
+import asyncio
+import time
+import unittest
+
+from app.utils.model_router import ModelRouter
+
+
+def _router(replies):
+    """Router over models "a", "b" whose calls return / raise from `replies`."""
+    router = ModelRouter({"ceo": ["a", "b"]}, hedge_after=5)
+    calls = []
+
+    def outcome(model):
+        calls.append(model)
+        result = replies[model]
+        if isinstance(result, Exception):
+            raise result
+        return result, result != "malformed"
+
+    def attempt(model, *args):
+        return outcome(model)
+
+    async def aattempt(model, *args):
+        return outcome(model)
+
+    router._attempt = attempt
+    router._aattempt = aattempt
+    return router, calls
+
+
+class HedgedFailoverTest(unittest.TestCase):
+    def test_early_error_fails_over_to_backup(self):
+        router, calls = _router({"a": RuntimeError("boom"), "b": "ok"})
+        started = time.monotonic()
+        self.assertEqual(router.complete("ceo", "system", "user", timeout=1), ("ok", "b"))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(calls, ["a", "b"])
+
+    def test_early_malformed_reply_fails_over_to_backup(self):
+        router, calls = _router({"a": "malformed", "b": "ok"})
+        self.assertEqual(router.complete("ceo", "system", "user", timeout=1), ("ok", "b"))
+        self.assertEqual(calls, ["a", "b"])
+
+    def test_both_failing_raises_last_error(self):
+        router, calls = _router({"a": RuntimeError("a down"), "b": RuntimeError("b down")})
+        with self.assertRaises(RuntimeError):
+            router.complete("ceo", "system", "user", timeout=1)
+        self.assertEqual(sorted(calls), ["a", "b"])
+
+    def test_slow_primary_is_hedged(self):
+        router, calls = _router({"a": "ok", "b": "ok"})
+        router.hedge_after = 0.05
+        fast_attempt = router._attempt
+
+        def slow_primary(model, *args):
+            if model == "a":
+                time.sleep(1)
+            return fast_attempt(model, *args)
+
+        router._attempt = slow_primary
+        self.assertEqual(router.complete("ceo", "system", "user", timeout=1), ("ok", "b"))
+
+    def test_async_early_error_fails_over_to_backup(self):
+        router, calls = _router({"a": RuntimeError("boom"), "b": "ok"})
+        started = time.monotonic()
+        result = asyncio.run(router.acomplete("ceo", "system", "user", timeout=1))
+        self.assertEqual(result, ("ok", "b"))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(calls, ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
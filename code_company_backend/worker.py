@@ -0,0 +1,41 @@
+"""
+⏰ Scheduler worker — runs the company pipeline on a cadence, apart from the web server.
+
+    python worker.py          # run forever (Ctrl+C / SIGTERM stops after active runs finish)
+    python worker.py --once   # start a single run and exit when it is done
+
+Cadence and limits come from the SCHEDULER_* settings in config.py.
+"""
+import signal
+import sys
+
+from app.scheduler import CompanyScheduler
+from app.utils import startup
+
+
+def main():
+    scheduler = CompanyScheduler()
+    if not scheduler.acquire_lock():
+        print("⚠️ Another scheduler worker is already running — exiting.")
+        return 1
+    startup.mark("ready")
+    startup.print_report("Scheduler worker")
+
+    if "--once" in sys.argv:
+        scheduler.tick()
+        scheduler.stop(wait=True)
+        return 0
+
+    def _shutdown(signum, frame):
+        print("🛑 Scheduler: stopping, waiting for active runs...")
+        scheduler.request_stop()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    scheduler.run_forever()
+    scheduler.stop(wait=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())